@@ -0,0 +1,168 @@
+# Chunk Stores
+# This module provides containers that store a value for every cell of an unbounded grid,
+# but only use memory for the regions that have been written to.
+#
+# Cells are grouped into chunks using the nesting functions of each grid, e.g. hex_parent.
+# With levels=2, each chunk is the parent of the parent of its cells, and so on.
+# A chunk's values live in a flat numpy array, which is allocated the first time one of its cells is written.
+# Cells in chunks that have not been written read as fill.
+#
+# Cells can be looked up one at a time, or many at once, as with rect arrays (see rect_array.py):
+#   store[x, y, z] = 5
+#   store[hexes] = values
+#   store[xs, ys, zs]
+#
+# Chunks are keyed by the packed key of the chunk cell, e.g. hex_pack(*hex_parent(*hex_parent(x, y, z))).
+# If max_chunks is given, the least recently used chunks are evicted once there are more than that many.
+# Evicted chunks are passed to on_evict, if given, e.g. to save them elsewhere, and read as fill afterwards.
+
+from collections import OrderedDict
+import numpy as np
+import square
+import square_np
+import flat_topped_hex
+import flat_topped_hex_np
+
+class ChunkStore:
+    """Base class for sparse stores of a value per cell, grouped into chunks.
+    Subclasses supply parent, which maps an array of cells to their parents and their index among the parent's children,
+    children, which does the reverse, and pack and unpack, which convert chunk cells to and from keys."""
+
+    def __init__(self, levels, dtype, fill, max_chunks, on_evict):
+        self.levels = levels
+        self.chunk_size = self.parent_area ** levels
+        self.dtype = dtype
+        self.fill = fill
+        self.max_chunks = max_chunks
+        self.on_evict = on_evict
+        self.chunks = OrderedDict()
+        self.evictions = 0
+
+    def locate(self, cells):
+        """Returns a pair of int64 arrays, the key of the chunk containing each cell, and the cell's index in that chunk"""
+        cells = np.asarray(cells)
+        indices = np.zeros(cells.shape[:-1], np.int64)
+        scale = 1
+        for _ in range(self.levels):
+            (cells, child_indices) = self.parent(cells)
+            indices += scale * child_indices
+            scale *= self.parent_area
+        return (self.pack(cells), indices)
+
+    def chunk_cells(self, key):
+        """Returns an array of every cell in the chunk with the given key, in the same order as its values"""
+        cells = self.unpack(np.array([key]))
+        for _ in range(self.levels):
+            cells = self.children(cells).reshape(-1, cells.shape[-1])
+        return cells
+
+    def _cells(self, key):
+        if isinstance(key, tuple):
+            return np.stack(np.broadcast_arrays(*key), axis=-1)
+        return np.asarray(key)
+
+    def __contains__(self, cell):
+        """Returns true if the chunk containing cell has been written to, and not evicted"""
+        (chunk, _) = self.locate(cell)
+        return int(chunk) in self.chunks
+
+    def __getitem__(self, key):
+        return self.get(self._cells(key))
+
+    def __setitem__(self, key, value):
+        self.set(self._cells(key), value)
+
+    def get(self, cells):
+        """Returns the value of each of the given cells"""
+        (chunks, indices) = self.locate(cells)
+        result = np.full(chunks.shape, self.fill, self.dtype)
+        flat_result = result.reshape(-1)
+        indices = indices.reshape(-1)
+        for (key, where) in _group(chunks):
+            values = self.chunks.get(key)
+            if values is not None:
+                self.chunks.move_to_end(key)
+                flat_result[where] = values[indices[where]]
+        return result[()] if result.ndim == 0 else result
+
+    def set(self, cells, values):
+        """Sets the value of each of the given cells, allocating chunks as needed"""
+        (chunks, indices) = self.locate(cells)
+        values = np.broadcast_to(np.asarray(values, self.dtype), chunks.shape).reshape(-1)
+        indices = indices.reshape(-1)
+        for (key, where) in _group(chunks):
+            self._chunk(key)[indices[where]] = values[where]
+
+    def _chunk(self, key):
+        """Returns the values of a chunk, allocating it if needed, and marks it as most recently used"""
+        values = self.chunks.get(key)
+        if values is None:
+            values = np.full(self.chunk_size, self.fill, self.dtype)
+            self.chunks[key] = values
+            if self.max_chunks is not None:
+                while len(self.chunks) > self.max_chunks:
+                    self.evict()
+        else:
+            self.chunks.move_to_end(key)
+        return values
+
+    def evict(self):
+        """Evicts the least recently used chunk"""
+        (key, values) = self.chunks.popitem(last=False)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, values)
+
+    def clear(self):
+        """Forgets all chunks, without passing them to on_evict"""
+        self.chunks.clear()
+
+def _group(chunks):
+    """Groups the positions of a flattened array of chunk keys by key.
+    Yields pairs of a key and an array of positions with that key."""
+    chunks = chunks.reshape(-1)
+    (keys, inverse) = np.unique(chunks, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    ends = np.cumsum(np.bincount(inverse, minlength=len(keys)))
+    start = 0
+    for (key, end) in zip(keys.tolist(), ends.tolist()):
+        yield (key, order[start:end])
+        start = end
+
+class SquareChunkStore(ChunkStore):
+    """Stores a value for every square, in chunks of square_parent rectangles"""
+    parent_area = square.parent_width * square.parent_height
+    pack = staticmethod(square_np.square_pack)
+    unpack = staticmethod(square_np.square_unpack)
+
+    def __init__(self, levels=3, dtype=float, fill=0, max_chunks=None, on_evict=None):
+        ChunkStore.__init__(self, levels, dtype, fill, max_chunks, on_evict)
+
+    def parent(self, squares):
+        """Returns the parent of each square, and its index in square_parent_children"""
+        parents = square_np.square_parent(squares)
+        (dx, dy) = np.moveaxis(squares - parents * (square.parent_width, square.parent_height), -1, 0)
+        return (parents, dx * square.parent_height + dy)
+
+    def children(self, parents):
+        """Returns the children of each parent square, as in square_np.square_parent_children"""
+        return square_np.square_parent_children(parents)
+
+class HexChunkStore(ChunkStore):
+    """Stores a value for every hex, in chunks of hex_parent discs"""
+    parent_area = flat_topped_hex.parent_area
+    pack = staticmethod(flat_topped_hex_np.hex_pack)
+    unpack = staticmethod(flat_topped_hex_np.hex_unpack)
+
+    def __init__(self, levels=2, dtype=float, fill=0, max_chunks=None, on_evict=None):
+        ChunkStore.__init__(self, levels, dtype, fill, max_chunks, on_evict)
+
+    def parent(self, hexes):
+        """Returns the parent of each hex, and its index in the disc around the parent's center child"""
+        parents = flat_topped_hex_np.hex_parent(hexes)
+        offsets = hexes - flat_topped_hex_np.hex_parent_center_child(parents)
+        return (parents, flat_topped_hex_np.hex_disc_index(offsets, 0, 0, 0, flat_topped_hex.parent_radius))
+
+    def children(self, parents):
+        """Returns the children of each parent hex, as in flat_topped_hex_np.hex_parent_children"""
+        return flat_topped_hex_np.hex_parent_children(parents)
@@ -1,6 +1,382 @@
+from math import sqrt, sin, cos, isclose
+
 def mod(x, y):
     """Returns the positive remainder of x divided by y"""
     # In Python, this function is identical to the remainder operator.
     # However, many other languages define remainders differently
     assert y > 0
-    return x % y
\ No newline at end of file
+    return x % y
+
+def lattice_ring(k, r):
+    """Returns the integer co-ordinates (a, b, c) with a + b + c == k and abs(a) + abs(b) + abs(c) == r,
+    in counter clockwise order.
+    This is used for rings of cells in grids with three co-ordinates.
+    There are 3 * r such co-ordinates (or 1 if r is zero), when abs(k) <= r and k and r are both even or both odd,
+    and none otherwise."""
+    if r == 0:
+        if k == 0:
+            yield (0, 0, 0)
+        return
+    # The co-ordinates lie on a hexagon, whose sides alternate between two lengths.
+    # Each side keeps one co-ordinate fixed.
+    p = (r + k) // 2
+    q = (r - k) // 2
+    (a, b, c) = (p, 0, -q)
+    for ((da, db, dc), n) in [
+        ((-1,  1,  0), p),
+        ((-1,  0,  1), q),
+        (( 0, -1,  1), p),
+        (( 1, -1,  0), q),
+        (( 1,  0, -1), p),
+        (( 0,  1, -1), q),
+    ]:
+        for i in range(n):
+            yield (a, b, c)
+            a += da
+            b += db
+            c += dc
+
+def lattice_ring_index(k, r, a, b, c):
+    """Returns the position of (a, b, c) in lattice_ring(k, r)"""
+    if r == 0:
+        return 0
+    p = (r + k) // 2
+    q = (r - k) // 2
+    # Work out which side of the hexagon the co-ordinate is on.
+    # Each side includes the corner it starts from, but not the one it ends at.
+    if c == -q and 0 <= b < p:
+        return b
+    if b == p and -q <= c < 0:
+        return p + q + c
+    if a == -q and 0 < b <= p:
+        return p + q + p - b
+    if c == p and -q <= a < 0:
+        return 2 * p + q + q + a
+    if b == -q and 0 <= a < p:
+        return 2 * p + 2 * q + a
+    if a == p and -q <= b < 0:
+        return 3 * p + 2 * q + q + b
+    raise Exception("Co-ordinate is not in ring")
+
+def lattice_ring_deindex(k, r, index):
+    """Performs the inverse of lattice_ring_index"""
+    if r == 0:
+        return (0, 0, 0)
+    p = (r + k) // 2
+    q = (r - k) // 2
+    for (start, (da, db, dc), n) in [
+        (( p,  0, -q), (-1,  1,  0), p),
+        (( 0,  p, -q), (-1,  0,  1), q),
+        ((-q,  p,  0), ( 0, -1,  1), p),
+        ((-q,  0,  p), ( 1, -1,  0), q),
+        (( 0, -q,  p), ( 1,  0, -1), p),
+        (( p, -q,  0), ( 0,  1, -1), q),
+    ]:
+        if index < n:
+            return (start[0] + da * index, start[1] + db * index, start[2] + dc * index)
+        index -= n
+    raise Exception("Index is not in ring")
+
+def spiral_ring(index, disc_size):
+    """Given an index into a spiral, returns the radius of the ring it lies in.
+    disc_size is a function giving the number of cells in a disc of a given radius."""
+    # Find an upper bound, then binary search
+    hi = 1
+    while disc_size(hi) <= index:
+        hi *= 2
+    lo = 0
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if disc_size(mid) <= index:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def span_difference(spans1, spans2, step=1):
+    """Given two lists of spans, returns spans covering the cells of spans1 that are not in spans2.
+    Each span is a tuple ending with an inclusive start and end, such as (x, miny, maxy),
+    and covers every step'th value between them. The other values of the tuple identify the row or column.
+    Each row or column should occur at most once in each list."""
+    others = {span[:-2]: span[-2:] for span in spans2}
+    for span in spans1:
+        key = span[:-2]
+        (start, end) = span[-2:]
+        other = others.get(key)
+        if other is None or other[1] < start or other[0] > end:
+            yield span
+            continue
+        # Keep the parts before and after the other span
+        if start < other[0]:
+            yield key + (start, other[0] - step)
+        if other[1] < end:
+            yield key + (other[1] + step, end)
+
+def merge_spans(spans, step=1, key=None):
+    """Sorts a list of spans, as described in span_difference, and joins any that overlap or are next to each other.
+    key optionally gives the order of the rows or columns."""
+    merged = None
+    for span in sorted(spans, key=key):
+        if merged is not None and merged[:-2] == span[:-2] and span[-2] <= merged[-1] + step:
+            merged = merged[:-1] + (max(merged[-1], span[-1]),)
+            continue
+        if merged is not None:
+            yield merged
+        merged = span
+    if merged is not None:
+        yield merged
+
+def polygon_strip(points, lo, hi):
+    """Given a polygon as a list of (x, y) points, finds the part of it with lo <= y <= hi.
+    This is returned as a list of trapezoids with horizontal top and bottom, each given by its four corners.
+    The polygon can be concave, but its edges shouldn't cross."""
+    edges = [(p, q) for (p, q) in zip(points, points[1:] + points[:1]) if p[1] != q[1]]
+    def edge_x(p, q, y):
+        return p[0] + (y - p[1]) * (q[0] - p[0]) / (q[1] - p[1])
+    # Split the strip at every vertex, so each edge crosses each piece completely or not at all
+    heights = sorted({lo, hi} | {y for (x, y) in points if lo < y < hi})
+    trapezoids = []
+    for (y0, y1) in zip(heights, heights[1:]):
+        crossings = sorted(
+            (edge_x(p, q, (y0 + y1) / 2), edge_x(p, q, y0), edge_x(p, q, y1))
+            for (p, q) in edges
+            if min(p[1], q[1]) <= y0 and max(p[1], q[1]) >= y1
+        )
+        # Inside and outside alternate from left to right
+        for (left, right) in zip(crossings[::2], crossings[1::2]):
+            trapezoids.append([(left[1], y0), (left[2], y1), (right[1], y0), (right[2], y1)])
+    return trapezoids
+
+def circle_strip_max(x, y, r, lo, hi, gx, gy):
+    """Returns the largest value of gx * px + gy * py for points (px, py) in the circle at (x, y) of radius r, with lo <= py <= hi.
+    The strip should overlap the circle."""
+    n = sqrt(gx * gx + gy * gy)
+    py = y + r * gy / n
+    if lo <= py <= hi:
+        return gx * x + gy * y + r * n
+    # Otherwise, the largest value is on the nearest side of the strip
+    py = min(max(py, lo), hi)
+    w = sqrt(max(0, r * r - (py - y) ** 2))
+    return gx * x + abs(gx) * w + gy * py
+
+# Packed keys
+# A cell can be packed into a single integer key, which is smaller and faster to hash or sort than a tuple.
+# A pair of co-ordinates is packed as x * 2**32 + y, for x and y from -2**31 to 2**31 - 1.
+# Each grid multiplies this by a small power of 2 to make room for the cell type, e.g. whether a tri points up.
+# Packing is linear, so moving a cell by some offset always adds the same amount to its key.
+
+def pack_pair(x, y):
+    """Packs two co-ordinates into a single integer"""
+    return (x << 32) + y
+
+def unpack_pair(key):
+    """Returns the two co-ordinates packed by pack_pair"""
+    y = ((key + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+    return ((key - y) >> 32, y)
+
+# Space filling curves
+# These give an order to the cells of a rectangle that keeps nearby cells close together more often than
+# going column by column or row by row. So they are a good storage order for data that is accessed by neighbourhood.
+# Each works on a pair of non-negative integer co-ordinates, e.g. from one of the *_rect_knoll functions.
+# The Z-order (or Morton) curve interleaves the bits of the co-ordinates. It is quick to calculate.
+# The Hilbert curve fills a square of size 2**order, and keeps cells closer together than the Z-order curve.
+
+def morton_index(x, y):
+    """Returns the position of (x, y) along the Z-order curve. x and y must be from 0 to 2**31 - 1."""
+    return _spread_bits(x) | (_spread_bits(y) << 1)
+
+def morton_deindex(index):
+    """Performs the inverse of morton_index"""
+    return (_compact_bits(index), _compact_bits(index >> 1))
+
+def _spread_bits(x):
+    """Moves each bit of a 32 bit integer to twice its position"""
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    x = (x | (x << 1)) & 0x5555555555555555
+    return x
+
+def _compact_bits(x):
+    """Performs the inverse of _spread_bits, ignoring odd bits"""
+    x = x & 0x5555555555555555
+    x = (x | (x >> 1)) & 0x3333333333333333
+    x = (x | (x >> 2)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x >> 4)) & 0x00FF00FF00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+    x = (x | (x >> 16)) & 0x00000000FFFFFFFF
+    return x
+
+def curve_order(width, height):
+    """Returns the smallest order for which the Hilbert curve covers co-ordinates from (0, 0) to (width - 1, height - 1)"""
+    return (max(width, height, 1) - 1).bit_length()
+
+def hilbert_index(x, y, order):
+    """Returns the position of (x, y) along the Hilbert curve that fills a square of size 2**order"""
+    index = 0
+    s = 1 << order
+    while s > 1:
+        s >>= 1
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        index += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the curve through it starts in the bottom left
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - (x & (s - 1))
+                y = s - 1 - (y & (s - 1))
+            (x, y) = (y, x)
+    return index
+
+def hilbert_deindex(index, order):
+    """Performs the inverse of hilbert_index"""
+    x = 0
+    y = 0
+    s = 1
+    while s < (1 << order):
+        rx = 1 & (index >> 1)
+        ry = 1 & (index ^ rx)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            (x, y) = (y, x)
+        x += s * rx
+        y += s * ry
+        index >>= 2
+        s <<= 1
+    return (x, y)
+
+# A layout is an affine transform, stored as a 2x3 matrix ((xx, xy, tx), (yx, yy, ty)),
+# that maps (x, y) to (xx * x + xy * y + tx, yx * x + yy * y + ty).
+# Grid objects use one to place the grid in a larger world space.
+
+identity_layout = ((1, 0, 0), (0, 1, 0))
+
+def layout(origin=(0, 0), rotation=0, scale=1):
+    """Returns the layout that scales, then rotates anticlockwise by rotation radians, then moves (0, 0) to origin"""
+    (ox, oy) = origin
+    c = cos(rotation) * scale
+    s = sin(rotation) * scale
+    return ((c, -s, ox), (s, c, oy))
+
+def layout_multiply(m1, m2):
+    """Returns the layout that applies m2, then m1"""
+    ((a1, b1, t1), (c1, d1, u1)) = m1
+    ((a2, b2, t2), (c2, d2, u2)) = m2
+    return (
+        (a1 * a2 + b1 * c2, a1 * b2 + b1 * d2, a1 * t2 + b1 * u2 + t1),
+        (c1 * a2 + d1 * c2, c1 * b2 + d1 * d2, c1 * t2 + d1 * u2 + u1),
+    )
+
+def layout_inverse(m):
+    """Returns the layout that undoes m"""
+    ((a, b, t), (c, d, u)) = m
+    det = a * d - b * c
+    if det == 0:
+        raise Exception("Layout cannot be inverted")
+    return (
+        ( d / det, -b / det, (b * u - d * t) / det),
+        (-c / det,  a / det, (c * t - a * u) / det),
+    )
+
+def layout_apply(m, x, y):
+    """Returns the point (x, y) transformed by m"""
+    ((a, b, t), (c, d, u)) = m
+    return (a * x + b * y + t, c * x + d * y + u)
+
+def matrix_multiply(m1, m2):
+    """Returns the product of two matrices, stored as tuples of rows"""
+    return tuple(tuple(sum(a * b for (a, b) in zip(row, column)) for column in zip(*m2)) for row in m1)
+
+class Grid:
+    """Base class for grid objects, such as TriGrid, which convert between cells and cartesian co-ordinates
+    using their own edge length, rather than the global one in settings. So grids of different sizes can be used side by side.
+    A grid can also be given a layout, which maps its cartesian co-ordinates to world co-ordinates.
+    All methods take and return world co-ordinates. The layout is folded into the matrices used by center and pick,
+    so these are still a single matrix multiply.
+    Subclasses supply center, pick, vertex_center, edge_center and span_cells,
+    and the _line_intersect and _*_intersect_spans methods, which work like the functions of the same name in each grid's module,
+    but for an edge length of 1, and without a layout.
+    They also supply vertices, to find the corners of a cell.
+    span_step is how far apart the cells of a span are."""
+    __slots__ = ("edge_length", "layout", "unit")
+    span_step = 1
+
+    def __init__(self, edge_length=1, layout=identity_layout):
+        self.edge_length = edge_length
+        self.layout = layout
+        # Converts world co-ordinates to cartesian co-ordinates in units of edge_length
+        self.unit = layout_multiply(((1 / edge_length, 0, 0), (0, 1 / edge_length, 0)), layout_inverse(layout))
+
+    def unit_matrix(self, matrix):
+        """Given a matrix that takes unit cartesian co-ordinates and a constant (x, y, 1),
+        returns the matrix that does the same for world co-ordinates"""
+        return matrix_multiply(matrix, self.unit + ((0, 0, 1),))
+
+    def world_matrix(self, matrix):
+        """Given a 2 row matrix that takes a cell and a constant, e.g. (a, b, c, 1), to unit cartesian co-ordinates,
+        returns the matrix that takes it to world co-ordinates"""
+        e = self.edge_length
+        ((a, b, t), (c, d, u)) = self.layout
+        columns = [(a * x * e + b * y * e, c * x * e + d * y * e) for (x, y) in zip(*matrix)]
+        # Only the constant column is moved by the layout
+        columns[-1] = (columns[-1][0] + t, columns[-1][1] + u)
+        return tuple(zip(*columns))
+
+    def to_unit(self, x, y):
+        """Converts a point from world co-ordinates to cartesian co-ordinates in units of edge_length"""
+        return layout_apply(self.unit, x, y)
+
+    def corners(self, *cell):
+        """Returns the corners of a given cell in cartesian co-ordinates"""
+        return [self.vertex_center(*vertex) for vertex in self.vertices(*cell)]
+
+    def line_intersect(self, x1, y1, x2, y2):
+        """Returns the cells that intersect the line specified in cartesian co-ordinates"""
+        return self._line_intersect(*self.to_unit(x1, y1), *self.to_unit(x2, y2))
+
+    def rect_intersect_spans(self, x, y, width, height):
+        """Returns the spans of cells that intersect the rectangle specified in cartesian co-ordinates"""
+        ((a, b, _), (c, d, _)) = self.unit
+        if b == 0 and c == 0:
+            (x1, y1) = self.to_unit(x, y)
+            (x2, y2) = self.to_unit(x + width, y + height)
+            return self._rect_intersect_spans(min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1))
+        # A rotated rectangle is no longer lined up with the grid
+        return self.polygon_intersect_spans([(x, y), (x + width, y), (x + width, y + height), (x, y + height)])
+
+    def rect_intersect(self, x, y, width, height):
+        """Returns the cells that intersect the rectangle specified in cartesian co-ordinates"""
+        return self.span_cells(self.rect_intersect_spans(x, y, width, height))
+
+    def rect_intersect_size(self, x, y, width, height):
+        """Returns the number of cells that intersect the rectangle specified in cartesian co-ordinates"""
+        return sum((span[-1] - span[-2]) // self.span_step + 1 for span in self.rect_intersect_spans(x, y, width, height))
+
+    def rect_intersect_delta(self, x1, y1, width1, height1, x2, y2, width2, height2):
+        """Returns a pair of lists of the spans of cells that start and stop intersecting a rectangle as it moves or resizes"""
+        old = list(self.rect_intersect_spans(x1, y1, width1, height1))
+        new = list(self.rect_intersect_spans(x2, y2, width2, height2))
+        return (list(span_difference(new, old, self.span_step)), list(span_difference(old, new, self.span_step)))
+
+    def polygon_intersect_spans(self, points):
+        """Returns the spans of cells that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners"""
+        return self._polygon_intersect_spans([self.to_unit(x, y) for (x, y) in points])
+
+    def polygon_intersect(self, points):
+        """Returns the cells that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners"""
+        return self.span_cells(self.polygon_intersect_spans(points))
+
+    def circle_intersect_spans(self, x, y, r):
+        """Returns the spans of cells that intersect the circle with center (x, y) and radius r in cartesian co-ordinates.
+        The layout must not skew or unevenly scale, as then the circle would be an ellipse in grid co-ordinates."""
+        ((a, b, _), (c, d, _)) = self.unit
+        if not (isclose(a, d) and isclose(b, -c)) and not (isclose(a, -d) and isclose(b, c)):
+            raise Exception("Circles can only be intersected with layouts that don't skew or unevenly scale")
+        return self._circle_intersect_spans(*self.to_unit(x, y), r * sqrt(a * a + b * b))
+
+    def circle_intersect(self, x, y, r):
+        """Returns the cells that intersect the circle with center (x, y) and radius r in cartesian co-ordinates"""
+        return self.span_cells(self.circle_intersect_spans(x, y, r))
@@ -0,0 +1,257 @@
+# Helpers shared by the vectorized grid modules.
+
+import numpy as np
+
+def mesh(vertices, index_dtype=np.uint32):
+    """Given an (N, k, d) array of the vertices of N cells, finds the distinct vertices.
+    Returns a pair, a (V, d) array of the distinct vertices, and an (N, k) array
+    of indices into it, suitable for use as an index buffer."""
+    vertices = np.asarray(vertices)
+    (n, k, d) = vertices.shape
+    unique, inverse = np.unique(vertices.reshape(n * k, d), axis=0, return_inverse=True)
+    return unique, inverse.reshape(n, k).astype(index_dtype)
+
+def affine(matrix, values):
+    """Multiplies matrix, a tuple of rows, such as the matrices of a grid object (see Grid in common.py),
+    with each row of values, extended with a constant 1. Returns an array with a column per row of matrix.
+    The terms are added in the same order as the grid objects do, so the results are identical."""
+    values = np.asarray(values, dtype=float)
+    columns = []
+    for row in matrix:
+        total = row[0] * values[..., 0]
+        for i in range(1, len(row) - 1):
+            total = total + row[i] * values[..., i]
+        columns.append(total + row[-1])
+    return np.stack(columns, axis=-1)
+
+def lattice_ring_index(k, r, offsets):
+    """Vectorized version of common.lattice_ring_index, for an (N, 3) array of co-ordinates.
+    Returns -1 for co-ordinates that are not in the ring."""
+    offsets = np.asarray(offsets)
+    a = offsets[..., 0]
+    b = offsets[..., 1]
+    c = offsets[..., 2]
+    p = (r + k) // 2
+    q = (r - k) // 2
+    index = np.select([
+        r == 0,
+        (c == -q) & (0 <= b) & (b < p),
+        (b == p) & (-q <= c) & (c < 0),
+        (a == -q) & (0 < b) & (b <= p),
+        (c == p) & (-q <= a) & (a < 0),
+        (b == -q) & (0 <= a) & (a < p),
+        (a == p) & (-q <= b) & (b < 0),
+    ], [
+        0,
+        b,
+        p + q + c,
+        p + q + p - b,
+        2 * p + q + q + a,
+        2 * p + 2 * q + a,
+        3 * p + 2 * q + q + b,
+    ], -1)
+    return index
+
+def lattice_ring_deindex(k, r, indices):
+    """Vectorized version of common.lattice_ring_deindex, returning an (N, 3) array"""
+    k, r, indices = np.broadcast_arrays(k, r, indices)
+    p = (r + k) // 2
+    q = (r - k) // 2
+    zero = np.zeros_like(p)
+    starts = np.stack([
+        np.stack([ p, zero, -q], axis=-1),
+        np.stack([zero, p, -q], axis=-1),
+        np.stack([-q, p, zero], axis=-1),
+        np.stack([-q, zero, p], axis=-1),
+        np.stack([zero, -q, p], axis=-1),
+        np.stack([ p, -q, zero], axis=-1),
+    ], axis=-2)
+    directions = np.array([
+        (-1,  1,  0),
+        (-1,  0,  1),
+        ( 0, -1,  1),
+        ( 1, -1,  0),
+        ( 1,  0, -1),
+        ( 0,  1, -1),
+    ])
+    # Index at which each side starts
+    side_starts = np.stack([zero, p, p + q, 2 * p + q, 2 * p + 2 * q, 3 * p + 2 * q], axis=-1)
+    side = np.sum(indices[..., None] >= side_starts[..., 1:], axis=-1)
+    start = np.take_along_axis(starts, side[..., None, None], axis=-2)[..., 0, :]
+    steps = indices - np.take_along_axis(side_starts, side[..., None], axis=-1)[..., 0]
+    return np.where((r == 0)[..., None], 0, start + steps[..., None] * directions[side])
+
+def spiral_ring(indices, disc_size):
+    """Vectorized version of common.spiral_ring.
+    disc_size must accept an array of radii."""
+    indices = np.asarray(indices)
+    hi = 1
+    while np.any(disc_size(hi) <= indices):
+        hi *= 2
+    lo = np.zeros_like(indices)
+    hi = np.full_like(indices, hi)
+    while np.any(lo < hi):
+        mid = (lo + hi) // 2
+        below = disc_size(mid) <= indices
+        lo = np.where(below, mid + 1, lo)
+        hi = np.where(below, hi, mid)
+    return lo
+
+def ragged(ids, values, count):
+    """Groups values by id, for ids from 0 to count - 1, keeping values with the same id in order.
+    Returns a pair, the grouped values, and a (count + 1,) array of offsets,
+    so that the values with id i are values[offsets[i]:offsets[i + 1]]."""
+    ids = np.asarray(ids)
+    order = np.argsort(ids, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(ids, minlength=count))])
+    return np.asarray(values)[order], offsets
+
+def ragged_dedupe(values, offsets):
+    """Removes values that are the same as the value before them in the same group"""
+    ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    keep = np.ones(len(values), bool)
+    keep[1:] = np.any(values[1:] != values[:-1], axis=-1) | (ids[1:] != ids[:-1])
+    return ragged(ids[keep], values[keep], len(offsets) - 1)
+
+# Packed keys
+# Vectorized versions of common.pack_pair and common.unpack_pair, see there for the format.
+
+def pack_pair(x, y):
+    """Packs arrays of two co-ordinates into an int64 array"""
+    return (np.asarray(x, dtype=np.int64) << 32) + np.asarray(y, dtype=np.int64)
+
+def unpack_pair(keys):
+    """Returns a pair of int64 arrays, the co-ordinates packed by pack_pair"""
+    keys = np.asarray(keys, dtype=np.int64)
+    y = ((keys + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+    return ((keys - y) >> 32, y)
+
+def key_index(sorted_keys, keys):
+    """Finds where each of keys occurs in sorted_keys, a sorted int64 array of packed keys.
+    Returns an int64 array of indices, with -1 for keys that are not present."""
+    sorted_keys = np.asarray(sorted_keys, dtype=np.int64)
+    keys = np.asarray(keys, dtype=np.int64)
+    if len(sorted_keys) == 0:
+        return np.full(keys.shape, -1, np.int64)
+    indices = np.searchsorted(sorted_keys, keys)
+    found = sorted_keys[np.minimum(indices, len(sorted_keys) - 1)] == keys
+    return np.where(found, indices, -1)
+
+# Space filling curves
+# Vectorized versions of the curves in common.py, taking and returning int64 arrays.
+
+def morton_index(x, y):
+    """Vectorized version of common.morton_index"""
+    return _spread_bits(np.asarray(x, dtype=np.int64)) | (_spread_bits(np.asarray(y, dtype=np.int64)) << 1)
+
+def morton_deindex(indices):
+    """Vectorized version of common.morton_deindex, returning a pair of arrays"""
+    indices = np.asarray(indices, dtype=np.int64)
+    return (_compact_bits(indices), _compact_bits(indices >> 1))
+
+def _spread_bits(x):
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    x = (x | (x << 1)) & 0x5555555555555555
+    return x
+
+def _compact_bits(x):
+    x = x & 0x5555555555555555
+    x = (x | (x >> 1)) & 0x3333333333333333
+    x = (x | (x >> 2)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x >> 4)) & 0x00FF00FF00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+    x = (x | (x >> 16)) & 0x00000000FFFFFFFF
+    return x
+
+def hilbert_index(x, y, order):
+    """Vectorized version of common.hilbert_index"""
+    x = np.array(x, dtype=np.int64)
+    y = np.array(y, dtype=np.int64)
+    indices = np.zeros(np.broadcast_shapes(x.shape, y.shape), np.int64)
+    s = 1 << order
+    while s > 1:
+        s >>= 1
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        indices += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the curve through it starts in the bottom left
+        flip = ~ry & rx
+        x = np.where(flip, s - 1 - (x & (s - 1)), x)
+        y = np.where(flip, s - 1 - (y & (s - 1)), y)
+        (x, y) = (np.where(ry, x, y), np.where(ry, y, x))
+    return indices
+
+def hilbert_deindex(indices, order):
+    """Vectorized version of common.hilbert_deindex, returning a pair of arrays"""
+    indices = np.asarray(indices, dtype=np.int64)
+    x = np.zeros(indices.shape, np.int64)
+    y = np.zeros(indices.shape, np.int64)
+    s = 1
+    while s < (1 << order):
+        rx = 1 & (indices >> 1)
+        ry = 1 & (indices ^ rx)
+        flip = (ry == 0) & (rx == 1)
+        x = np.where(flip, s - 1 - x, x)
+        y = np.where(flip, s - 1 - y, y)
+        (x, y) = (np.where(ry == 0, y, x), np.where(ry == 0, x, y))
+        x = x + s * rx
+        y = y + s * ry
+        indices = indices >> 2
+        s <<= 1
+    return (x, y)
+
+# Ray marching
+# The vectorized line functions step many rays through the grid together.
+# A march function takes (N, d) arrays of start and end points, and a visit function.
+# visit(rays, cells) is called with the indices of some rays, and the next cell each ray enters.
+# It can return a boolean array, true for rays that should stop marching.
+
+def ray_points(starts, ends):
+    """Broadcasts start and end points of rays against each other, returning two (N, 2) float arrays"""
+    starts, ends = np.broadcast_arrays(np.asarray(starts, dtype=float), np.asarray(ends, dtype=float))
+    return starts.reshape(-1, 2), ends.reshape(-1, 2)
+
+def _ray_count(starts, ends):
+    return int(np.prod(np.broadcast_shapes(np.shape(starts), np.shape(ends))[:-1]))
+
+def march_cells(march, starts, ends, convert=None):
+    """Returns the cells every ray passes through, as a pair of cells and offsets like ragged.
+    If given, convert maps the cells of march to cells of another grid."""
+    ids = []
+    cells = []
+    def visit(rays, marched):
+        ids.append(rays)
+        cells.append(marched)
+    march(starts, ends, visit)
+    cells = np.concatenate(cells)
+    if convert is not None:
+        cells = convert(cells)
+    cells, offsets = ragged(np.concatenate(ids), cells, _ray_count(starts, ends))
+    if convert is not None:
+        cells, offsets = ragged_dedupe(cells, offsets)
+    return cells, offsets
+
+def march_hits(march, starts, ends, opaque, convert=None):
+    """Returns the first cell each ray passes through that is opaque, or outside the rectangle of opaque, a RectArray.
+    Returns a pair, an (N, k) array of cells, and an (N,) boolean array that is false for rays that hit nothing.
+    Those rays give the last cell they pass through instead."""
+    count = _ray_count(starts, ends)
+    cells = None
+    hit = np.zeros(count, bool)
+    def visit(rays, marched):
+        nonlocal cells
+        if convert is not None:
+            marched = convert(marched)
+        # The first visit is the starting cell of every ray
+        if cells is None:
+            cells = np.zeros((count,) + marched.shape[1:], np.int64)
+        cells[rays] = marched
+        index = opaque.rect_index(marched)
+        blocked = (index < 0) | opaque.values[index].astype(bool)
+        hit[rays] = blocked
+        return blocked
+    march(starts, ends, visit)
+    return cells, hit
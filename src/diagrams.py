@@ -5,8 +5,6 @@ from flat_topped_hex import *
 from flat_topped_trihex import *
 from updown_tri import *
 from square import *
-import flat_topped_hex
-import updown_tri
 
 poly_style="fill: rgb(244, 244, 241); stroke: rgb(51, 51, 51); stroke-width: 0.1"
 stroke_text_style = "fill: rgb(51, 51, 51); font-size: 0.3px;stroke: white; stroke-width: 0.05"
@@ -15,6 +13,9 @@ xs = """style="fill: hsl( 90, 100%, 35%); font-weight: bold" """
 ys = """style="fill: hsl(300, 80%, 50%); font-weight: bold" """
 zs = """style="fill: hsl(200, 100%, 45%); font-weight: bold" """
 
+hex_grid = HexGrid(0.75)
+tri_grid = TriGrid(2)
+
 def flip(v):
     return [v[0], -v[1]]
 
@@ -42,10 +43,9 @@ def cell_text(p, x, y, z=None, scale=1):
 def hex_grid_svg():
     svg = ""
     svg += """<svg viewBox="-3 -3 6 6" width="300px" height="300px" xmlns="http://www.w3.org/2000/svg">\n"""
-    flat_topped_hex.edge_length = 0.75
     for x, y, z in hex_disc(0, 0, 0, 4):
-        center = flip(hex_center(x, y, z))
-        svg += poly(hex_corners(x, y, z))
+        center = flip(hex_grid.center(x, y, z))
+        svg += poly(hex_grid.corners(x, y, z))
         svg += cell_text(center, x, y, z)
     svg += "</svg>"
 
@@ -56,12 +56,12 @@ def hex_neighbours_svg():
     svg = ""
     svg += """<svg viewBox="-10 -10 20 20" xmlns="http://www.w3.org/2000/svg">\n"""
     svg += """<rect x="-10" y="-10" width="20" height="20" style="fill: none; stroke: blue"/>\n"""
-    center = flip(hex_center(0, 0, 0))
-    svg += poly(hex_corners(0, 0, 0))
+    center = flip(hex_grid.center(0, 0, 0))
+    svg += poly(hex_grid.corners(0, 0, 0))
     def pm(n): 
         return "0" if n == 0 else f"+{n}" if n > 0 else f"{n}"
     for (x, y, z) in hex_neighbours(0, 0, 0):
-        center = flip(hex_center(x, y, z))
+        center = flip(hex_grid.center(x, y, z))
         f = 0.8
         svg += cell_text([center[0] * 0.85, center[1] * 0.7], pm(x), pm(y), pm(z))
     svg += "</svg>"
@@ -70,12 +70,11 @@ def hex_neighbours_svg():
         f.write(svg)
 
 def tri_grid_svg():
-    updown_tri.edge_length = 2
     svg = ""
     svg += """<svg viewBox="-3 -3 6 6" width="300px" height="300px" xmlns="http://www.w3.org/2000/svg">\n"""
     for x, y, z in tri_disc(0, 0, 0, 5):
-        center = flip(tri_center(x, y, z))
-        svg += poly(tri_corners(x, y, z))
+        center = flip(tri_grid.center(x, y, z))
+        svg += poly(tri_grid.corners(x, y, z))
         svg += cell_text(center, x, y, z)
     svg += "</svg>"
 
@@ -96,11 +95,11 @@ def tri_neighbours_svg():
         assert False
     
     for tri in [[0,1,0],[2,-2,2]]:
-        center = flip(tri_center(*tri))
-        svg += poly(tri_corners(*tri))
+        center = flip(tri_grid.center(*tri))
+        svg += poly(tri_grid.corners(*tri))
         svg += cell_text(center, "a", "b", "c")
         for (x, y, z) in tri_neighbours(*tri):
-            center = flip(tri_center(x, y, z))
+            center = flip(tri_grid.center(x, y, z))
             svg += cell_text([center[0], center[1]], off("a", tri[0], x), off("b", tri[1], y), off("c", tri[2], z))
 
     svg += "</svg>"
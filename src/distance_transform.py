@@ -0,0 +1,73 @@
+# Distance Transforms
+# Given a rect array (see rect_array.py) marking some cells as features, e.g. walls or water,
+# a distance transform finds the distance from every cell to the nearest feature,
+# measured with the grid's dist function, e.g. hex_dist.
+#
+# Squares are handled with a few sweeps along the rows and columns,
+# as the distance between squares is the sum of the horizontal and vertical distances.
+# The other grids use a breadth first wavefront from the features, working on the whole front at once.
+# The shortest path between two cells of a rectangle never needs to leave it,
+# so the wavefront gives exactly the same distances as the dist function.
+# The exception is rectangles only one cell across, e.g. a single column of tris,
+# which can split into pieces that only touch outside the rectangle.
+# Cells the wavefront cannot reach are measured directly against every feature instead.
+
+import numpy as np
+from square import square_dist
+from flat_topped_hex import hex_dist
+from updown_tri import tri_dist
+from flat_topped_trihex import trihex_dist
+from rect_array import SquareRectArray, HexRectArray, TriRectArray, TrihexRectArray
+
+_dists = {
+    SquareRectArray: square_dist,
+    HexRectArray: hex_dist,
+    TriRectArray: tri_dist,
+    TrihexRectArray: trihex_dist,
+}
+
+def _sweep(distances, axis):
+    """Updates distances along one axis of a 2d array, so each cell is at most one more than its neighbours on that axis"""
+    steps = np.arange(distances.shape[axis]).reshape((-1, 1) if axis == 0 else (1, -1))
+    forwards = np.minimum.accumulate(distances - steps, axis=axis) + steps
+    backwards = np.flip(np.minimum.accumulate(np.flip(distances + steps, axis), axis=axis), axis) - steps
+    return np.minimum(forwards, backwards)
+
+def _square_distance_transform(features):
+    (rect_x, rect_y, width, height) = features.rect
+    distances = np.where(features.values.astype(bool), 0, np.inf).reshape((width, height))
+    distances = _sweep(_sweep(distances, 1), 0)
+    return distances.ravel()
+
+def _wavefront_distance_transform(features):
+    table = features.neighbour_indices()
+    distances = np.where(features.values.astype(bool), 0, np.inf)
+    front = np.flatnonzero(distances == 0)
+    step = 0
+    while len(front) > 0:
+        step += 1
+        neighbours = table[front].ravel()
+        neighbours = neighbours[neighbours >= 0]
+        front = np.unique(neighbours[distances[neighbours] == np.inf])
+        distances[front] = step
+    unreached = np.flatnonzero(distances == np.inf)
+    if len(unreached) > 0 and len(unreached) < len(distances):
+        distances[unreached] = _direct_distances(features, unreached)
+    return distances
+
+def _direct_distances(features, indices):
+    """Returns the distance from the cells at the given indices to the nearest feature, using the grid's dist function"""
+    dist = _dists[type(features)]
+    cells = features.rect_deindex(indices)
+    walls = features.cells()[features.values.astype(bool)]
+    return dist(*cells.T[:, :, None], *walls.T[:, None, :]).min(axis=1)
+
+def distance_transform(features):
+    """Given a RectArray with truthy values for feature cells, finds the distance from each cell to the nearest feature.
+    Returns an integer array in the same order as features.values, i.e. rect index order.
+    Cells are -1 if there are no features at all."""
+    if isinstance(features, SquareRectArray) and features.order is None:
+        distances = _square_distance_transform(features)
+    else:
+        distances = _wavefront_distance_transform(features)
+    return np.where(distances == np.inf, -1, distances).astype(np.int64)
@@ -0,0 +1,128 @@
+# Field of View
+# Finds the cells visible from a given cell, for any of the grids.
+#
+# A cell is visible if the straight line from the center of the viewing cell to the center of the cell
+# doesn't pass through any opaque cell, other than the cell itself. This is the same line
+# tested by *_line_intersect between the two centers, so the results match testing each cell with
+# *_line_intersect, except for lines that pass exactly through a corner. Those only see past the corner
+# if one of the two cells on either side of the line is transparent, while *_line_intersect picks one side.
+#
+# Rather than cast a line to every cell, we use shadowcasting. Cells are visited ring by ring,
+# outwards from the viewer. Each opaque cell casts a shadow over the range of angles its corners span,
+# and a cell is visible if the angle to its center is not inside a shadow from an earlier ring.
+# Only cells that are at least partly lit are visited: light reaches a cell through one of its
+# neighbours in the same or the previous ring, so each ring is found from the transparent, lit cells
+# before it. Cells entirely in shadow are skipped, and once a sector is blocked nothing behind it is visited,
+# so the cost grows with the number of visible cells rather than the area of the disc.
+#
+# Opacity is given by a RectArray (see rect_array.py) with truthy values for opaque cells.
+# Cells outside the rectangle are treated as opaque, and are never visible.
+
+from bisect import bisect_left, bisect_right
+from math import atan2, pi
+from square import square_center, square_corners, square_neighbours, square_dist
+from updown_tri import tri_center, tri_corners, tri_neighbours, tri_dist
+from flat_topped_hex import hex_center, hex_corners, hex_neighbours, hex_dist
+from flat_topped_trihex import trihex_center, trihex_corners, trihex_neighbours, trihex_dist
+
+# Corners shared by neighbouring cells can be calculated slightly differently, so
+# shadows closer than this are joined.
+epsilon = 1e-9
+
+class Shadows:
+    """A set of angles, stored as sorted, disjoint intervals.
+    Angles are in radians, from -pi to pi, and intervals reaching pi are also stored shifted by 2 pi,
+    so that every angle can be tested without wrapping around."""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        """Adds the closed interval from start to end"""
+        self._add(start, end)
+        if end > pi - epsilon:
+            self._add(start - 2 * pi, end - 2 * pi)
+        if start < -pi + epsilon:
+            self._add(start + 2 * pi, end + 2 * pi)
+
+    def _add(self, start, end):
+        # Find the intervals overlapping or touching this one, and merge them all
+        i = bisect_left(self.ends, start - epsilon)
+        j = bisect_right(self.starts, end + epsilon)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def contains(self, angle):
+        """Returns true if angle is strictly inside the shadows"""
+        i = bisect_right(self.starts, angle) - 1
+        return i >= 0 and self.starts[i] < angle - epsilon and angle + epsilon < self.ends[i]
+
+    def covers(self, start, end):
+        """Returns true if the interval from start to end is strictly inside the shadows"""
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and self.starts[i] < start - epsilon and end + epsilon < self.ends[i]
+
+def _field_of_view(cell, r, opaque, neighbours, dist, center, corners):
+    """Finds the visible cells, given functions describing the grid"""
+    (vx, vy) = center(*cell)
+    yield cell
+    shadows = Shadows()
+    ring = [other for other in neighbours(*cell) if dist(*cell, *other) == 1]
+    for d in range(1, r + 1):
+        if not ring:
+            return
+        seen = set(ring)
+        next_ring = []
+        next_seen = set()
+        new_shadows = []
+        # ring grows as light passes along it
+        for other in ring:
+            (x, y) = center(*other)
+            angle = atan2(y - vy, x - vx)
+            # Measure the corners relative to the center, so the span doesn't wrap around
+            offsets = [(atan2(cy - vy, cx - vx) - angle + pi) % (2 * pi) - pi for (cx, cy) in corners(*other)]
+            (start, end) = (angle + min(offsets), angle + max(offsets))
+            if shadows.covers(start, end):
+                continue
+            index = opaque.index(other)
+            if index is not None and not shadows.contains(angle):
+                yield other
+            if index is None or opaque.values[index]:
+                new_shadows.append((start, end))
+                continue
+            for neighbour in neighbours(*other):
+                nd = dist(*cell, *neighbour)
+                if nd == d and neighbour not in seen:
+                    seen.add(neighbour)
+                    ring.append(neighbour)
+                elif nd == d + 1 and neighbour not in next_seen:
+                    next_seen.add(neighbour)
+                    next_ring.append(neighbour)
+        # Cells in the same ring never shadow each other
+        for (start, end) in new_shadows:
+            shadows.add(start, end)
+        ring = next_ring
+
+def square_field_of_view(x, y, r, opaque):
+    """Returns the squares at most distance r from the given square that are visible from its center.
+    opaque is a SquareRectArray with truthy values for squares that cannot be seen through."""
+    return _field_of_view((x, y), r, opaque, square_neighbours, square_dist, square_center, square_corners)
+
+def tri_field_of_view(a, b, c, r, opaque):
+    """Returns the tris at most distance r from the given tri that are visible from its center.
+    opaque is a TriRectArray with truthy values for tris that cannot be seen through."""
+    return _field_of_view((a, b, c), r, opaque, tri_neighbours, tri_dist, tri_center, tri_corners)
+
+def hex_field_of_view(x, y, z, r, opaque):
+    """Returns the hexes at most distance r from the given hex that are visible from its center.
+    opaque is a HexRectArray with truthy values for hexes that cannot be seen through."""
+    return _field_of_view((x, y, z), r, opaque, hex_neighbours, hex_dist, hex_center, hex_corners)
+
+def trihex_field_of_view(a, b, c, r, opaque):
+    """Returns the trihexes at most distance r from the given trihex that are visible from its center.
+    opaque is a TrihexRectArray with truthy values for trihexes that cannot be seen through."""
+    return _field_of_view((a, b, c), r, opaque, trihex_neighbours, trihex_dist, trihex_center, trihex_corners)
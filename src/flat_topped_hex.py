@@ -23,8 +23,13 @@
 from __future__ import division
 from math import floor, ceil, sqrt
 from settings import edge_length
-from common import mod
-from updown_tri import pick_tri, tri_line_intersect, tri_rect_intersect
+from common import (
+    mod, lattice_ring, lattice_ring_index, lattice_ring_deindex, spiral_ring,
+    span_difference, merge_spans, pack_pair, unpack_pair, morton_index,
+    morton_deindex, curve_order, hilbert_index, hilbert_deindex, Grid,
+    identity_layout,
+)
+from updown_tri import pick_tri, tri_line_intersect, tri_rect_intersect_spans, tri_polygon_intersect_spans, tri_circle_intersect_spans, TriGrid
 
 sqrt3 = sqrt(3)
 
@@ -98,6 +103,72 @@ def hex_dist(x1, y1, z1, x2, y2, z2):
     """Returns how many steps one hex is from another"""
     return (abs(x1 - x2) + abs(y1 - y2) + abs(z1 - z2)) // 2
 
+# Vertices and Edges ##########################################################
+
+# Vertices are identified by three integer co-ordinates that sum to 1 or -1.
+# They are positioned by hex_center, as noted there.
+# Edges are identified by the sum of the co-ordinates of the two vertices at each end,
+# which is the same as the sum of the co-ordinates of the two hexes either side.
+# They sum to zero, and exactly one co-ordinate is even.
+# The position of an edge's midpoint is half of hex_center of the edge.
+
+def hex_vertices(x, y, z):
+    """Returns the six vertices of a given hex.
+    These are in the same order as hex_corners"""
+    return [
+        (x    , y    , z - 1),
+        (x    , y + 1, z    ),
+        (x - 1, y    , z    ),
+        (x    , y    , z + 1),
+        (x    , y - 1, z    ),
+        (x + 1, y    , z    ),
+    ]
+
+def hex_vertex_hexes(x, y, z):
+    """Returns the three hexes that touch a given vertex"""
+    if x + y + z == 1:
+        return [
+            (x - 1, y    , z    ),
+            (x    , y - 1, z    ),
+            (x    , y    , z - 1),
+        ]
+    else:
+        return [
+            (x + 1, y    , z    ),
+            (x    , y + 1, z    ),
+            (x    , y    , z + 1),
+        ]
+
+def hex_edges(x, y, z):
+    """Returns the six edges of a given hex.
+    The ith edge runs from the ith vertex of hex_vertices to the next one."""
+    v = hex_vertices(x, y, z)
+    return [tuple(p + q for p, q in zip(v[i], v[(i + 1) % 6])) for i in range(6)]
+
+def hex_edge_center(x, y, z):
+    """Returns the midpoint of a given edge in cartesian co-ordinates"""
+    (px, py) = hex_center(x, y, z)
+    return (px / 2, py / 2)
+
+def hex_edge_vertices(x, y, z):
+    """Returns the two vertices at either end of a given edge.
+    The first sums to -1, and the second to 1"""
+    # The odd co-ordinates of the midpoint are rounded down or up.
+    return [
+        (x // 2, y // 2, z // 2),
+        (-(-x // 2), -(-y // 2), -(-z // 2)),
+    ]
+
+def hex_edge_hexes(x, y, z):
+    """Returns the two hexes either side of a given edge"""
+    # One odd co-ordinate of the midpoint is rounded down, the other up.
+    if x % 2 == 0:
+        return [(x // 2, (y - 1) // 2, (z + 1) // 2), (x // 2, (y + 1) // 2, (z - 1) // 2)]
+    if y % 2 == 0:
+        return [((x + 1) // 2, y // 2, (z - 1) // 2), ((x - 1) // 2, y // 2, (z + 1) // 2)]
+    else:
+        return [((x - 1) // 2, (y + 1) // 2, z // 2), ((x + 1) // 2, (y - 1) // 2, z // 2)]
+
 # Symmetry #####################################################################
 
 def hex_rotate_60(x, y, z, n = 1):
@@ -148,10 +219,55 @@ def hex_disc(x, y, z, r):
             dz = -dx - dy
             yield (x + dx, y + dy, z + dz)
 
+def hex_ring(x, y, z, r):
+    """Returns the hexes that are exactly distance r from the given hex,
+    in counter clockwise order starting from the upper right"""
+    for (dx, dy, dz) in lattice_ring(0, 2 * r):
+        yield (x + dx, y + dy, z + dz)
+
+def hex_spiral(x, y, z, r):
+    """Returns the hexes that are at most distance r from the given hex,
+    ordered by distance, then in counter clockwise order"""
+    for i in range(r + 1):
+        yield from hex_ring(x, y, z, i)
+
+def hex_disc_size(r):
+    """Returns the number of hexes at most distance r from a given hex.
+    Equivalent to len(list(hex_disc(...)))"""
+    return 3 * r * r + 3 * r + 1
+
+def hex_disc_index(x, y, z, center_x, center_y, center_z, r):
+    """Given a hex and a disc, gives a linear position of the hex.
+    The index is an integer between zero and hex_disc_size - 1.
+    This is useful for array storage of discs.
+    Returns None if the hex is not in the disc.
+    Equivalent to list(hex_spiral(...)).index((x, y, z))"""
+    d = hex_dist(x, y, z, center_x, center_y, center_z)
+    if d > r:
+        return None
+    if d == 0:
+        return 0
+    return hex_disc_size(d - 1) + lattice_ring_index(0, 2 * d, x - center_x, y - center_y, z - center_z)
+
+def hex_disc_deindex(index, center_x, center_y, center_z, r):
+    """Performs the inverse of hex_disc_index
+    Equivalent to list(hex_spiral(...))[index]"""
+    if index < 0 or index >= hex_disc_size(r):
+        raise Exception("Hex is not inside disc")
+    d = spiral_ring(index, hex_disc_size)
+    if d > 0:
+        index -= hex_disc_size(d - 1)
+    (dx, dy, dz) = lattice_ring_deindex(0, 2 * d, index)
+    return (center_x + dx, center_y + dy, center_z + dz)
+
 def hex_line_intersect(x1, y1, x2, y2):
     """Returns hexes that intersect the line specified in cartesian co-ordinates"""
+    return _tri_line_to_hexes(tri_line_intersect(x1, y1, x2, y2))
+
+def _tri_line_to_hexes(tris):
+    """Returns the hexes containing a line of tris, without repeats"""
     prev = None
-    for (a, b, c) in tri_line_intersect(x1, y1, x2, y2):
+    for (a, b, c) in tris:
         hex = tri_to_hex(a, b, c)
         if hex != prev:
             yield hex
@@ -161,27 +277,109 @@ def hex_line(x1, y1, z1, x2, y2, z2):
     """Returns the hexes in a shortest path from one hex to another, staying as close to the straight line as possible"""
     # Note that drawing a straight line from one hex to another can touch hexes not returned by this method.
     n = hex_dist(x1, y1, z1, x2, y2, z2)
-    c1 = hex_center(x1, y1, z1)
-    c2 = hex_center(x2, y2, z2)
+    if n == 0:
+        yield (x1, y1, z1)
+        return
+    # This picks the hex at n + 1 evenly spaced points along the line, like pick_hex,
+    # but using only integers. The center of a hex is at (x - y, y - z, z - x) along
+    # the triangle axes used by pick_tri, so we track n times each point along those axes.
+    fa = (x1 - y1) * n
+    fb = (y1 - z1) * n
+    fc = (z1 - x1) * n
+    da = (x2 - y2) - (x1 - y1)
+    db = (y2 - z2) - (y1 - z1)
+    dc = (z2 - x2) - (z1 - x1)
     for i in range(0, n + 1):
-        t = i / n
-        px = c1[0] + (c2[0] - c1[0]) * t
-        py = c1[1] + (c2[1] - c1[1]) * t
-        yield pick_hex(px, py)
+        # Same as pick_tri
+        a = -(-fa // n)
+        b = fb // n + 1
+        c = -(-fc // n)
+        # Same as tri_to_hex, as round(k / 3) == (k + 1) // 3 for integer k
+        yield ((a - c + 1) // 3, (b - a + 1) // 3, (c - b + 1) // 3)
+        fa += da
+        fb += db
+        fc += dc
 
 def hex_rect_intersect(x, y, width, height):
-    """Returns the hexes that intersect the rectangle specified in cartesian co-ordinates"""
-    prev = None
-    first_b = None
-    for (a, b, c) in tri_rect_intersect(x, y, width, height):
-        if first_b is None: first_b = b
-        hex = tri_to_hex(a, b, c)
-        # Tri must be in the bottom half of the hex, except the first row
-        # This stops double counting
-        if first_b == b or hex[1] - hex[2] == b:
-            if hex != prev:
-                yield hex
-                prev = hex
+    """Returns the hexes that intersect the rectangle specified in cartesian co-ordinates.
+    Hexes are returned column by column, from left to right, and bottom to top in each column."""
+    for (x, miny, maxy) in hex_rect_intersect_spans(x, y, width, height):
+        for y in range(miny, maxy + 1):
+            yield (x, y, -x - y)
+
+def hex_rect_intersect_size(x, y, width, height):
+    """Returns the number of hexes that intersect the rectangle specified in cartesian co-ordinates.
+    Equivalent to len(list(hex_rect_intersect(...)))"""
+    return sum(maxy - miny + 1 for (x, miny, maxy) in hex_rect_intersect_spans(x, y, width, height))
+
+def _hex_y(x, b):
+    """Returns y of the hex in column x that contains part of row b of tris"""
+    a = (3 * x - b) // 2 + 1
+    return (b - a + 1) // 3
+
+def _hex_spans(tri_spans):
+    """Converts spans of tris, (b, minu, maxu), into column spans of the hexes containing them"""
+    return merge_spans(
+        (x, _hex_y(x, b), _hex_y(x, b))
+        for (b, minu, maxu) in tri_spans
+        for x in range((minu + 1) // 3, (maxu + 1) // 3 + 1)
+    )
+
+def hex_rect_intersect_spans(x, y, width, height):
+    """Returns the hexes that intersect the rectangle specified in cartesian co-ordinates,
+    as one span (x, miny, maxy) per column, covering the hexes from (x, miny, -x - miny) to (x, maxy, -x - maxy) inclusive.
+    Columns match the layout of hex_rect, so each span is a contiguous slice of a rectangle's storage."""
+    return _hex_rect_spans(list(tri_rect_intersect_spans(x, y, width, height)))
+
+def _hex_rect_spans(rows):
+    """Converts the spans of tris intersecting a rectangle into column spans of the hexes containing them.
+    Unlike _hex_spans, this doesn't visit every hex, as it relies on each row and column having a single span."""
+    if not rows:
+        return
+    # Each row of tris crosses every column, with the tris where round((a - c) / 3) == x in the same hex.
+    columns = [((minu + 1) // 3, (maxu + 1) // 3) for (b, minu, maxu) in rows]
+    # The rows crossing each column are contiguous, so find the first and last.
+    # Only columns at the edges of the rect miss any rows, so these loops are short.
+    for x in range(min(minx for (minx, maxx) in columns), max(maxx for (minx, maxx) in columns) + 1):
+        first = 0
+        while not columns[first][0] <= x <= columns[first][1]:
+            first += 1
+        last = len(rows) - 1
+        while not columns[last][0] <= x <= columns[last][1]:
+            last -= 1
+        yield (x, _hex_y(x, rows[first][0]), _hex_y(x, rows[last][0]))
+
+def hex_rect_intersect_delta(x1, y1, width1, height1, x2, y2, width2, height2):
+    """Given a rectangle specified in cartesian co-ordinates that moves or resizes from (x1, y1, width1, height1) to (x2, y2, width2, height2),
+    returns a pair of lists of the hexes that start intersecting it, and those that stop intersecting it.
+    Both are lists of spans (x, miny, maxy), as in hex_rect_intersect_spans.
+    For a small move, this is much less than the hexes in the whole rectangle."""
+    old = list(hex_rect_intersect_spans(x1, y1, width1, height1))
+    new = list(hex_rect_intersect_spans(x2, y2, width2, height2))
+    return (list(span_difference(new, old)), list(span_difference(old, new)))
+
+def hex_polygon_intersect(points):
+    """Returns the hexes that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners.
+    The polygon can be concave, but its edges shouldn't cross."""
+    for (x, miny, maxy) in hex_polygon_intersect_spans(points):
+        for y in range(miny, maxy + 1):
+            yield (x, y, -x - y)
+
+def hex_polygon_intersect_spans(points):
+    """Returns the hexes that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners,
+    as spans (x, miny, maxy), as in hex_rect_intersect_spans. Concave polygons can have several spans per column."""
+    return _hex_spans(tri_polygon_intersect_spans(points))
+
+def hex_circle_intersect(x, y, r):
+    """Returns the hexes that intersect the circle with center (x, y) and radius r in cartesian co-ordinates"""
+    for (x, miny, maxy) in hex_circle_intersect_spans(x, y, r):
+        for y in range(miny, maxy + 1):
+            yield (x, y, -x - y)
+
+def hex_circle_intersect_spans(x, y, r):
+    """Returns the hexes that intersect the circle with center (x, y) and radius r in cartesian co-ordinates,
+    as spans (x, miny, maxy), as in hex_rect_intersect_spans."""
+    return _hex_spans(tri_circle_intersect_spans(x, y, r))
 
 def hex_rect(rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
     """Returns the hexes in a rectangle that includes the given hex in the bottom left, 
@@ -222,9 +420,10 @@ def hex_rect_index(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom=Fa
     This is useful for array storage of rectangles.
     Returns None if the hex is not in the rectangle.
     Equivalent to list(hex_rect(...)).index((x, y, z))"""
-    (dx, dy) = hex_rect_knoll(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
-    if dx < 0 or dx >= width:
+    knoll = hex_rect_knoll(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    if knoll is None:
         return None
+    (dx, dy) = knoll
     odd_height = int(inc_bottom) + int(inc_top) - 1
     # Number of hexes in rect with x value smaller than searched hex.
     left_count = height * dx + odd_height * (dx // 2)
@@ -253,6 +452,128 @@ def hex_rect_size(rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_t
     odd_height = int(inc_bottom) + int(inc_top) - 1
     return height * width + odd_height * (width // 2)
 
+# The curve functions give other orders for the hexes of a rectangle, following a space filling curve
+# through the co-ordinates from hex_rect_knoll, see common.py.
+# Nearby hexes are more often stored close together than with hex_rect_index, but indices can skip values.
+
+def hex_rect_morton_index(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Like hex_rect_index, but gives the position of the hex along the Z-order curve through the rectangle.
+    Returns None if the hex is not in the rectangle."""
+    if hex_rect_index(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) is None:
+        return None
+    return morton_index(*hex_rect_knoll(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top))
+
+def hex_rect_morton_deindex(index, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Performs the inverse of hex_rect_morton_index"""
+    hex = hex_rect_unknoll(*morton_deindex(index), rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    if hex_rect_index(*hex, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) is None:
+        raise Exception("Hex is not inside rectangle")
+    return hex
+
+def hex_rect_hilbert_index(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Like hex_rect_index, but gives the position of the hex along the Hilbert curve through the rectangle.
+    Returns None if the hex is not in the rectangle."""
+    if hex_rect_index(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) is None:
+        return None
+    return hilbert_index(*hex_rect_knoll(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top), curve_order(width, height + int(inc_bottom and inc_top)))
+
+def hex_rect_hilbert_deindex(index, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Performs the inverse of hex_rect_hilbert_index"""
+    hex = hex_rect_unknoll(*hilbert_deindex(index, curve_order(width, height + int(inc_bottom and inc_top))), rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    if hex_rect_index(*hex, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) is None:
+        raise Exception("Hex is not inside rectangle")
+    return hex
+
+# The vertices of a rectangle lie on vertical lines, two between each pair of neighbouring columns,
+# and one more either side. Vertices are ordered line by line from left to right, then from bottom to top,
+# like hex_rect. Along a line, y - z increases by two with each vertex, and x + y + z alternates between -1 and 1.
+
+def _hex_rect_vertex_line(line, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top):
+    """Returns the number of vertices in a line of vertices of a rectangle, and y - z of the lowest one"""
+    # Each line touches the top and bottom corners of the hexes in one column,
+    # and the left or right corner of the hexes in the next, which lie between them.
+    # So the first column decides the line, unless it is outside the rectangle, or empty.
+    odd_height = int(inc_bottom) + int(inc_top) - 1
+    if line % 2 == 0:
+        columns = (line // 2 - 1, line // 2)
+    else:
+        columns = (line // 2, line // 2 - 1)
+    for (dx, extra) in zip(columns, (1, 0)):
+        column_height = height + (dx % 2) * odd_height
+        if 0 <= dx < width and column_height > 0:
+            (x, y, z) = hex_rect_unknoll(dx, 0, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+            return (column_height + extra, y - z - extra)
+    return (0, 0)
+
+def _hex_rect_vertex_groups(rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top):
+    """Returns how many groups of four lines of vertices of a rectangle repeat the same counts,
+    and the number of vertices in each group"""
+    # Lines 4k+1 to 4k+4 only depend on columns 2k - 1 to 2k + 2, which repeat in pairs.
+    # The first group starts at line 5, as lines 1 to 4 depend on the missing column -1.
+    groups = max(0, (width - 3) // 2)
+    group_size = sum(_hex_rect_vertex_line(line, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)[0] for line in range(5, 9))
+    return (groups, group_size)
+
+def _hex_rect_vertex_first(line, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top):
+    """Returns the number of vertices of a rectangle on lines before the given line"""
+    (groups, group_size) = _hex_rect_vertex_groups(rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    skip = min(groups, max(0, (line - 5) // 4))
+    first = skip * group_size
+    for l in list(range(min(line, 5))) + list(range(5 + 4 * skip, line)):
+        first += _hex_rect_vertex_line(l, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)[0]
+    return first
+
+def _hex_rect_vertex(line, t, rect_x):
+    """Returns the vertex on the given line of a rectangle with y - z equal to t"""
+    n = 1 if line % 2 else -1
+    x = rect_x + (line - 1) // 2
+    return (x, (n - x + t) // 2, (n - x - t) // 2)
+
+def hex_rect_vertices(rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Returns the vertices of all the hexes in a rectangle, in the order used by hex_rect_vertex_index"""
+    for line in range(2 * width + 2):
+        (count, bottom) = _hex_rect_vertex_line(line, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+        for i in range(count):
+            yield _hex_rect_vertex(line, bottom + 2 * i, rect_x)
+
+def hex_rect_vertex_index(x, y, z, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Given a vertex and a rectangle, gives a linear position of the vertex.
+    The index is an integer between zero and hex_rect_vertex_size - 1.
+    This is useful for storing a vertex buffer for the rectangle.
+    Returns None if the vertex is not on a hex of the rectangle."""
+    line = 2 * (x - rect_x) + (1 if x + y + z == 1 else 2)
+    if line < 0 or line > 2 * width + 1:
+        return None
+    (count, bottom) = _hex_rect_vertex_line(line, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    i = (y - z - bottom) // 2
+    if i < 0 or i >= count:
+        return None
+    return _hex_rect_vertex_first(line, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) + i
+
+def hex_rect_vertex_deindex(index, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Performs the inverse of hex_rect_vertex_index"""
+    if index < 0:
+        raise Exception("Vertex is not inside rectangle")
+    # Skip whole groups of four lines, then walk the remaining lines one at a time
+    (groups, group_size) = _hex_rect_vertex_groups(rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    line = 0
+    before = _hex_rect_vertex_first(5, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    if group_size > 0 and index >= before:
+        skip = min(groups, (index - before) // group_size)
+        line = 5 + 4 * skip
+        index -= before + skip * group_size
+    while line <= 2 * width + 1:
+        (count, bottom) = _hex_rect_vertex_line(line, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+        if index < count:
+            return _hex_rect_vertex(line, bottom + 2 * index, rect_x)
+        index -= count
+        line += 1
+    raise Exception("Vertex is not inside rectangle")
+
+def hex_rect_vertex_size(rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Returns the number of vertices of the hexes in a given rectangle."""
+    return _hex_rect_vertex_first(2 * width + 2, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+
 # Nesting ## ###################################################################
  
 # Based on work in https://observablehq.com/@sanderevers/hexagon-tiling-of-an-hexagonal-grid
@@ -288,4 +609,77 @@ def hex_parent_center_child(x, y, z):
 def hex_parent_children(x, y, z):
     """Returns all children hex of a given parent hex"""
     cx, cy, cz = hex_parent_center_child(x, y, z)
-    return hex_disc(cx, cy, cz, parent_radius)
\ No newline at end of file
+    return hex_disc(cx, cy, cz, parent_radius)
+
+# Packed Keys ##################################################################
+
+# z is redundant, so only x and y are packed, with common.pack_pair.
+# So x and y must be from -2**31 to 2**31 - 1.
+
+def hex_pack(x, y, z):
+    """Packs a hex into a single integer key"""
+    return pack_pair(x, y)
+
+def hex_unpack(key):
+    """Returns the hex packed by hex_pack"""
+    (x, y) = unpack_pair(key)
+    return (x, y, -x - y)
+
+# Grid Objects #################################################################
+
+# The functions above all use the edge_length from settings.
+# HexGrid does the same calculations with its own edge length, so grids of different sizes can be used side by side,
+# and an optional layout, see common.py, for placing the grid in world co-ordinates.
+# Its methods work like the functions of the same name, without the hex_ prefix.
+
+class HexGrid(Grid):
+    """A grid of hexes with a given edge length and layout, see Grid in common.py.
+    The matrix used by center is worked out once, when the grid is created.
+    Other cartesian queries use the triangles that make up each hex, from the TriGrid tris."""
+    __slots__ = ("center_matrix", "tris")
+    vertices = staticmethod(hex_vertices)
+
+    def __init__(self, edge_length=1, layout=identity_layout):
+        Grid.__init__(self, edge_length, layout)
+        # Rows give world x and y in terms of the hex co-ordinates and a constant, as in hex_center
+        self.center_matrix = self.world_matrix((
+            (1,      -0.5,       -0.5, 0),
+            (0, sqrt3 / 2, -sqrt3 / 2, 0),
+        ))
+        self.tris = TriGrid(edge_length, layout)
+
+    def center(self, x, y, z):
+        """Returns the center of a given hex in cartesian co-ordinates"""
+        ((xx, xy, xz, xt), (yx, yy, yz, yt)) = self.center_matrix
+        return (xx * x + xy * y + xz * z + xt, yx * x + yy * y + yz * z + yt)
+
+    def pick(self, x, y):
+        """Returns the hex that contains a given cartesian co-ordinate point"""
+        return tri_to_hex(*self.tris.pick(x, y))
+
+    def vertex_center(self, x, y, z):
+        """Returns the position of a given vertex in cartesian co-ordinates"""
+        return self.center(x, y, z)
+
+    def edge_center(self, x, y, z):
+        """Returns the midpoint of a given edge in cartesian co-ordinates"""
+        return self.center(x / 2, y / 2, z / 2)
+
+    def _line_intersect(self, x1, y1, x2, y2):
+        return _tri_line_to_hexes(self.tris._line_intersect(x1, y1, x2, y2))
+
+    def _rect_intersect_spans(self, x, y, width, height):
+        return _hex_rect_spans(list(self.tris._rect_intersect_spans(x, y, width, height)))
+
+    def _polygon_intersect_spans(self, points):
+        return _hex_spans(self.tris._polygon_intersect_spans(points))
+
+    def _circle_intersect_spans(self, x, y, r):
+        return _hex_spans(self.tris._circle_intersect_spans(x, y, r))
+
+    @staticmethod
+    def span_cells(spans):
+        """Returns the hexes covered by spans (x, miny, maxy)"""
+        for (x, miny, maxy) in spans:
+            for y in range(miny, maxy + 1):
+                yield (x, y, -x - y)
@@ -0,0 +1,306 @@
+# Vectorized Flat-topped cube-cordinate hexes
+# This module mirrors functions from flat_topped_hex, but works on many points or hexes at once using numpy.
+#
+# Points are passed as float arrays of shape (N, 2), with each row being an x, y cartesian co-ordinate.
+# Hexes are passed as integer arrays of shape (N, 3), with each row being an x, y, z co-ordinate.
+# Any extra leading dimensions are preserved, so (N, M, 3) works too.
+
+import functools
+import numpy as np
+import flat_topped_hex
+from settings import edge_length
+from updown_tri_np import tri_march
+from flat_topped_hex import sqrt3
+from updown_tri_np import pick_tri, tri_grid_pick
+from common import curve_order
+from common_np import mesh, affine, pack_pair, unpack_pair, morton_index, morton_deindex, hilbert_index, hilbert_deindex, lattice_ring_index, lattice_ring_deindex, spiral_ring, march_cells, march_hits
+
+# Basics #######################################################################
+
+def hex_center(hexes, dtype=float):
+    """Returns the centers of the given hexes in cartesian co-ordinates, as an (N, 2) array"""
+    hexes = np.asarray(hexes)
+    x = hexes[..., 0]
+    y = hexes[..., 1]
+    z = hexes[..., 2]
+    return np.stack([
+        (1 * x      - 0.5 * y       - 0.5 * z) * edge_length,
+        (       sqrt3 / 2 * y - sqrt3 / 2 * z) * edge_length,
+    ], axis=-1).astype(dtype)
+
+# Offsets of each corner from the hex, in the same order as flat_topped_hex.hex_corners
+hex_corner_offsets = np.array([
+    ( 0,  0, -1),
+    ( 0,  1,  0),
+    (-1,  0,  0),
+    ( 0,  0,  1),
+    ( 0, -1,  0),
+    ( 1,  0,  0),
+])
+
+def hex_corners(hexes, dtype=np.float32):
+    """Returns the six corners of the given hexes in cartesian co-ordinates, as an (N, 6, 2) array.
+    The result is contiguous, so is suitable for uploading directly as a vertex buffer."""
+    hexes = np.asarray(hexes)
+    return hex_center(hexes[..., None, :] + hex_corner_offsets, dtype)
+
+def tri_to_hex(tris):
+    """Given triangle co-ordinates as specified in updown_tri, finds the hexes that contain them"""
+    tris = np.asarray(tris)
+    x = tris[..., 0]
+    y = tris[..., 1]
+    z = tris[..., 2]
+    return np.stack([
+        np.round((x - z) / 3),
+        np.round((y - x) / 3),
+        np.round((z - y) / 3),
+    ], axis=-1).astype(np.int64)
+
+def pick_hex(points):
+    """Returns the hexes that contain the given cartesian co-ordinate points"""
+    return tri_to_hex(pick_tri(points))
+
+def hex_grid_center(grid, hexes, dtype=float):
+    """Returns the centers of the given hexes in the world co-ordinates of grid, a HexGrid, as an (N, 2) array"""
+    return affine(grid.center_matrix, hexes).astype(dtype)
+
+def hex_grid_pick(grid, points):
+    """Returns the hexes of grid, a HexGrid, that contain the given world co-ordinate points"""
+    return tri_to_hex(tri_grid_pick(grid.tris, points))
+
+# Offsets of each neighbour from the hex, in the same order as flat_topped_hex.hex_neighbours
+hex_neighbour_offsets = np.array([
+    ( 1,  0, -1),
+    ( 0,  1, -1),
+    (-1,  1,  0),
+    (-1,  0,  1),
+    ( 0, -1,  1),
+    ( 1, -1,  0),
+])
+
+def hex_neighbours(hexes):
+    """Returns the six hexes that share an edge with each given hex, as an (N, 6, 3) array"""
+    hexes = np.asarray(hexes)
+    return hexes[..., None, :] + hex_neighbour_offsets
+
+# Packed Keys ##################################################################
+
+# Keys are packed as in flat_topped_hex.hex_pack, but as int64 arrays.
+
+def hex_pack(hexes):
+    """Packs the given hexes into an int64 array of keys"""
+    hexes = np.asarray(hexes)
+    return pack_pair(hexes[..., 0], hexes[..., 1])
+
+def hex_unpack(keys):
+    """Returns the hexes packed by hex_pack, as an (N, 3) array"""
+    (x, y) = unpack_pair(keys)
+    return np.stack([x, y, -x - y], axis=-1)
+
+# As packing is linear, each neighbour's key differs by the key of its offset
+hex_neighbour_key_offsets = hex_pack(hex_neighbour_offsets)
+
+def hex_key_neighbours(keys):
+    """Returns the keys of the six hexes that share an edge with each given key, as an (N, 6) array,
+    in the same order as hex_neighbours"""
+    return np.asarray(keys, dtype=np.int64)[..., None] + hex_neighbour_key_offsets
+
+# Shapes #######################################################################
+
+# The rect functions take the same rectangle arguments as in flat_topped_hex, and
+# return -1 rather than None for hexes that are not in the rectangle.
+
+def hex_rect_knoll(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Given hexes and a rectangle, gives an (N, 2) array of integer co-ordinates that identify each hex in the rectangle.
+    Unlike hex_rect_index, this does not check if the hexes are inside the rectangle."""
+    hexes = np.asarray(hexes)
+    dx = hexes[..., 0] - rect_x
+    # y value of hex at bottom of the column that each hex is in
+    base_dy = rect_y - (dx // 2) - (dx % 2) * int(inc_bottom)
+    return np.stack([dx, hexes[..., 1] - base_dy], axis=-1)
+
+def hex_rect_unknoll(knolls, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Given an (N, 2) array of co-ordinate pairs and a rectangle, reverses hex_rect_knoll"""
+    knolls = np.asarray(knolls)
+    dx = knolls[..., 0]
+    dy = knolls[..., 1]
+    oy = - (dx // 2) - (dx % 2) * int(inc_bottom)
+    return np.stack([rect_x + dx, rect_y + oy + dy, rect_z - dx - oy - dy], axis=-1)
+
+def hex_rect_index(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Given hexes and a rectangle, gives the linear position of each hex.
+    Each index is an integer between zero and hex_rect_size - 1, or -1 if the hex is not in the rectangle."""
+    knolls = hex_rect_knoll(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    dx = knolls[..., 0]
+    dy = knolls[..., 1]
+    odd_height = int(inc_bottom) + int(inc_top) - 1
+    # Number of hexes in rect with x value smaller than each hex.
+    left_count = height * dx + odd_height * (dx // 2)
+    inside = (dx >= 0) & (dx < width) & (dy >= 0) & (dy < height + (dx % 2) * odd_height)
+    return np.where(inside, left_count + dy, -1)
+
+def hex_rect_deindex(indices, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Performs the inverse of hex_rect_index"""
+    indices = np.asarray(indices)
+    odd_height = int(inc_bottom) + int(inc_top) - 1
+    if np.any((indices < 0) | (indices >= height * width + odd_height * (width // 2))):
+        raise Exception("Hex is not inside rectangle")
+    two_col = height + height + odd_height
+    dx = 2 * (indices // two_col)
+    indices = indices - dx // 2 * two_col
+    second = indices >= height
+    dx = dx + second
+    dy = indices - second * height
+    return hex_rect_unknoll(np.stack([dx, dy], axis=-1), rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+
+def hex_rect_morton_index(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Vectorized version of flat_topped_hex.hex_rect_morton_index, giving -1 for hexes not in the rectangle"""
+    knolls = hex_rect_knoll(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    inside = hex_rect_index(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) >= 0
+    return np.where(inside, morton_index(knolls[..., 0], knolls[..., 1]), -1)
+
+def hex_rect_morton_deindex(indices, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Performs the inverse of hex_rect_morton_index"""
+    hexes = hex_rect_unknoll(np.stack(morton_deindex(indices), axis=-1), rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    if np.any(hex_rect_index(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) < 0):
+        raise Exception("Hex is not inside rectangle")
+    return hexes
+
+def hex_rect_hilbert_index(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Vectorized version of flat_topped_hex.hex_rect_hilbert_index, giving -1 for hexes not in the rectangle"""
+    knolls = hex_rect_knoll(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    inside = hex_rect_index(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) >= 0
+    return np.where(inside, hilbert_index(knolls[..., 0], knolls[..., 1], curve_order(width, height + int(inc_bottom and inc_top))), -1)
+
+def hex_rect_hilbert_deindex(indices, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False):
+    """Performs the inverse of hex_rect_hilbert_index"""
+    hexes = hex_rect_unknoll(np.stack(hilbert_deindex(indices, curve_order(width, height + int(inc_bottom and inc_top))), axis=-1), rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+    if np.any(hex_rect_index(hexes, rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) < 0):
+        raise Exception("Hex is not inside rectangle")
+    return hexes
+
+def hex_disc_index(hexes, x, y, z, r):
+    """Given hexes and a disc, gives the linear position of each hex, as in flat_topped_hex.hex_disc_index.
+    Each index is an integer between zero and hex_disc_size - 1, or -1 if the hex is not in the disc."""
+    offsets = np.asarray(hexes) - (x, y, z)
+    d = np.abs(offsets).sum(axis=-1) // 2
+    index = np.where(d > 0, 3 * d * d - 3 * d + 1, 0) + lattice_ring_index(0, 2 * d, offsets)
+    return np.where(d <= r, index, -1)
+
+def hex_disc_deindex(indices, x, y, z, r):
+    """Performs the inverse of hex_disc_index"""
+    indices = np.asarray(indices)
+    if np.any((indices < 0) | (indices >= 3 * r * r + 3 * r + 1)):
+        raise Exception("Hex is not inside disc")
+    d = spiral_ring(indices, lambda r: 3 * r * r + 3 * r + 1)
+    indices = indices - np.where(d > 0, 3 * d * d - 3 * d + 1, 0)
+    return lattice_ring_deindex(0, 2 * d, indices) + (x, y, z)
+
+# The disc offset tables are cached, as disc shapes only depend on the radius.
+# The tables are read-only, so are safe to share between callers.
+
+@functools.lru_cache(maxsize=64)
+def hex_disc_offsets(r):
+    """Returns the offsets from a hex of every hex at most distance r from it, as an (M, 3) array.
+    These are in the same order as flat_topped_hex.hex_spiral, so row i is hex_disc_deindex(i, ...)"""
+    offsets = np.array(list(flat_topped_hex.hex_spiral(0, 0, 0, r)))
+    offsets.setflags(write=False)
+    return offsets
+
+def hex_disc(hexes, r):
+    """Returns the hexes at most distance r from each given hex, as an (N, M, 3) array.
+    These are in the same order as flat_topped_hex.hex_spiral"""
+    hexes = np.asarray(hexes)
+    return hexes[..., None, :] + hex_disc_offsets(r)
+
+# The line functions work like those in updown_tri_np, marching through triangles and converting them to hexes.
+
+def hex_line(hexes1, hexes2):
+    """Returns the hexes in a shortest path between each pair of hexes, as in flat_topped_hex.hex_line.
+    Returns a pair of hexes and offsets, like hex_line_intersect."""
+    hexes1, hexes2 = np.broadcast_arrays(np.asarray(hexes1, dtype=np.int64), np.asarray(hexes2, dtype=np.int64))
+    hexes1 = hexes1.reshape(-1, 3)
+    hexes2 = hexes2.reshape(-1, 3)
+    n = np.abs(hexes2 - hexes1).sum(axis=-1) // 2
+    offsets = np.concatenate([[0], np.cumsum(n + 1)])
+    # Number each point along each line
+    lines = np.repeat(np.arange(len(n)), n + 1)
+    i = np.arange(offsets[-1]) - offsets[lines]
+    # Track n times the position along the triangle axes, as flat_topped_hex.hex_line does
+    f1 = hexes1 - np.roll(hexes1, -1, axis=-1)
+    f2 = hexes2 - np.roll(hexes2, -1, axis=-1)
+    m = np.maximum(n, 1)[lines, None]
+    f = f1[lines] * m + (f2 - f1)[lines] * i[:, None]
+    a = -(-f[:, 0] // m[:, 0])
+    b = f[:, 1] // m[:, 0] + 1
+    c = -(-f[:, 2] // m[:, 0])
+    return np.stack([(a - c + 1) // 3, (b - a + 1) // 3, (c - b + 1) // 3], axis=-1), offsets
+
+def hex_line_intersect(starts, ends):
+    """Returns the hexes that intersect each line specified in cartesian co-ordinates, as a pair of hexes and offsets"""
+    return march_cells(tri_march, starts, ends, tri_to_hex)
+
+def hex_raycast(starts, ends, opaque):
+    """Finds the first hex along each line that is opaque, i.e. truthy in opaque, a HexRectArray.
+    Hexes outside the rectangle of opaque also count as opaque. Lines stop at the first opaque hex.
+    Returns a pair, an (N, 3) array of hexes, and an (N,) boolean array that is false for lines that hit nothing.
+    Those lines give the hex containing their end point instead."""
+    return march_hits(tri_march, starts, ends, opaque, tri_to_hex)
+
+# Vertices and Edges ##########################################################
+
+def hex_vertices(hexes):
+    """Returns the six vertices of the given hexes, as an (N, 6, 3) array.
+    These are in the same order as hex_corners"""
+    hexes = np.asarray(hexes)
+    return hexes[..., None, :] + hex_corner_offsets
+
+def hex_edges(hexes):
+    """Returns the six edges of the given hexes, as an (N, 6, 3) array.
+    The ith edge runs from the ith vertex of hex_vertices to the next one."""
+    vertices = hex_vertices(hexes)
+    return vertices + np.roll(vertices, -1, axis=-2)
+
+def hex_mesh(hexes, index_dtype=np.uint32):
+    """Returns the distinct vertices of the given hexes, and how to index them.
+    Returns a pair, a (V, 3) array of vertices, and an (N, 6) index array, so that
+    vertices[indices[i]] is hex_vertices(hexes)[i].
+    Use hex_center(vertices, np.float32) to get a vertex buffer."""
+    return mesh(hex_vertices(hexes), index_dtype)
+
+# Nesting ######################################################################
+
+def hex_parent(hexes):
+    """Returns the parent hex containing each given hex, as in flat_topped_hex.hex_parent"""
+    hexes = np.asarray(hexes)
+    x = hexes[..., 0]
+    y = hexes[..., 1]
+    z = hexes[..., 2]
+    shift = flat_topped_hex.parent_shift
+    area = flat_topped_hex.parent_area
+    a = (z + y * shift) // area
+    b = (x + z * shift) // area
+    c = (y + x * shift) // area
+    return np.stack([
+        (1 + c - b) // 3,
+        (1 + a - c) // 3,
+        (1 + b - a) // 3,
+    ], axis=-1)
+
+def hex_parent_center_child(parents):
+    """Returns the central hex of each given parent hex, as in flat_topped_hex.hex_parent_center_child"""
+    parents = np.asarray(parents)
+    x = parents[..., 0]
+    y = parents[..., 1]
+    z = parents[..., 2]
+    shift = flat_topped_hex.parent_shift
+    return np.stack([
+        (shift * (x - y) + z - x) // 3,
+        (shift * (y - z) + x - y) // 3,
+        (shift * (z - x) + y - z) // 3,
+    ], axis=-1)
+
+def hex_parent_children(parents):
+    """Returns the children of each given parent hex, as an (N, M, 3) array.
+    These are the same hexes as flat_topped_hex.hex_parent_children, but in spiral order around the center child, as in hex_disc"""
+    return hex_disc(hex_parent_center_child(parents), flat_topped_hex.parent_radius)
@@ -27,8 +27,13 @@
 from __future__ import division
 from math import floor, ceil, sqrt
 from settings import edge_length
-from common import mod
-from updown_tri import pick_tri, tri_line_intersect, tri_rect_intersect
+from common import (
+    mod, lattice_ring, lattice_ring_index, lattice_ring_deindex, spiral_ring,
+    span_difference, merge_spans, pack_pair, unpack_pair, morton_index,
+    morton_deindex, curve_order, hilbert_index, hilbert_deindex, Grid,
+    identity_layout,
+)
+from updown_tri import pick_tri, tri_line_intersect, tri_line_intersect_thirds, tri_rect_intersect_spans, tri_polygon_intersect_spans, tri_circle_intersect_spans, TriGrid
 
 sqrt3 = sqrt(3)
 
@@ -133,25 +138,468 @@ def trihex_dist(a1, b1, c1, a2, b2, c2):
     """Returns how many steps one trihex is from another"""
     return abs(a1 - a2) + abs(b1 - b2) + abs(c1 - c2)
 
+# Vertices and Edges ##########################################################
+
+# Every vertex of the trihex grid is also a vertex of a triangle grid with the same edge length.
+# So vertices are identified with the co-ordinates from updown_tri, i.e. three integers summing to zero.
+# These are the same as doubling the co-ordinates of the trihex corners, and shifting them to sum to zero.
+# Vertices where all co-ordinates are even are hex centers, not vertices.
+# Edges are identified by the sum of the co-ordinates of the two vertices at each end.
+# Each edge separates a hex from a triangle.
+
+def trihex_vertex_center(a, b, c):
+    """Returns the position of a given vertex in cartesian co-ordinates"""
+    return trihex_center(a / 2, b / 2, c / 2)
+
+def trihex_vertices(a, b, c):
+    """Returns the three/six vertices of a given trihex.
+    These are in the same order as trihex_corners"""
+    n = a + b + c
+    if n == 0:
+        return [
+            (a * 2 + 1, b * 2 - 1, c * 2    ),
+            (a * 2    , b * 2 - 1, c * 2 + 1),
+            (a * 2 - 1, b * 2    , c * 2 + 1),
+            (a * 2 - 1, b * 2 + 1, c * 2    ),
+            (a * 2    , b * 2 + 1, c * 2 - 1),
+            (a * 2 + 1, b * 2    , c * 2 - 1),
+        ]
+    if n == 1:
+        return [
+            (a * 2    , b * 2 - 1, c * 2 - 1),
+            (a * 2 - 1, b * 2    , c * 2 - 1),
+            (a * 2 - 1, b * 2 - 1, c * 2    ),
+        ]
+    if n == -1:
+        return [
+            (a * 2    , b * 2 + 1, c * 2 + 1),
+            (a * 2 + 1, b * 2    , c * 2 + 1),
+            (a * 2 + 1, b * 2 + 1, c * 2    ),
+        ]
+
+def trihex_vertex_trihexes(a, b, c):
+    """Returns the two hexes and two triangles that touch a given vertex"""
+    # Exactly one co-ordinate is even. The other two are rounded down and/or up to find the cells.
+    if a % 2 == 0:
+        return [
+            (a // 2, (b - 1) // 2, (c + 1) // 2),
+            (a // 2, (b + 1) // 2, (c + 1) // 2),
+            (a // 2, (b + 1) // 2, (c - 1) // 2),
+            (a // 2, (b - 1) // 2, (c - 1) // 2),
+        ]
+    if b % 2 == 0:
+        return [
+            ((a + 1) // 2, b // 2, (c - 1) // 2),
+            ((a + 1) // 2, b // 2, (c + 1) // 2),
+            ((a - 1) // 2, b // 2, (c + 1) // 2),
+            ((a - 1) // 2, b // 2, (c - 1) // 2),
+        ]
+    else:
+        return [
+            ((a - 1) // 2, (b + 1) // 2, c // 2),
+            ((a + 1) // 2, (b + 1) // 2, c // 2),
+            ((a + 1) // 2, (b - 1) // 2, c // 2),
+            ((a - 1) // 2, (b - 1) // 2, c // 2),
+        ]
+
+def trihex_edges(a, b, c):
+    """Returns the three/six edges of a given trihex.
+    The ith edge runs from the ith vertex of trihex_vertices to the next one."""
+    v = trihex_vertices(a, b, c)
+    return [tuple(p + q for p, q in zip(v[i], v[(i + 1) % len(v)])) for i in range(len(v))]
+
+def trihex_edge_center(a, b, c):
+    """Returns the midpoint of a given edge in cartesian co-ordinates"""
+    return trihex_center(a / 4, b / 4, c / 4)
+
+def trihex_edge_vertices(a, b, c):
+    """Returns the two vertices at either end of a given edge"""
+    # Both vertices share the even co-ordinate. Each of the odd co-ordinates is
+    # rounded to an even number for one vertex, and to an odd number for the other.
+    def split(n):
+        lo, hi = (n - 1) // 2, (n + 1) // 2
+        return (lo, hi) if lo % 2 == 0 else (hi, lo)
+    if a % 2 == 0:
+        (b1, b2), (c2, c1) = split(b), split(c)
+        return [(a // 2, b1, c1), (a // 2, b2, c2)]
+    if b % 2 == 0:
+        (a1, a2), (c2, c1) = split(a), split(c)
+        return [(a1, b // 2, c1), (a2, b // 2, c2)]
+    else:
+        (a1, a2), (b2, b1) = split(a), split(b)
+        return [(a1, b1, c // 2), (a2, b2, c // 2)]
+
+def trihex_edge_trihexes(a, b, c):
+    """Returns the hex and the triangle either side of a given edge"""
+    # For a hex h, and a neighbouring triangle h + n * u, where u is a unit vector,
+    # and n is the triangle's cell type, the edge between them is
+    # 4 * h + n * (3 * u - (1, 1, 1)).
+    # We can solve for h, as n is determined by the odd co-ordinates mod 4.
+    if a % 2 == 0:
+        n = -1 if b % 4 == 1 else 1
+        hex = ((a - 2 * n) // 4, (b + n) // 4, (c + n) // 4)
+        return [hex, (hex[0] + n, hex[1], hex[2])]
+    n = -1 if a % 4 == 1 else 1
+    if b % 2 == 0:
+        hex = ((a + n) // 4, (b - 2 * n) // 4, (c + n) // 4)
+        return [hex, (hex[0], hex[1] + n, hex[2])]
+    else:
+        hex = ((a + n) // 4, (b + n) // 4, (c - 2 * n) // 4)
+        return [hex, (hex[0], hex[1], hex[2] + n)]
+
 # Shapes #######################################################################
 
 def trihex_disc(a, b, c, r):
     """Returns the trihexes that are at most distance r from the given trihex"""
-    # This could probably be optimized more
-    for da in range(-r, r + 1):
-        for db in range(-r, r + 1):
-            for t in (-1, 0, 1):
-                dc = t - (a + b + c + da + db)
-                if abs(da) + abs(db) + abs(dc) <= r:
-                    yield (a + da, b + db, c + dc)
+    return trihex_spiral(a, b, c, r)
+
+def trihex_ring(a, b, c, r):
+    """Returns the trihexes that are exactly distance r from the given trihex.
+    These are ordered by cell type, then counter clockwise"""
+    # The offsets must sum to take the trihex to another valid trihex.
+    # Offsets sum to an even number at an even distance, and odd at an odd distance.
+    n = a + b + c
+    for k in range(-1 - n, 2 - n):
+        if abs(k) <= r and (k - r) % 2 == 0:
+            for (da, db, dc) in lattice_ring(k, r):
+                yield (a + da, b + db, c + dc)
+
+def trihex_spiral(a, b, c, r):
+    """Returns the trihexes that are at most distance r from the given trihex,
+    ordered by distance, then as in trihex_ring"""
+    for i in range(r + 1):
+        yield from trihex_ring(a, b, c, i)
+
+def trihex_disc_size(a, b, c, r):
+    """Returns the number of trihexes at most distance r from the given trihex.
+    Unlike other grids, this depends on the cell type of the trihex.
+    Equivalent to len(list(trihex_disc(...)))"""
+    # Rings have 3 * r trihexes of one cell type, or 6 * r split between two.
+    # Hexes have two types in rings of odd distance, and triangles in rings of even distance.
+    if a + b + c == 0:
+        doubled = ((r + 1) // 2) ** 2
+    else:
+        doubled = (r // 2) * (r // 2 + 1)
+    return 1 + 3 * r * (r + 1) // 2 + 3 * doubled
+
+def trihex_disc_index(a, b, c, center_a, center_b, center_c, r):
+    """Given a trihex and a disc, gives a linear position of the trihex.
+    The index is an integer between zero and trihex_disc_size - 1.
+    This is useful for array storage of discs.
+    Returns None if the trihex is not in the disc.
+    Equivalent to list(trihex_spiral(...)).index((a, b, c))"""
+    d = trihex_dist(a, b, c, center_a, center_b, center_c)
+    if d > r:
+        return None
+    if d == 0:
+        return 0
+    n = center_a + center_b + center_c
+    k = (a + b + c) - n
+    index = trihex_disc_size(center_a, center_b, center_c, d - 1)
+    # Skip past the cell type that comes first in the ring, if any
+    for k2 in range(-1 - n, k):
+        if abs(k2) <= d and (k2 - d) % 2 == 0:
+            index += 3 * d
+    return index + lattice_ring_index(k, d, a - center_a, b - center_b, c - center_c)
+
+def trihex_disc_deindex(index, center_a, center_b, center_c, r):
+    """Performs the inverse of trihex_disc_index
+    Equivalent to list(trihex_spiral(...))[index]"""
+    if index < 0 or index >= trihex_disc_size(center_a, center_b, center_c, r):
+        raise Exception("Trihex is not inside disc")
+    d = spiral_ring(index, lambda r: trihex_disc_size(center_a, center_b, center_c, r))
+    if d == 0:
+        return (center_a, center_b, center_c)
+    index -= trihex_disc_size(center_a, center_b, center_c, d - 1)
+    n = center_a + center_b + center_c
+    for k in range(-1 - n, 2 - n):
+        if abs(k) <= d and (k - d) % 2 == 0:
+            if index < 3 * d:
+                (da, db, dc) = lattice_ring_deindex(k, d, index)
+                return (center_a + da, center_b + db, center_c + dc)
+            index -= 3 * d
 
 def trihex_line_intersect(x1, y1, x2, y2):
     """Returns trihexes that intersect the line specified in cartesian co-ordinates"""
     # We could implement this similar to tri_line_intersect
     # by raymarching through double sized lanes, but this is more code re-use
+    return _tri_line_to_trihexes(tri_line_intersect(x1, y1, x2, y2))
+
+def _tri_line_to_trihexes(tris):
+    """Returns the trihexes containing a line of tris, without repeats"""
     prev = None
-    for (a, b, c) in tri_line_intersect(x1, y1, x2, y2):
+    for (a, b, c) in tris:
         trihex = tri_to_trihex(a, b, c)
         if trihex != prev:
             yield trihex
-            prev = trihex
\ No newline at end of file
+            prev = trihex
+
+def trihex_line(a1, b1, c1, a2, b2, c2):
+    """Returns the trihexes that intersect the line from the center of one trihex to another"""
+    # The center of a trihex is at 2 (2a - b - c) / 3 along the a axis of the triangle grid, and so on.
+    prev = None
+    for (a, b, c) in tri_line_intersect_thirds(
+            2 * (2 * a1 - b1 - c1), 2 * (2 * b1 - a1 - c1), 2 * (2 * c1 - a1 - b1),
+            2 * (2 * a2 - b2 - c2), 2 * (2 * b2 - a2 - c2), 2 * (2 * c2 - a2 - b2)):
+        trihex = tri_to_trihex(a, b, c)
+        if trihex != prev:
+            yield trihex
+            prev = trihex
+
+def trihex_rect_intersect(x, y, width, height):
+    """Returns the trihexes that intersect the rectangle specified in cartesian co-ordinates.
+    Trihexes are returned row by row, in the same order as trihex_rect."""
+    for (b, n, minu, maxu) in trihex_rect_intersect_spans(x, y, width, height):
+        for u in range(minu, maxu + 1, 2):
+            yield ((n - b + u) // 2, b, (n - b - u) // 2)
+
+def trihex_rect_intersect_size(x, y, width, height):
+    """Returns the number of trihexes that intersect the rectangle specified in cartesian co-ordinates.
+    Equivalent to len(list(trihex_rect_intersect(...)))"""
+    return sum((maxu - minu) // 2 + 1 for (b, n, minu, maxu) in trihex_rect_intersect_spans(x, y, width, height))
+
+def _trihex_spans(tri_spans):
+    """Converts spans of tris, (b, minu, maxu), into lane spans of the trihexes containing them"""
+    # Each row of trihexes covers two rows of tris.
+    # The up triangles are tris in the lower row, and down triangles tris in the upper row, with a - c = 2u.
+    # Hexes cover the tris of both rows with a - c from 2u - 1 to 2u + 1.
+    spans = []
+    for (tri_b, minu, maxu) in tri_spans:
+        b = tri_b // 2
+        n = 1 if tri_b % 2 == 0 else -1
+        for (n, minu, maxu) in [(n, (minu + 1) // 2, maxu // 2), (0, minu // 2, (maxu + 1) // 2)]:
+            # Round inwards to the slots of this shape, where n - b + u is even
+            minu += (n - b + minu) % 2
+            maxu -= (n - b + maxu) % 2
+            if minu <= maxu:
+                spans.append((b, n, minu, maxu))
+    # Lanes are ordered up triangles, hexes, then down triangles
+    return merge_spans(spans, 2, key=lambda span: (span[0], -span[1], span[2]))
+
+def trihex_rect_intersect_spans(x, y, width, height):
+    """Returns the trihexes that intersect the rectangle specified in cartesian co-ordinates,
+    as spans (b, n, minu, maxu), where n = a + b + c picks the up triangles, hexes or down triangles of row b.
+    Each span covers every other slot u = a - c from minu to maxu inclusive, as only every other slot has that shape.
+    These match the lanes of trihex_rect, so each span is a contiguous slice of a rectangle's storage."""
+    return _trihex_spans(tri_rect_intersect_spans(x, y, width, height))
+
+def trihex_rect_intersect_delta(x1, y1, width1, height1, x2, y2, width2, height2):
+    """Given a rectangle specified in cartesian co-ordinates that moves or resizes from (x1, y1, width1, height1) to (x2, y2, width2, height2),
+    returns a pair of lists of the trihexes that start intersecting it, and those that stop intersecting it.
+    Both are lists of spans (b, n, minu, maxu), as in trihex_rect_intersect_spans.
+    For a small move, this is much less than the trihexes in the whole rectangle."""
+    old = list(trihex_rect_intersect_spans(x1, y1, width1, height1))
+    new = list(trihex_rect_intersect_spans(x2, y2, width2, height2))
+    return (list(span_difference(new, old, 2)), list(span_difference(old, new, 2)))
+
+def trihex_polygon_intersect(points):
+    """Returns the trihexes that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners.
+    The polygon can be concave, but its edges shouldn't cross."""
+    for (b, n, minu, maxu) in trihex_polygon_intersect_spans(points):
+        for u in range(minu, maxu + 1, 2):
+            yield ((n - b + u) // 2, b, (n - b - u) // 2)
+
+def trihex_polygon_intersect_spans(points):
+    """Returns the trihexes that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners,
+    as spans (b, n, minu, maxu), as in trihex_rect_intersect_spans. Concave polygons can have several spans per lane."""
+    return _trihex_spans(tri_polygon_intersect_spans(points))
+
+def trihex_circle_intersect(x, y, r):
+    """Returns the trihexes that intersect the circle with center (x, y) and radius r in cartesian co-ordinates"""
+    for (b, n, minu, maxu) in trihex_circle_intersect_spans(x, y, r):
+        for u in range(minu, maxu + 1, 2):
+            yield ((n - b + u) // 2, b, (n - b - u) // 2)
+
+def trihex_circle_intersect_spans(x, y, r):
+    """Returns the trihexes that intersect the circle with center (x, y) and radius r in cartesian co-ordinates,
+    as spans (b, n, minu, maxu), as in trihex_rect_intersect_spans."""
+    return _trihex_spans(tri_circle_intersect_spans(x, y, r))
+
+# Each row of trihexes has hexes alternating with pairs of triangles, one above the other.
+# We call each hex or pair of triangles a slot, and number them left to right by a - c.
+# In a rectangle, each row lists its up triangles, then its hexes, then its down triangles,
+# each left to right. That means a row of any one shape is contiguous.
+
+def trihex_rect(rect_a, rect_b, rect_c, width, height):
+    """Returns the trihexes in a rectangle that includes the slot of the given trihex in the bottom left,
+    that extends `height` rows upwards, and `width` slots to the right.
+    Trihexes are returned row by row, from bottom to top."""
+    for dy in range(height):
+        for lane in range(3):
+            # Only every other slot has this shape
+            du = (lane + rect_b + dy + rect_a - rect_c + 1) % 2
+            while du < width:
+                yield trihex_rect_unknoll(du, 3 * dy + lane, rect_a, rect_b, rect_c, width, height)
+                du += 2
+
+def trihex_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Given a trihex and a rectangle, gives a pair of integer cartesian co-ordinates that identify the trihex in the rectangle.
+    The first is the slot, and the second counts the rows of each shape, from bottom to top."""
+    # Up triangles sit below hexes, which sit below down triangles.
+    return (a - c - (rect_a - rect_c), 3 * (b - rect_b) + 1 - (a + b + c))
+
+def trihex_rect_unknoll(du, dz, rect_a, rect_b, rect_c, width, height):
+    """Given a co-ordinate pair and a rectangle, reverses trihex_rect_knoll"""
+    b = rect_b + dz // 3
+    n = 1 - dz % 3
+    u = rect_a - rect_c + du
+    return ((n - b + u) // 2, b, (n - b - u) // 2)
+
+def _trihex_rect_row(rect_a, rect_b, rect_c, width, dy):
+    """Returns the number of triangle slots and hexes in the dy'th row of a rectangle"""
+    hex_count = (width + 1 - (rect_b + dy + rect_a - rect_c) % 2) // 2
+    return (width - hex_count, hex_count)
+
+def trihex_rect_index(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Given a trihex and a rectangle, gives a linear position of the trihex.
+    The index is an integer between zero and trihex_rect_size - 1.
+    This is useful for array storage of rectangles.
+    Returns None if the trihex is not in the rectangle.
+    Equivalent to list(trihex_rect(...)).index((a, b, c))"""
+    (du, dz) = trihex_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height)
+    dy = dz // 3
+    lane = dz % 3
+    if du < 0 or du >= width or dy < 0 or dy >= height:
+        return None
+    # Every pair of rows has 3 * width trihexes.
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, 0)
+    row_start = (dy // 2) * 3 * width + (dy % 2) * (tri_count * 2 + hex_count)
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, dy)
+    lane_start = (0, tri_count, tri_count + hex_count)[lane]
+    return row_start + lane_start + du // 2
+
+def trihex_rect_deindex(index, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of trihex_rect_index
+    Equivalent to list(trihex_rect(...))[index]"""
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, 0)
+    dy = 2 * (index // (3 * width))
+    index -= dy // 2 * 3 * width
+    if index >= tri_count * 2 + hex_count:
+        dy += 1
+        index -= tri_count * 2 + hex_count
+    if dy < 0 or dy >= height:
+        raise Exception("Trihex is not inside rectangle")
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, dy)
+    if index < tri_count:
+        lane = 0
+    elif index < tri_count + hex_count:
+        lane = 1
+        index -= tri_count
+    else:
+        lane = 2
+        index -= tri_count + hex_count
+    # Hexes are in the even slots of even rows, and triangles fill the other slots
+    du = 2 * index + (lane + rect_b + dy + rect_a - rect_c + 1) % 2
+    return trihex_rect_unknoll(du, 3 * dy + lane, rect_a, rect_b, rect_c, width, height)
+
+def trihex_rect_size(rect_a, rect_b, rect_c, width, height):
+    """Returns the number of trihexes in a given rectangle.
+    Equivalent to len(list(trihex_rect(...)))"""
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, 0)
+    return (height // 2) * 3 * width + (height % 2) * (tri_count * 2 + hex_count)
+
+# The curve functions give other orders for the trihexes of a rectangle, following a space filling curve
+# through the co-ordinates from trihex_rect_knoll, see common.py.
+# Nearby trihexes are more often stored close together than with trihex_rect_index, but indices can skip values.
+
+def trihex_rect_morton_index(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Like trihex_rect_index, but gives the position of the trihex along the Z-order curve through the rectangle.
+    Returns None if the trihex is not in the rectangle."""
+    if trihex_rect_index(a, b, c, rect_a, rect_b, rect_c, width, height) is None:
+        return None
+    return morton_index(*trihex_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height))
+
+def trihex_rect_morton_deindex(index, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of trihex_rect_morton_index"""
+    trihex = trihex_rect_unknoll(*morton_deindex(index), rect_a, rect_b, rect_c, width, height)
+    if trihex_rect_index(*trihex, rect_a, rect_b, rect_c, width, height) is None:
+        raise Exception("Trihex is not inside rectangle")
+    return trihex
+
+def trihex_rect_hilbert_index(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Like trihex_rect_index, but gives the position of the trihex along the Hilbert curve through the rectangle.
+    Returns None if the trihex is not in the rectangle."""
+    if trihex_rect_index(a, b, c, rect_a, rect_b, rect_c, width, height) is None:
+        return None
+    return hilbert_index(*trihex_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height), curve_order(width, 3 * height))
+
+def trihex_rect_hilbert_deindex(index, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of trihex_rect_hilbert_index"""
+    trihex = trihex_rect_unknoll(*hilbert_deindex(index, curve_order(width, 3 * height)), rect_a, rect_b, rect_c, width, height)
+    if trihex_rect_index(*trihex, rect_a, rect_b, rect_c, width, height) is None:
+        raise Exception("Trihex is not inside rectangle")
+    return trihex
+
+# Packed Keys ##################################################################
+
+# a and b are packed with common.pack_pair, followed by two bits for the cell type, a + b + c + 1.
+# c can be found from the others. a and b must be from -2**29 to 2**29 - 1.
+
+def trihex_pack(a, b, c):
+    """Packs a trihex into a single integer key"""
+    return pack_pair(a, b) * 4 + (a + b + c + 1)
+
+def trihex_unpack(key):
+    """Returns the trihex packed by trihex_pack"""
+    (a, b) = unpack_pair(key >> 2)
+    return (a, b, (key & 3) - 1 - a - b)
+
+# Grid Objects #################################################################
+
+# The functions above all use the edge_length from settings.
+# TrihexGrid does the same calculations with its own edge length, so grids of different sizes can be used side by side,
+# and an optional layout, see common.py, for placing the grid in world co-ordinates.
+# Its methods work like the functions of the same name, without the trihex_ prefix.
+
+class TrihexGrid(Grid):
+    """A grid of trihexes with a given edge length and layout, see Grid in common.py.
+    The matrix used by center is worked out once, when the grid is created.
+    Other cartesian queries use the triangles that make up each trihex, from the TriGrid tris."""
+    __slots__ = ("center_matrix", "tris")
+    vertices = staticmethod(trihex_vertices)
+    span_step = 2
+
+    def __init__(self, edge_length=1, layout=identity_layout):
+        Grid.__init__(self, edge_length, layout)
+        # Rows give world x and y in terms of a, b, c and a constant, as in trihex_center
+        self.center_matrix = self.world_matrix((
+            (         1,             0,         -1, 0),
+            (-sqrt3 / 3, sqrt3 * 2 / 3, -sqrt3 / 3, 0),
+        ))
+        self.tris = TriGrid(edge_length, layout)
+
+    def center(self, a, b, c):
+        """Returns the center of a given trihex in cartesian co-ordinates"""
+        ((xa, xb, xc, xt), (ya, yb, yc, yt)) = self.center_matrix
+        return (xa * a + xb * b + xc * c + xt, ya * a + yb * b + yc * c + yt)
+
+    def pick(self, x, y):
+        """Returns the trihex that contains a given cartesian co-ordinate point"""
+        return tri_to_trihex(*self.tris.pick(x, y))
+
+    def vertex_center(self, a, b, c):
+        """Returns the position of a given vertex in cartesian co-ordinates"""
+        return self.center(a / 2, b / 2, c / 2)
+
+    def edge_center(self, a, b, c):
+        """Returns the midpoint of a given edge in cartesian co-ordinates"""
+        return self.center(a / 4, b / 4, c / 4)
+
+    def _line_intersect(self, x1, y1, x2, y2):
+        return _tri_line_to_trihexes(self.tris._line_intersect(x1, y1, x2, y2))
+
+    def _rect_intersect_spans(self, x, y, width, height):
+        return _trihex_spans(self.tris._rect_intersect_spans(x, y, width, height))
+
+    def _polygon_intersect_spans(self, points):
+        return _trihex_spans(self.tris._polygon_intersect_spans(points))
+
+    def _circle_intersect_spans(self, x, y, r):
+        return _trihex_spans(self.tris._circle_intersect_spans(x, y, r))
+
+    @staticmethod
+    def span_cells(spans):
+        """Returns the trihexes covered by spans (b, n, minu, maxu)"""
+        for (b, n, minu, maxu) in spans:
+            for u in range(minu, maxu + 1, 2):
+                yield ((n - b + u) // 2, b, (n - b - u) // 2)
@@ -0,0 +1,355 @@
+# Vectorized Trihex grid
+# This module mirrors functions from flat_topped_trihex, but works on many points or trihexes at once using numpy.
+#
+# Points are passed as float arrays of shape (N, 2), with each row being an x, y cartesian co-ordinate.
+# Trihexes are passed as integer arrays of shape (N, 3), with each row being an a, b, c co-ordinate.
+# Any extra leading dimensions are preserved, so (N, M, 3) works too.
+
+import functools
+import numpy as np
+import flat_topped_trihex
+from settings import edge_length
+from flat_topped_trihex import sqrt3
+from updown_tri_np import pick_tri, tri_grid_pick, tri_march, tri_march_thirds
+from common import curve_order
+from common_np import mesh, affine, pack_pair, unpack_pair, morton_index, morton_deindex, hilbert_index, hilbert_deindex, lattice_ring_index, lattice_ring_deindex, spiral_ring, march_cells, march_hits
+
+# Basics #######################################################################
+
+def trihex_cell_type(trihexes):
+    """Returns an integer array giving the shape of each trihex.
+    0 for "hex", 1 for "tri_up" and -1 for "tri_down", i.e. the sum of the co-ordinates."""
+    return np.asarray(trihexes).sum(axis=-1)
+
+def trihex_center(trihexes, dtype=float):
+    """Returns the centers of the given trihexes in cartesian co-ordinates, as an (N, 2) array"""
+    trihexes = np.asarray(trihexes)
+    a = trihexes[..., 0]
+    b = trihexes[..., 1]
+    c = trihexes[..., 2]
+    return np.stack([
+        (             a +                                -c) * edge_length,
+        (-sqrt3 / 3 * a + sqrt3 * 2 / 3 * b - sqrt3 / 3 * c) * edge_length,
+    ], axis=-1).astype(dtype)
+
+# Offsets of each corner from the trihex, in the same order as flat_topped_trihex.trihex_corners
+# Triangles only have three corners, so the last corner is repeated to pad them to six.
+# Down triangles use the negation of the tri_up offsets.
+trihex_hex_corner_offsets = np.array([
+    ( 0.5, -0.5,  0  ),
+    ( 0,   -0.5,  0.5),
+    (-0.5,  0,    0.5),
+    (-0.5,  0.5,  0  ),
+    ( 0,    0.5, -0.5),
+    ( 0.5,  0,   -0.5),
+])
+trihex_tri_corner_offsets = np.array([
+    ( 0.5,  0,    0  ),
+    ( 0,    0.5,  0  ),
+    ( 0,    0,    0.5),
+    ( 0,    0,    0.5),
+    ( 0,    0,    0.5),
+    ( 0,    0,    0.5),
+])
+
+def trihex_corners(trihexes, dtype=np.float32):
+    """Returns the three/six corners of the given trihexes in cartesian co-ordinates.
+    Returns a pair, an (N, 6, 2) array of corners, and an (N,) array counting how many corners each trihex has.
+    Triangles are padded by repeating their last corner, so they can be drawn as a
+    triangle fan of 6 corners, with the extra triangles having zero area."""
+    trihexes = np.asarray(trihexes)
+    n = trihex_cell_type(trihexes)[..., None, None]
+    offsets = np.where(n == 0, trihex_hex_corner_offsets, n * trihex_tri_corner_offsets)
+    corners = trihex_center(trihexes[..., None, :] + offsets, dtype)
+    counts = np.where(n[..., 0, 0] == 0, 6, 3)
+    return corners, counts
+
+def tri_to_trihex(tris):
+    """Given triangle co-ordinates as specified in updown_tri, finds the trihexes that contain them"""
+    return np.floor_divide(np.asarray(tris), 2).astype(np.int64)
+
+def pick_trihex(points):
+    """Returns the trihexes that contain the given cartesian co-ordinate points"""
+    return tri_to_trihex(pick_tri(points))
+
+def trihex_grid_center(grid, trihexes, dtype=float):
+    """Returns the centers of the given trihexes in the world co-ordinates of grid, a TrihexGrid, as an (N, 2) array"""
+    return affine(grid.center_matrix, trihexes).astype(dtype)
+
+def trihex_grid_pick(grid, points):
+    """Returns the trihexes of grid, a TrihexGrid, that contain the given world co-ordinate points"""
+    return tri_to_trihex(tri_grid_pick(grid.tris, points))
+
+# Offsets of each neighbour from the trihex, in the same order as flat_topped_trihex.trihex_neighbours
+# As with corners, triangles repeat their last neighbour, and down triangles use the negation of tri_up.
+trihex_hex_neighbour_offsets = np.array([
+    (-1,  0,  0),
+    ( 0, -1,  0),
+    ( 0,  0, -1),
+    ( 1,  0,  0),
+    ( 0,  1,  0),
+    ( 0,  0,  1),
+])
+trihex_tri_neighbour_offsets = np.array([
+    (-1,  0,  0),
+    ( 0, -1,  0),
+    ( 0,  0, -1),
+    ( 0,  0, -1),
+    ( 0,  0, -1),
+    ( 0,  0, -1),
+])
+
+def trihex_neighbours(trihexes):
+    """Returns the three/six trihexes that share an edge with each given trihex.
+    Returns a pair, an (N, 6, 3) array of trihexes, and an (N,) array counting how many neighbours each trihex has.
+    Triangles are padded by repeating their last neighbour."""
+    trihexes = np.asarray(trihexes)
+    n = trihex_cell_type(trihexes)[..., None, None]
+    offsets = np.where(n == 0, trihex_hex_neighbour_offsets, n * trihex_tri_neighbour_offsets)
+    counts = np.where(n[..., 0, 0] == 0, 6, 3)
+    return trihexes[..., None, :] + offsets, counts
+
+# Packed Keys ##################################################################
+
+# Keys are packed as in flat_topped_trihex.trihex_pack, but as int64 arrays.
+
+def trihex_pack(trihexes):
+    """Packs the given trihexes into an int64 array of keys"""
+    trihexes = np.asarray(trihexes)
+    return pack_pair(trihexes[..., 0], trihexes[..., 1]) * 4 + (trihexes.sum(axis=-1) + 1)
+
+def trihex_unpack(keys):
+    """Returns the trihexes packed by trihex_pack, as an (N, 3) array"""
+    keys = np.asarray(keys, dtype=np.int64)
+    (a, b) = unpack_pair(keys >> 2)
+    return np.stack([a, b, (keys & 3) - 1 - a - b], axis=-1)
+
+# Packing is linear, apart from adding 1, so each neighbour's key differs by the key of its offset less 1
+trihex_hex_neighbour_key_offsets = trihex_pack(trihex_hex_neighbour_offsets) - 1
+trihex_tri_neighbour_key_offsets = trihex_pack(trihex_tri_neighbour_offsets) - 1
+
+def trihex_key_neighbours(keys):
+    """Returns the keys of the three/six trihexes that share an edge with each given key, in the same order as trihex_neighbours.
+    Returns a pair, an (N, 6) array of keys, and an (N,) array counting how many neighbours each trihex has.
+    Triangles are padded by repeating their last neighbour."""
+    keys = np.asarray(keys, dtype=np.int64)
+    n = (keys & 3)[..., None] - 1
+    offsets = np.where(n == 0, trihex_hex_neighbour_key_offsets, n * trihex_tri_neighbour_key_offsets)
+    counts = np.where(n[..., 0] == 0, 6, 3)
+    return keys[..., None] + offsets, counts
+
+# Shapes #######################################################################
+
+# The rect functions take the same rectangle arguments as in flat_topped_trihex, and
+# return -1 rather than None for trihexes that are not in the rectangle.
+
+def trihex_rect_knoll(trihexes, rect_a, rect_b, rect_c, width, height):
+    """Given trihexes and a rectangle, gives an (N, 2) array of integer co-ordinates that identify each trihex in the rectangle.
+    Unlike trihex_rect_index, this does not check if the trihexes are inside the rectangle."""
+    trihexes = np.asarray(trihexes)
+    a = trihexes[..., 0]
+    b = trihexes[..., 1]
+    c = trihexes[..., 2]
+    return np.stack([a - c - (rect_a - rect_c), 3 * (b - rect_b) + 1 - (a + b + c)], axis=-1)
+
+def trihex_rect_unknoll(knolls, rect_a, rect_b, rect_c, width, height):
+    """Given an (N, 2) array of co-ordinate pairs and a rectangle, reverses trihex_rect_knoll"""
+    knolls = np.asarray(knolls)
+    dz = knolls[..., 1]
+    b = rect_b + dz // 3
+    n = 1 - dz % 3
+    u = rect_a - rect_c + knolls[..., 0]
+    return np.stack([(n - b + u) // 2, b, (n - b - u) // 2], axis=-1)
+
+def _trihex_rect_row(rect_a, rect_b, rect_c, width, dy):
+    """Returns arrays counting the triangle slots and hexes in each dy'th row of a rectangle"""
+    hex_count = (width + 1 - (rect_b + dy + rect_a - rect_c) % 2) // 2
+    return (width - hex_count, hex_count)
+
+def trihex_rect_index(trihexes, rect_a, rect_b, rect_c, width, height):
+    """Given trihexes and a rectangle, gives the linear position of each trihex.
+    Each index is an integer between zero and trihex_rect_size - 1, or -1 if the trihex is not in the rectangle."""
+    knolls = trihex_rect_knoll(trihexes, rect_a, rect_b, rect_c, width, height)
+    du = knolls[..., 0]
+    dy = knolls[..., 1] // 3
+    lane = knolls[..., 1] % 3
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, 0)
+    row_start = (dy // 2) * 3 * width + (dy % 2) * (tri_count * 2 + hex_count)
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, dy)
+    lane_start = np.choose(lane, [0, tri_count, tri_count + hex_count])
+    inside = (du >= 0) & (du < width) & (dy >= 0) & (dy < height)
+    return np.where(inside, row_start + lane_start + du // 2, -1)
+
+def trihex_rect_deindex(indices, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of trihex_rect_index"""
+    indices = np.asarray(indices)
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, 0)
+    if np.any((indices < 0) | (indices >= (height // 2) * 3 * width + (height % 2) * (tri_count * 2 + hex_count))):
+        raise Exception("Trihex is not inside rectangle")
+    dy = 2 * (indices // (3 * width))
+    indices = indices - dy // 2 * 3 * width
+    second = indices >= tri_count * 2 + hex_count
+    dy = dy + second
+    indices = indices - second * (tri_count * 2 + hex_count)
+    (tri_count, hex_count) = _trihex_rect_row(rect_a, rect_b, rect_c, width, dy)
+    lane = (indices >= tri_count).astype(np.int64) + (indices >= tri_count + hex_count)
+    indices = indices - np.choose(lane, [0, tri_count, tri_count + hex_count])
+    du = 2 * indices + (lane + rect_b + dy + rect_a - rect_c + 1) % 2
+    return trihex_rect_unknoll(np.stack([du, 3 * dy + lane], axis=-1), rect_a, rect_b, rect_c, width, height)
+
+def trihex_rect_morton_index(trihexes, rect_a, rect_b, rect_c, width, height):
+    """Vectorized version of flat_topped_trihex.trihex_rect_morton_index, giving -1 for trihexes not in the rectangle"""
+    knolls = trihex_rect_knoll(trihexes, rect_a, rect_b, rect_c, width, height)
+    inside = trihex_rect_index(trihexes, rect_a, rect_b, rect_c, width, height) >= 0
+    return np.where(inside, morton_index(knolls[..., 0], knolls[..., 1]), -1)
+
+def trihex_rect_morton_deindex(indices, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of trihex_rect_morton_index"""
+    trihexes = trihex_rect_unknoll(np.stack(morton_deindex(indices), axis=-1), rect_a, rect_b, rect_c, width, height)
+    if np.any(trihex_rect_index(trihexes, rect_a, rect_b, rect_c, width, height) < 0):
+        raise Exception("Trihex is not inside rectangle")
+    return trihexes
+
+def trihex_rect_hilbert_index(trihexes, rect_a, rect_b, rect_c, width, height):
+    """Vectorized version of flat_topped_trihex.trihex_rect_hilbert_index, giving -1 for trihexes not in the rectangle"""
+    knolls = trihex_rect_knoll(trihexes, rect_a, rect_b, rect_c, width, height)
+    inside = trihex_rect_index(trihexes, rect_a, rect_b, rect_c, width, height) >= 0
+    return np.where(inside, hilbert_index(knolls[..., 0], knolls[..., 1], curve_order(width, 3 * height)), -1)
+
+def trihex_rect_hilbert_deindex(indices, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of trihex_rect_hilbert_index"""
+    trihexes = trihex_rect_unknoll(np.stack(hilbert_deindex(indices, curve_order(width, 3 * height)), axis=-1), rect_a, rect_b, rect_c, width, height)
+    if np.any(trihex_rect_index(trihexes, rect_a, rect_b, rect_c, width, height) < 0):
+        raise Exception("Trihex is not inside rectangle")
+    return trihexes
+
+def _trihex_disc_size(n, r):
+    """Returns the number of trihexes in discs of radius r about a trihex with co-ordinates summing to n"""
+    doubled = ((r + 1) // 2) ** 2 if n == 0 else (r // 2) * (r // 2 + 1)
+    return np.where(r < 0, 0, 1 + 3 * r * (r + 1) // 2 + 3 * doubled)
+
+def _trihex_ring_types(n, d):
+    """Returns arrays of the first and last sum of offsets found in rings at distance d about a trihex with co-ordinates summing to n"""
+    # Rings have two cell types when d + n is odd and the ring is big enough, otherwise one.
+    two = ((d + n) % 2 == 1) & (abs(-1 - n) <= d)
+    last = np.where((d + n) % 2 == 1, 1 - n, -n)
+    return np.where(two, -1 - n, last), last
+
+def trihex_disc_index(trihexes, a, b, c, r):
+    """Given trihexes and a disc, gives the linear position of each trihex, as in flat_topped_trihex.trihex_disc_index.
+    Each index is an integer between zero and trihex_disc_size - 1, or -1 if the trihex is not in the disc."""
+    n = a + b + c
+    offsets = np.asarray(trihexes) - (a, b, c)
+    d = np.abs(offsets).sum(axis=-1)
+    k = offsets.sum(axis=-1)
+    (first, last) = _trihex_ring_types(n, d)
+    index = _trihex_disc_size(n, d - 1) + 3 * d * (k != first) + lattice_ring_index(k, d, offsets)
+    return np.where(d <= r, index, -1)
+
+def trihex_disc_deindex(indices, a, b, c, r):
+    """Performs the inverse of trihex_disc_index"""
+    n = a + b + c
+    indices = np.asarray(indices)
+    if np.any((indices < 0) | (indices >= _trihex_disc_size(n, r))):
+        raise Exception("Trihex is not inside disc")
+    d = spiral_ring(indices, lambda r: _trihex_disc_size(n, r))
+    indices = indices - _trihex_disc_size(n, d - 1)
+    (first, last) = _trihex_ring_types(n, d)
+    second = indices >= 3 * d
+    k = np.where(second, last, first)
+    return lattice_ring_deindex(k, d, indices - 3 * d * second) + (a, b, c)
+
+# The disc offset tables are cached, as disc shapes only depend on the radius and the cell type of the center.
+# The tables are read-only, so are safe to share between callers.
+
+@functools.lru_cache(maxsize=64)
+def trihex_disc_offsets(r, n):
+    """Returns the offsets from a trihex of every trihex at most distance r from it, as an (M, 3) array.
+    n is the cell type of the center, as given by trihex_cell_type.
+    These are in the same order as flat_topped_trihex.trihex_spiral, so row i is trihex_disc_deindex(i, ...)"""
+    center = (n, 0, 0)
+    offsets = np.array(list(flat_topped_trihex.trihex_spiral(*center, r))) - center
+    offsets.setflags(write=False)
+    return offsets
+
+def trihex_disc(trihexes, r):
+    """Returns the trihexes at most distance r from each given trihex.
+    Returns a pair, an (N, M, 3) array of trihexes, and an (N,) array counting how many trihexes are in each disc.
+    Discs are in the same order as flat_topped_trihex.trihex_spiral.
+    Discs around hexes and triangles have different sizes, so the smaller ones are padded by repeating their last trihex."""
+    trihexes = np.asarray(trihexes)
+    tables = [trihex_disc_offsets(r, n) for n in (-1, 0, 1)]
+    sizes = np.array([len(table) for table in tables])
+    size = sizes.max()
+    padded = np.stack([np.concatenate([table, np.repeat(table[-1:], size - len(table), axis=0)]) for table in tables])
+    n = trihex_cell_type(trihexes)
+    return trihexes[..., None, :] + padded[n + 1], sizes[n + 1]
+
+# The line functions work like those in updown_tri_np, marching through triangles and converting them to trihexes.
+
+def trihex_line(trihexes1, trihexes2):
+    """Returns the trihexes that intersect the line between the centers of each pair of trihexes, as in flat_topped_trihex.trihex_line.
+    Returns a pair of trihexes and offsets, like trihex_line_intersect."""
+    # Trihex centers are at twice the positions of tri centers along the triangle axes
+    def thirds(trihexes):
+        trihexes = np.asarray(trihexes)
+        return 2 * (3 * trihexes - trihexes.sum(axis=-1, keepdims=True))
+    return march_cells(tri_march_thirds, thirds(trihexes1), thirds(trihexes2), tri_to_trihex)
+
+def trihex_line_intersect(starts, ends):
+    """Returns the trihexes that intersect each line specified in cartesian co-ordinates, as a pair of trihexes and offsets"""
+    return march_cells(tri_march, starts, ends, tri_to_trihex)
+
+def trihex_raycast(starts, ends, opaque):
+    """Finds the first trihex along each line that is opaque, i.e. truthy in opaque, a TrihexRectArray.
+    Trihexes outside the rectangle of opaque also count as opaque. Lines stop at the first opaque trihex.
+    Returns a pair, an (N, 3) array of trihexes, and an (N,) boolean array that is false for lines that hit nothing.
+    Those lines give the trihex containing their end point instead."""
+    return march_hits(tri_march, starts, ends, opaque, tri_to_trihex)
+
+# Vertices and Edges ##########################################################
+
+# Offsets of each vertex from double the trihex, in the same order as flat_topped_trihex.trihex_vertices
+# As with corners, triangles repeat their last vertex, and down triangles use the negation of tri_up.
+trihex_hex_vertex_offsets = (trihex_hex_corner_offsets * 2).astype(np.int64)
+trihex_tri_vertex_offsets = np.array([
+    ( 0, -1, -1),
+    (-1,  0, -1),
+    (-1, -1,  0),
+    (-1, -1,  0),
+    (-1, -1,  0),
+    (-1, -1,  0),
+])
+
+def trihex_vertices(trihexes):
+    """Returns the three/six vertices of the given trihexes, as an (N, 6, 3) array.
+    These are in the same order as trihex_corners, with triangles padded the same way."""
+    trihexes = np.asarray(trihexes)
+    n = trihex_cell_type(trihexes)[..., None, None]
+    offsets = np.where(n == 0, trihex_hex_vertex_offsets, n * trihex_tri_vertex_offsets)
+    return trihexes[..., None, :] * 2 + offsets
+
+def trihex_edges(trihexes):
+    """Returns the three/six edges of the given trihexes, as an (N, 6, 3) array.
+    The ith edge runs from the ith vertex of trihex_vertices to the next one.
+    Triangles are padded by repeating their last edge."""
+    trihexes = np.asarray(trihexes)
+    vertices = trihex_vertices(trihexes)
+    is_hex = trihex_cell_type(trihexes)[..., None, None] == 0
+    # Triangles wrap around after 3 vertices, not 6
+    next_vertices = np.where(is_hex, np.roll(vertices, -1, axis=-2), vertices[..., [1, 2, 0, 0, 0, 0], :])
+    return vertices + next_vertices
+
+def trihex_vertex_center(vertices, dtype=np.float32):
+    """Returns the positions of the given vertices in cartesian co-ordinates, as an (N, 2) array"""
+    return trihex_center(np.asarray(vertices) / 2, dtype)
+
+def trihex_mesh(trihexes, index_dtype=np.uint32):
+    """Returns the distinct vertices of the given trihexes, and how to index them.
+    Returns a triple, a (V, 3) array of vertices, an (N, 6) index array, so that
+    vertices[indices[i]] is trihex_vertices(trihexes)[i], and an (N,) array counting the vertices of each trihex.
+    Use trihex_vertex_center(vertices) to get a vertex buffer."""
+    trihexes = np.asarray(trihexes)
+    vertices, indices = mesh(trihex_vertices(trihexes), index_dtype)
+    counts = np.where(trihex_cell_type(trihexes) == 0, 6, 3)
+    return vertices, indices, counts
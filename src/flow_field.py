@@ -0,0 +1,80 @@
+# Flow Fields
+# When many units head towards the same goals, it is cheaper to search once backwards from the goals
+# than to path find for every unit. This module computes, for every cell of a rect array (see rect_array.py):
+#  * the cost of the cheapest path to the nearest seed
+#  * which neighbour to step to in order to follow that path
+#  * which seed is nearest, i.e. a Voronoi diagram of the seeds
+#
+# As in pathfinding.py, costs give the cost of entering each cell, defaulting to 1.
+# Cells with infinite cost cannot be entered.
+#
+# The fields are computed by a wavefront that works on every cell of the front at once, using numpy.
+# Each step, the neighbours of cells that just improved check if they can improve by stepping to them.
+# With unit costs, this is the same as a breadth first search, visiting each cell once.
+
+import numpy as np
+
+def flow_field(area, seeds, costs=None):
+    """Computes the distance, direction and nearest seed fields for the rectangle of area, a RectArray.
+    seeds is an (S, k) array of cells, and costs is an optional RectArray or array of per cell costs.
+    Returns a triple of RectArrays over the same rectangle:
+     * distances, the cost to reach the nearest seed, or inf if no seed can be reached
+     * directions, the position in the neighbours list of the next cell to step to, or -1 for seeds and unreachable cells
+     * labels, the index in seeds of the nearest seed, or -1 if no seed can be reached
+    """
+    table = area.neighbour_indices()
+    size = len(area)
+    if costs is None:
+        costs = np.ones(size)
+    else:
+        costs = np.asarray(getattr(costs, "values", costs), dtype=float)
+    seed_indices = area.rect_index(np.asarray(seeds))
+    if np.any(seed_indices < 0):
+        raise KeyError("Cell is not inside rectangle")
+
+    distances = np.full(size, np.inf)
+    directions = np.full(size, -1, np.int8)
+    labels = np.full(size, -1, np.int64)
+    distances[seed_indices] = 0
+    labels[seed_indices] = np.arange(len(seed_indices))
+    is_seed = np.zeros(size, bool)
+    is_seed[seed_indices] = True
+    can_enter = np.isfinite(costs)
+
+    # The cost of reaching a seed by stepping to each cell
+    step_costs = distances + costs
+    front = np.flatnonzero(is_seed & can_enter)
+    while len(front) > 0:
+        # Find cells that might improve
+        candidates = table[front].ravel()
+        candidates = np.unique(candidates[candidates >= 0])
+        candidates = candidates[can_enter[candidates] & ~is_seed[candidates]]
+        # Find the best neighbour of each to step to
+        neighbours = table[candidates]
+        options = np.where(neighbours >= 0, step_costs[neighbours], np.inf)
+        best = np.argmin(options, axis=1)
+        best_cost = options[np.arange(len(candidates)), best]
+        improved = best_cost < distances[candidates]
+        front = candidates[improved]
+        best = best[improved]
+        distances[front] = best_cost[improved]
+        directions[front] = best
+        labels[front] = labels[table[front, best]]
+        step_costs[front] = distances[front] + costs[front]
+
+    return (
+        area.full_like(distances, distances.dtype),
+        area.full_like(directions, directions.dtype),
+        area.full_like(labels, labels.dtype),
+    )
+
+def flow_step(directions, cells):
+    """Given a directions field from flow_field, returns the cell each of the given cells steps to.
+    Seeds and unreachable cells stay where they are."""
+    table = directions.neighbour_indices()
+    indices = directions.rect_index(np.asarray(cells))
+    if np.any(indices < 0):
+        raise KeyError("Cell is not inside rectangle")
+    steps = directions.values[indices]
+    indices = np.where(steps >= 0, table[indices, steps], indices)
+    return directions.rect_deindex(indices)
@@ -0,0 +1,67 @@
+# Line Caches
+# The cells returned by square_line, hex_line and tri_line only depend on the offset from the start to the end,
+# and for tris, on whether the start points up or down. So if the same lines are requested over and over
+# in different places, it is faster to remember each line once, and move it to where it is requested.
+#
+# Usage:
+#   hex_line_cached = hex_line_cache()
+#   hex_line_cached(0, 0, 0, 3, -1, -2)
+#   hex_line_cached.hits, hex_line_cached.misses
+#
+# Each line is worked out once from a fixed origin cell, then moved.
+# The line functions use exact integer maths, so moving a line gives the same cells as working it out in place.
+
+from collections import OrderedDict
+from square import square_line
+from flat_topped_hex import hex_line
+from updown_tri import tri_line, points_up
+
+class LineCache:
+    """Wraps a line function, remembering the most recently used lines by their offset.
+    origin is a function returning a cell that can be moved to the start of a line without changing its shape.
+    Up to maxsize lines are kept, discarding the least recently used first."""
+
+    def __init__(self, line, origin, maxsize=4096):
+        self.line = line
+        self.origin = origin
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.lines = OrderedDict()
+
+    def __call__(self, *cells):
+        """Returns the same cells as line, as a list"""
+        n = len(cells) // 2
+        start = cells[:n]
+        origin = self.origin(*start)
+        key = (origin, tuple(e - s for (s, e) in zip(start, cells[n:])))
+        line = self.lines.get(key)
+        if line is None:
+            self.misses += 1
+            line = tuple(self.line(*origin, *(o + d for (o, d) in zip(origin, key[1]))))
+            self.lines[key] = line
+            if len(self.lines) > self.maxsize:
+                self.lines.popitem(last=False)
+        else:
+            self.hits += 1
+            self.lines.move_to_end(key)
+        shift = tuple(s - o for (s, o) in zip(start, origin))
+        return [tuple(c + d for (c, d) in zip(cell, shift)) for cell in line]
+
+    def clear(self):
+        """Forgets all lines, and resets the counters"""
+        self.lines.clear()
+        self.hits = 0
+        self.misses = 0
+
+def square_line_cache(maxsize=4096):
+    """Returns a LineCache for square_line"""
+    return LineCache(square_line, lambda x, y: (0, 0), maxsize)
+
+def hex_line_cache(maxsize=4096):
+    """Returns a LineCache for hex_line"""
+    return LineCache(hex_line, lambda x, y, z: (0, 0, 0), maxsize)
+
+def tri_line_cache(maxsize=4096):
+    """Returns a LineCache for tri_line. Up and down tris have separate origins."""
+    return LineCache(tri_line, lambda a, b, c: (1, 1, 0) if points_up(a, b, c) else (1, 0, 0), maxsize)
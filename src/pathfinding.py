@@ -0,0 +1,196 @@
+# Pathfinding
+# This module contains path finding algorithms that work with any of the grids.
+# Each function is passed the grid's neighbours function, e.g. hex_neighbours,
+# and the A* searches are also passed its dist function, e.g. hex_dist, which is used as the heuristic.
+# Cells are passed as tuples, e.g.
+#   astar((0, 0, 0), (3, -1, -2), hex_neighbours, hex_dist)
+#
+# By default, every step costs 1. Alternatively, pass a RectArray (see rect_array.py) of costs,
+# giving the cost of entering each cell. Cells with infinite cost, or outside the rectangle, cannot be entered.
+# When costs are given, the search state is stored in flat lists indexed by rect index,
+# rather than in dicts keyed by cell, which is faster when searches cover much of the rectangle.
+#
+# Pass a PathStats object to any search to count how much work it does.
+
+import heapq
+import itertools
+from collections import defaultdict
+
+inf = float("inf")
+
+class PathStats:
+    """Counts the work done by searches.
+    expanded counts the cells taken from the open list and having their neighbours examined,
+    generated counts the cells added to the open list."""
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+
+class _SearchState:
+    """Stores the cost so far, parent, and closed flag for each cell of a search"""
+
+    def __init__(self, costs):
+        if costs is None:
+            self.key = lambda cell: cell
+            self.cost = lambda key: 1
+            self.g = defaultdict(lambda: inf)
+            self.parent = {}
+            self.closed = defaultdict(bool)
+        else:
+            size = len(costs)
+            values = costs.values
+            self.key = costs.index
+            self.cost = lambda key: values[key]
+            self.g = [inf] * size
+            self.parent = [None] * size
+            self.closed = bytearray(size)
+
+    def path(self, cell):
+        """Returns the cells leading up to cell, starting from the start of the search"""
+        path = [cell]
+        while True:
+            cell = self.parent[self.key(cell)]
+            if cell is None:
+                break
+            path.append(cell)
+        path.reverse()
+        return path
+
+def _min_cost(costs):
+    """Returns the smallest cost of entering a cell, for scaling the heuristic"""
+    return 1 if costs is None else max(0, float(costs.values.min()))
+
+def astar(start, goal, neighbours, dist, costs=None, stats=None):
+    """Finds the cheapest path from start to goal.
+    Returns a list of cells, starting at start and ending at goal, or None if there is no path."""
+    state = _SearchState(costs)
+    scale = _min_cost(costs)
+    start_key = state.key(start)
+    if start_key is None or state.key(goal) is None:
+        return None
+    state.g[start_key] = 0
+    state.parent[start_key] = None
+    # Ties are broken in favour of cells closer to the goal, then first come first served
+    counter = itertools.count()
+    open_list = [(dist(*start, *goal) * scale, 0, next(counter), start)]
+    while open_list:
+        (f, h, _, cell) = heapq.heappop(open_list)
+        key = state.key(cell)
+        if state.closed[key]:
+            continue
+        if cell == goal:
+            return state.path(cell)
+        state.closed[key] = True
+        if stats is not None:
+            stats.expanded += 1
+        g = state.g[key]
+        for neighbour in neighbours(*cell):
+            neighbour_key = state.key(neighbour)
+            if neighbour_key is None or state.closed[neighbour_key]:
+                continue
+            new_g = g + state.cost(neighbour_key)
+            if new_g < state.g[neighbour_key]:
+                state.g[neighbour_key] = new_g
+                state.parent[neighbour_key] = cell
+                h = dist(*neighbour, *goal) * scale
+                heapq.heappush(open_list, (new_g + h, h, next(counter), neighbour))
+                if stats is not None:
+                    stats.generated += 1
+    return None
+
+def bidirectional_astar(start, goal, neighbours, dist, costs=None, stats=None):
+    """Finds the cheapest path from start to goal, by searching forwards from start and backwards from goal at the same time.
+    This assumes that neighbours are symmetric, which is true for all the grids.
+    Returns a list of cells, starting at start and ending at goal, or None if there is no path."""
+    forward = _SearchState(costs)
+    backward = _SearchState(costs)
+    scale = _min_cost(costs)
+    start_key = forward.key(start)
+    goal_key = forward.key(goal)
+    if start_key is None or goal_key is None:
+        return None
+    if start == goal:
+        return [start]
+    # The backward search stores in g the cost from each cell to goal.
+    # A step backwards from cell to neighbour costs the cost of entering cell.
+    forward.g[start_key] = 0
+    forward.parent[start_key] = None
+    backward.g[goal_key] = 0
+    backward.parent[goal_key] = None
+    counter = itertools.count()
+    forward_open = [(dist(*start, *goal) * scale, next(counter), start)]
+    backward_open = [(dist(*goal, *start) * scale, next(counter), goal)]
+    best = inf
+    meet = None
+    searches = [
+        (forward, backward, forward_open, goal),
+        (backward, forward, backward_open, start),
+    ]
+    while forward_open and backward_open:
+        # Once either side cannot find anything cheaper, the best path found so far is optimal
+        if max(forward_open[0][0], backward_open[0][0]) >= best:
+            break
+        # Expand whichever side has the smaller open list
+        (state, other, open_list, target) = searches[len(forward_open) > len(backward_open)]
+        is_forward = state is forward
+        (f, _, cell) = heapq.heappop(open_list)
+        key = state.key(cell)
+        if state.closed[key]:
+            continue
+        state.closed[key] = True
+        if stats is not None:
+            stats.expanded += 1
+        g = state.g[key]
+        for neighbour in neighbours(*cell):
+            neighbour_key = state.key(neighbour)
+            if neighbour_key is None or state.closed[neighbour_key]:
+                continue
+            step = state.cost(neighbour_key if is_forward else key)
+            new_g = g + step
+            if new_g < state.g[neighbour_key]:
+                state.g[neighbour_key] = new_g
+                state.parent[neighbour_key] = cell
+                heapq.heappush(open_list, (new_g + dist(*neighbour, *target) * scale, next(counter), neighbour))
+                if stats is not None:
+                    stats.generated += 1
+                if new_g + other.g[neighbour_key] < best:
+                    best = new_g + other.g[neighbour_key]
+                    meet = neighbour
+    if meet is None:
+        return None
+    path = forward.path(meet)
+    path.extend(reversed(backward.path(meet)[:-1]))
+    return path
+
+def dijkstra(start, neighbours, max_cost=inf, costs=None, stats=None):
+    """Finds the cost of the cheapest path from start to every cell reachable for at most max_cost.
+    Returns a dict mapping cells to costs."""
+    state = _SearchState(costs)
+    start_key = state.key(start)
+    if start_key is None:
+        return {}
+    state.g[start_key] = 0
+    result = {}
+    counter = itertools.count()
+    open_list = [(0, next(counter), start)]
+    while open_list:
+        (g, _, cell) = heapq.heappop(open_list)
+        key = state.key(cell)
+        if state.closed[key]:
+            continue
+        state.closed[key] = True
+        result[cell] = g
+        if stats is not None:
+            stats.expanded += 1
+        for neighbour in neighbours(*cell):
+            neighbour_key = state.key(neighbour)
+            if neighbour_key is None or state.closed[neighbour_key]:
+                continue
+            new_g = g + state.cost(neighbour_key)
+            if new_g <= max_cost and new_g < state.g[neighbour_key]:
+                state.g[neighbour_key] = new_g
+                heapq.heappush(open_list, (new_g, next(counter), neighbour))
+                if stats is not None:
+                    stats.generated += 1
+    return result
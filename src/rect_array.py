@@ -0,0 +1,294 @@
+# Rectangle Arrays
+# This module provides containers that store a value for every cell in a rectangle of cells.
+# Values live in a flat numpy array, laid out in the same order as the *_rect functions,
+# i.e. the position of each cell is given by the *_rect_index functions.
+#
+# Cells can be looked up one at a time:
+#   grid[x, y, z] = 5
+# or many at once, by passing an (N, 3) array of cells, or an array for each co-ordinate:
+#   grid[hexes] = values
+#   grid[xs, ys, zs]
+# Looking up a cell outside the rectangle raises KeyError.
+#
+# Pass order="morton" or order="hilbert" to store values in the order of a space filling curve instead
+# (see *_rect_morton_index and *_rect_hilbert_index), which keeps neighbouring cells closer together in memory.
+# Values are still stored without gaps, in the order the cells appear along the curve.
+
+import copy
+import functools
+import numpy as np
+import square
+import square_np
+import flat_topped_hex
+import flat_topped_hex_np
+import updown_tri
+import updown_tri_np
+import flat_topped_trihex
+import flat_topped_trihex_np
+
+class RectArray:
+    """Base class for arrays storing a value per cell of a rectangle.
+    Subclasses supply rect_index, which maps an array of cells to their index, or -1 if outside the rectangle,
+    rect_deindex, which does the reverse, and index, which looks up a single cell.
+    When order is given, ranks maps the index in rect order to the index in values, and rect_indices does the reverse."""
+
+    def __init__(self, size, dtype, fill, order=None):
+        self.values = np.full(size, fill, dtype)
+        self.order = order
+        if order is None:
+            self.ranks = None
+            self.rect_indices = None
+        else:
+            (self.ranks, self.rect_indices) = _curve_ranks(type(self), self.rect, order)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, cell):
+        return self.index(cell) is not None
+
+    def _lookup(self, key):
+        if isinstance(key, tuple):
+            cells = np.stack(np.broadcast_arrays(*key), axis=-1)
+        else:
+            cells = np.asarray(key)
+        index = self.rect_index(cells)
+        if np.any(index < 0):
+            raise KeyError("Cell is not inside rectangle")
+        return index
+
+    def __getitem__(self, key):
+        return self.values[self._lookup(key)]
+
+    def __setitem__(self, key, value):
+        self.values[self._lookup(key)] = value
+
+    def cells(self):
+        """Returns an array of every cell in the rectangle, in the same order as values"""
+        return self.rect_deindex(np.arange(len(self.values)))
+
+    def full_like(self, fill, dtype=None):
+        """Returns a new array over the same rectangle, with every value set to fill"""
+        result = copy.copy(self)
+        result.values = np.full(len(self.values), fill, self.values.dtype if dtype is None else dtype)
+        return result
+
+    def neighbour_indices(self):
+        """Returns an (N, K) array giving the index of each neighbour of each cell, or -1 if it is outside the rectangle.
+        Neighbours are in the same order as the grid's neighbours function.
+        The result is cached and read-only."""
+        return _neighbour_indices(type(self), self.rect, self.order)
+
+    def _store_index(self, index):
+        """Converts an index in rect order to the index in values"""
+        if self.ranks is None or index is None:
+            return index
+        return int(self.ranks[index])
+
+    def _store_indices(self, indices):
+        """Converts an array of indices in rect order to indices in values, keeping -1 for cells outside the rectangle"""
+        if self.ranks is None:
+            return indices
+        return np.where(indices >= 0, self.ranks[indices], -1)
+
+    def _rect_order(self, indices):
+        """Converts an array of indices in values to indices in rect order"""
+        if self.rect_indices is None:
+            return indices
+        return self.rect_indices[np.asarray(indices)]
+
+    def _store_order(self, cells):
+        """Reorders an iterable of cells in rect order to the order of values"""
+        if self.rect_indices is None:
+            return cells
+        cells = list(cells)
+        return (cells[i] for i in self.rect_indices)
+
+    def _check_rect_order(self):
+        if self.order is not None:
+            raise Exception("Rows and columns are only contiguous when stored in rect order")
+
+@functools.lru_cache(maxsize=16)
+def _neighbour_indices(cls, rect, order):
+    array = cls(*rect, order=order)
+    indices = array.rect_index(array.neighbours(array.cells()))
+    indices.setflags(write=False)
+    return indices
+
+@functools.lru_cache(maxsize=16)
+def _curve_ranks(cls, rect, order):
+    """Sorts the cells of a rectangle by their position along a curve.
+    Returns the position of each cell in rect order, and the rect order index of each position."""
+    array = cls(*rect)
+    rect_indices = np.argsort(array.curve_index(array.cells(), order), kind="stable")
+    ranks = np.empty_like(rect_indices)
+    ranks[rect_indices] = np.arange(len(rect_indices))
+    ranks.setflags(write=False)
+    rect_indices.setflags(write=False)
+    return (ranks, rect_indices)
+
+class SquareRectArray(RectArray):
+    """Stores a value for every square in a rectangle, as described by square_rect"""
+
+    def __init__(self, rect_x, rect_y, width, height, dtype=float, fill=0, order=None):
+        self.rect = (rect_x, rect_y, width, height)
+        RectArray.__init__(self, square.square_rect_size(*self.rect), dtype, fill, order)
+
+    def index(self, cell):
+        """Returns the index of a single square in values, or None if it is outside the rectangle"""
+        return self._store_index(square.square_rect_index(*cell, *self.rect))
+
+    def __iter__(self):
+        return self._store_order(square.square_rect(*self.rect))
+
+    def rect_index(self, squares):
+        """Returns the index of each square in values, or -1 if it is outside the rectangle"""
+        return self._store_indices(square_np.square_rect_index(squares, *self.rect))
+
+    def rect_deindex(self, indices):
+        """Returns the square stored at each index of values"""
+        return square_np.square_rect_deindex(self._rect_order(indices), *self.rect)
+
+    def curve_index(self, squares, order):
+        """Returns the position of each square along the curve named by order, either "morton" or "hilbert"."""
+        if order == "morton":
+            return square_np.square_rect_morton_index(squares, *self.rect)
+        if order == "hilbert":
+            return square_np.square_rect_hilbert_index(squares, *self.rect)
+        raise Exception("Unknown order " + str(order))
+
+    def neighbours(self, squares):
+        """Returns the neighbours of each square, as in square_np.square_neighbours"""
+        return square_np.square_neighbours(squares)
+
+    def column(self, dx):
+        """Returns a view of the values of the dx'th column of squares, from bottom to top"""
+        self._check_rect_order()
+        (rect_x, rect_y, width, height) = self.rect
+        return self.values[dx * height:(dx + 1) * height]
+
+class HexRectArray(RectArray):
+    """Stores a value for every hex in a rectangle, as described by hex_rect"""
+
+    def __init__(self, rect_x, rect_y, rect_z, width, height, inc_bottom=False, inc_top=False, dtype=float, fill=0, order=None):
+        self.rect = (rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top)
+        RectArray.__init__(self, flat_topped_hex.hex_rect_size(*self.rect), dtype, fill, order)
+
+    def index(self, cell):
+        """Returns the index of a single hex in values, or None if it is outside the rectangle"""
+        return self._store_index(flat_topped_hex.hex_rect_index(*cell, *self.rect))
+
+    def __iter__(self):
+        return self._store_order(flat_topped_hex.hex_rect(*self.rect))
+
+    def rect_index(self, hexes):
+        """Returns the index of each hex in values, or -1 if it is outside the rectangle"""
+        return self._store_indices(flat_topped_hex_np.hex_rect_index(hexes, *self.rect))
+
+    def rect_deindex(self, indices):
+        """Returns the hex stored at each index of values"""
+        return flat_topped_hex_np.hex_rect_deindex(self._rect_order(indices), *self.rect)
+
+    def curve_index(self, hexes, order):
+        """Returns the position of each hex along the curve named by order, either "morton" or "hilbert"."""
+        if order == "morton":
+            return flat_topped_hex_np.hex_rect_morton_index(hexes, *self.rect)
+        if order == "hilbert":
+            return flat_topped_hex_np.hex_rect_hilbert_index(hexes, *self.rect)
+        raise Exception("Unknown order " + str(order))
+
+    def neighbours(self, hexes):
+        """Returns the neighbours of each hex, as in flat_topped_hex_np.hex_neighbours"""
+        return flat_topped_hex_np.hex_neighbours(hexes)
+
+    def column(self, dx):
+        """Returns a view of the values of the dx'th column of hexes, from bottom to top"""
+        self._check_rect_order()
+        (rect_x, rect_y, rect_z, width, height, inc_bottom, inc_top) = self.rect
+        odd_height = int(inc_bottom) + int(inc_top) - 1
+        start = height * dx + odd_height * (dx // 2)
+        return self.values[start:start + height + (dx % 2) * odd_height]
+
+class TriRectArray(RectArray):
+    """Stores a value for every tri in a rectangle, as described by tri_rect"""
+
+    def __init__(self, rect_a, rect_b, rect_c, width, height, dtype=float, fill=0, order=None):
+        self.rect = (rect_a, rect_b, rect_c, width, height)
+        RectArray.__init__(self, updown_tri.tri_rect_size(*self.rect), dtype, fill, order)
+
+    def index(self, cell):
+        """Returns the index of a single tri in values, or None if it is outside the rectangle"""
+        return self._store_index(updown_tri.tri_rect_index(*cell, *self.rect))
+
+    def __iter__(self):
+        return self._store_order(updown_tri.tri_rect(*self.rect))
+
+    def rect_index(self, tris):
+        """Returns the index of each tri in values, or -1 if it is outside the rectangle"""
+        return self._store_indices(updown_tri_np.tri_rect_index(tris, *self.rect))
+
+    def rect_deindex(self, indices):
+        """Returns the tri stored at each index of values"""
+        return updown_tri_np.tri_rect_deindex(self._rect_order(indices), *self.rect)
+
+    def curve_index(self, tris, order):
+        """Returns the position of each tri along the curve named by order, either "morton" or "hilbert"."""
+        if order == "morton":
+            return updown_tri_np.tri_rect_morton_index(tris, *self.rect)
+        if order == "hilbert":
+            return updown_tri_np.tri_rect_hilbert_index(tris, *self.rect)
+        raise Exception("Unknown order " + str(order))
+
+    def neighbours(self, tris):
+        """Returns the neighbours of each tri, as in updown_tri_np.tri_neighbours"""
+        return updown_tri_np.tri_neighbours(tris)
+
+    def row(self, dy):
+        """Returns a view of the values of the dy'th row of tris, from left to right"""
+        self._check_rect_order()
+        (rect_a, rect_b, rect_c, width, height) = self.rect
+        return self.values[dy * width:(dy + 1) * width]
+
+class TrihexRectArray(RectArray):
+    """Stores a value for every trihex in a rectangle, as described by trihex_rect"""
+
+    def __init__(self, rect_a, rect_b, rect_c, width, height, dtype=float, fill=0, order=None):
+        self.rect = (rect_a, rect_b, rect_c, width, height)
+        RectArray.__init__(self, flat_topped_trihex.trihex_rect_size(*self.rect), dtype, fill, order)
+
+    def index(self, cell):
+        """Returns the index of a single trihex in values, or None if it is outside the rectangle"""
+        return self._store_index(flat_topped_trihex.trihex_rect_index(*cell, *self.rect))
+
+    def __iter__(self):
+        return self._store_order(flat_topped_trihex.trihex_rect(*self.rect))
+
+    def rect_index(self, trihexes):
+        """Returns the index of each trihex in values, or -1 if it is outside the rectangle"""
+        return self._store_indices(flat_topped_trihex_np.trihex_rect_index(trihexes, *self.rect))
+
+    def rect_deindex(self, indices):
+        """Returns the trihex stored at each index of values"""
+        return flat_topped_trihex_np.trihex_rect_deindex(self._rect_order(indices), *self.rect)
+
+    def curve_index(self, trihexes, order):
+        """Returns the position of each trihex along the curve named by order, either "morton" or "hilbert"."""
+        if order == "morton":
+            return flat_topped_trihex_np.trihex_rect_morton_index(trihexes, *self.rect)
+        if order == "hilbert":
+            return flat_topped_trihex_np.trihex_rect_hilbert_index(trihexes, *self.rect)
+        raise Exception("Unknown order " + str(order))
+
+    def neighbours(self, trihexes):
+        """Returns the neighbours of each trihex, as an (N, 6, 3) array.
+        Triangles are padded by repeating their last neighbour."""
+        return flat_topped_trihex_np.trihex_neighbours(trihexes)[0]
+
+    def row(self, dy):
+        """Returns a view of the values of the dy'th row of trihexes.
+        This lists the up triangles, then hexes, then down triangles, each from left to right."""
+        self._check_rect_order()
+        (rect_a, rect_b, rect_c, width, height) = self.rect
+        start = flat_topped_trihex.trihex_rect_size(rect_a, rect_b, rect_c, width, dy)
+        end = flat_topped_trihex.trihex_rect_size(rect_a, rect_b, rect_c, width, dy + 1)
+        return self.values[start:end]
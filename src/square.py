@@ -16,7 +16,11 @@
 from __future__ import division
 from math import floor, ceil, sqrt
 from settings import edge_length
-from common import mod
+from common import (
+    mod, span_difference, merge_spans, polygon_strip, circle_strip_max,
+    pack_pair, unpack_pair, morton_index, morton_deindex, curve_order,
+    hilbert_index, hilbert_deindex, Grid, identity_layout,
+)
 
 # Basics #######################################################################
 
@@ -54,6 +58,64 @@ def square_dist(x1, y1, x2, y2):
     """Returns how many steps one square is from another"""
     return abs(x1 - x2) + abs(y1 - y2)
 
+# Vertices and Edges ##########################################################
+
+# Vertices are identified by two integer co-ordinates x and y, same as squares,
+# with vertex (x, y) at the bottom left corner of square (x, y).
+# Edges are identified by the sum of the co-ordinates of the two vertices at each end.
+# So horizontal edges have odd x and even y, and vertical edges have even x and odd y.
+
+def square_vertex_center(x, y):
+    """Returns the position of a given vertex in cartesian co-ordinates"""
+    return (x * edge_length, y * edge_length)
+
+def square_vertices(x, y):
+    """Returns the four vertices of a given square.
+    These are in the same order as square_corners"""
+    return [
+        (x    , y    ),
+        (x + 1, y    ),
+        (x + 1, y + 1),
+        (x    , y + 1),
+    ]
+
+def square_vertex_squares(x, y):
+    """Returns the four squares that touch a given vertex"""
+    return [
+        (x    , y    ),
+        (x - 1, y    ),
+        (x - 1, y - 1),
+        (x    , y - 1),
+    ]
+
+def square_edges(x, y):
+    """Returns the four edges of a given square.
+    The ith edge runs from the ith vertex of square_vertices to the next one."""
+    return [
+        (2 * x + 1, 2 * y    ),
+        (2 * x + 2, 2 * y + 1),
+        (2 * x + 1, 2 * y + 2),
+        (2 * x    , 2 * y + 1),
+    ]
+
+def square_edge_center(x, y):
+    """Returns the midpoint of a given edge in cartesian co-ordinates"""
+    return (x * edge_length / 2, y * edge_length / 2)
+
+def square_edge_vertices(x, y):
+    """Returns the two vertices at either end of a given edge"""
+    if x % 2 == 1:
+        return [((x - 1) // 2, y // 2), ((x + 1) // 2, y // 2)]
+    else:
+        return [(x // 2, (y - 1) // 2), (x // 2, (y + 1) // 2)]
+
+def square_edge_squares(x, y):
+    """Returns the two squares either side of a given edge"""
+    if x % 2 == 1:
+        return [((x - 1) // 2, y // 2 - 1), ((x - 1) // 2, y // 2)]
+    else:
+        return [(x // 2 - 1, (y - 1) // 2), (x // 2, (y - 1) // 2)]
+
 # Symmetry #####################################################################
 
 def square_rotate_90(x, y, n = 1):
@@ -99,16 +161,42 @@ def square_disc(x, y, r):
         for dy in range(-r + abs(dx), r - abs(dx) + 1):
             yield (x + dx, y + dy)
 
+def square_ring(x, y, r):
+    """Returns the squares that are exactly distance r from the given square,
+    in counter clockwise order starting from the right"""
+    if r == 0:
+        yield (x, y)
+        return
+    for i in range(r):
+        yield (x + r - i, y + i)
+    for i in range(r):
+        yield (x - i, y + r - i)
+    for i in range(r):
+        yield (x - r + i, y - i)
+    for i in range(r):
+        yield (x + i, y - r + i)
+
+def square_spiral(x, y, r):
+    """Returns the squares that are at most distance r from the given square,
+    ordered by distance, then in counter clockwise order"""
+    for i in range(r + 1):
+        yield from square_ring(x, y, i)
+
+def square_disc_size(r):
+    """Returns the number of squares at most distance r from a given square.
+    Equivalent to len(list(square_disc(...)))"""
+    return 2 * r * r + 2 * r + 1
+
 def square_line_intersect(x1, y1, x2, y2):
     """Returns squares that intersect the line specified in cartesian co-ordinates"""
-    x1 /= edge_length
-    y1 /= edge_length
-    x2 /= edge_length
-    y2 /= edge_length
+    return _square_line_intersect(x1 / edge_length, y1 / edge_length, x2 / edge_length, y2 / edge_length)
+
+def _square_line_intersect(x1, y1, x2, y2):
+    """As square_line_intersect, with co-ordinates in units of edge_length"""
     dx = x2 - x1
     dy = y2 - y1
     x = floor(x1)
-    y = floor(x2)
+    y = floor(y1)
     stepx = 1 if dx > 0 else -1
     stepy = 1 if dy > 0 else -1
     tx = (x + int(dx >= 0) - x1) / dx if dx != 0 else float('inf')
@@ -134,15 +222,94 @@ def square_line(x1, y1, x2, y2):
     return square_line_intersect(fx1, fy1, fx2, fy2)
 
 def square_rect_intersect(x, y, width, height):
-    """Returns the square that intersect the rectangle specified in cartesian co-ordinates"""
+    """Returns the squares that intersect the rectangle specified in cartesian co-ordinates"""
+    for (x, miny, maxy) in square_rect_intersect_spans(x, y, width, height):
+        for y in range(miny, maxy + 1):
+            yield (x, y)
+
+def square_rect_intersect_size(x, y, width, height):
+    """Returns the number of squares that intersect the rectangle specified in cartesian co-ordinates.
+    Equivalent to len(list(square_rect_intersect(...)))"""
     minx = floor(x / edge_length)
-    maxx = ceil((x + width) / edge_length)
+    maxx = max(minx, ceil((x + width) / edge_length) - 1)
     miny = floor(y / edge_length)
-    maxy = ceil((y + height) / edge_length)
+    maxy = max(miny, ceil((y + height) / edge_length) - 1)
+    return (maxx - minx + 1) * (maxy - miny + 1)
+
+def square_rect_intersect_spans(x, y, width, height):
+    """Returns the squares that intersect the rectangle specified in cartesian co-ordinates,
+    as one span (x, miny, maxy) per column, covering the squares from (x, miny) to (x, maxy) inclusive.
+    Columns match the layout of square_rect, so each span is a contiguous slice of a rectangle's storage."""
+    return _square_rect_intersect_spans(x / edge_length, y / edge_length, width / edge_length, height / edge_length)
+
+def _square_rect_intersect_spans(x, y, width, height):
+    """As square_rect_intersect_spans, with co-ordinates in units of edge_length"""
+    # Squares only touching the edge of the rectangle don't count, as in square_polygon_intersect.
+    # A rectangle with no width or height still intersects the squares it lies in.
+    minx = floor(x)
+    maxx = max(minx, ceil(x + width) - 1)
+    miny = floor(y)
+    maxy = max(miny, ceil(y + height) - 1)
     for x in range(minx, maxx + 1):
-        for y  in range(miny, maxy + 1):
+        yield (x, miny, maxy)
+
+def square_rect_intersect_delta(x1, y1, width1, height1, x2, y2, width2, height2):
+    """Given a rectangle specified in cartesian co-ordinates that moves or resizes from (x1, y1, width1, height1) to (x2, y2, width2, height2),
+    returns a pair of lists of the squares that start intersecting it, and those that stop intersecting it.
+    Both are lists of spans (x, miny, maxy), as in square_rect_intersect_spans.
+    For a small move, this is much less than the squares in the whole rectangle."""
+    old = list(square_rect_intersect_spans(x1, y1, width1, height1))
+    new = list(square_rect_intersect_spans(x2, y2, width2, height2))
+    return (list(span_difference(new, old)), list(span_difference(old, new)))
+
+def square_polygon_intersect(points):
+    """Returns the squares that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners.
+    The polygon can be concave, but its edges shouldn't cross."""
+    for (x, miny, maxy) in square_polygon_intersect_spans(points):
+        for y in range(miny, maxy + 1):
             yield (x, y)
 
+def square_polygon_intersect_spans(points):
+    """Returns the squares that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners,
+    as spans (x, miny, maxy), as in square_rect_intersect_spans. Concave polygons can have several spans per column."""
+    return _square_polygon_intersect_spans([(x / edge_length, y / edge_length) for (x, y) in points])
+
+def _square_polygon_intersect_spans(points):
+    """As square_polygon_intersect_spans, with co-ordinates in units of edge_length"""
+    # Swap x and y, so the polygon can be split into columns
+    points = [(y, x) for (x, y) in points]
+    minx = min(x for (y, x) in points)
+    maxx = max(x for (y, x) in points)
+    for x in range(floor(minx), ceil(maxx)):
+        spans = []
+        for corners in polygon_strip(points, x, x + 1):
+            miny = min(y for (y, x) in corners)
+            maxy = max(y for (y, x) in corners)
+            spans.append((x, floor(miny), ceil(maxy) - 1))
+        yield from merge_spans(spans)
+
+def square_circle_intersect(x, y, r):
+    """Returns the squares that intersect the circle with center (x, y) and radius r in cartesian co-ordinates"""
+    for (x, miny, maxy) in square_circle_intersect_spans(x, y, r):
+        for y in range(miny, maxy + 1):
+            yield (x, y)
+
+def square_circle_intersect_spans(x, y, r):
+    """Returns the squares that intersect the circle with center (x, y) and radius r in cartesian co-ordinates,
+    as spans (x, miny, maxy), as in square_rect_intersect_spans."""
+    return _square_circle_intersect_spans(x / edge_length, y / edge_length, r / edge_length)
+
+def _square_circle_intersect_spans(cx, cy, r):
+    """As square_circle_intersect_spans, with co-ordinates in units of edge_length"""
+    assert r >= 0, "Circle should have non-negative radius"
+    for x in range(floor(cx - r), ceil(cx + r)):
+        # With x and y swapped, find the highest and lowest point of the circle in this column
+        lo = max(x, cx - r)
+        hi = min(x + 1, cx + r)
+        miny = -circle_strip_max(cy, cx, r, lo, hi, -1, 0)
+        maxy = circle_strip_max(cy, cx, r, lo, hi, 1, 0)
+        yield (x, floor(miny), ceil(maxy) - 1)
+
 def square_rect(rect_x, rect_y, width, height):
     """Returns the squares in a rectangle that includes the given sququre in the bottom left, 
     that extends `height` squares upwards, and `width` squares to the right."""
@@ -168,14 +335,14 @@ def square_rect_index(x, y, rect_x, rect_y, width, height):
     dy = y - rect_y
     if dx < 0 or dx >= width or dy < 0 or dy >= height:
         return None
-    return dx + dy * width
+    return dx * height + dy
 
 def square_rect_deindex(index, rect_x, rect_y, width, height):
     """Performs the inverse of square_rect_index
     Equivalent to list(square_rect(...))[index]"""
-    dx = index % width
-    dy = index // width
-    assert dx >= 0 and dy < height
+    dx = index // height
+    dy = index % height
+    assert dx >= 0 and dx < width
     return (rect_x + dx, rect_y + dy)
 
 def square_rect_size(rect_x, rect_y, width, height):
@@ -183,6 +350,57 @@ def square_rect_size(rect_x, rect_y, width, height):
     Equivalent to len(list(square_rect(...)))"""
     return width * height
 
+# The curve functions give other orders for the squares of a rectangle, following a space filling curve
+# through the co-ordinates from square_rect_knoll, see common.py.
+# Nearby squares are more often stored close together than with square_rect_index, but indices can skip values.
+
+def square_rect_morton_index(x, y, rect_x, rect_y, width, height):
+    """Like square_rect_index, but gives the position of the square along the Z-order curve through the rectangle.
+    Returns None if the square is not in the rectangle."""
+    if square_rect_index(x, y, rect_x, rect_y, width, height) is None:
+        return None
+    return morton_index(*square_rect_knoll(x, y, rect_x, rect_y, width, height))
+
+def square_rect_morton_deindex(index, rect_x, rect_y, width, height):
+    """Performs the inverse of square_rect_morton_index"""
+    square = square_rect_unknoll(*morton_deindex(index), rect_x, rect_y, width, height)
+    if square_rect_index(*square, rect_x, rect_y, width, height) is None:
+        raise Exception("Square is not inside rectangle")
+    return square
+
+def square_rect_hilbert_index(x, y, rect_x, rect_y, width, height):
+    """Like square_rect_index, but gives the position of the square along the Hilbert curve through the rectangle.
+    Returns None if the square is not in the rectangle."""
+    if square_rect_index(x, y, rect_x, rect_y, width, height) is None:
+        return None
+    return hilbert_index(*square_rect_knoll(x, y, rect_x, rect_y, width, height), curve_order(width, height))
+
+def square_rect_hilbert_deindex(index, rect_x, rect_y, width, height):
+    """Performs the inverse of square_rect_hilbert_index"""
+    square = square_rect_unknoll(*hilbert_deindex(index, curve_order(width, height)), rect_x, rect_y, width, height)
+    if square_rect_index(*square, rect_x, rect_y, width, height) is None:
+        raise Exception("Square is not inside rectangle")
+    return square
+
+def square_rect_vertices(rect_x, rect_y, width, height):
+    """Returns the vertices of all the squares in a rectangle, in the order used by square_rect_vertex_index"""
+    return square_rect(rect_x, rect_y, width + 1, height + 1)
+
+def square_rect_vertex_index(x, y, rect_x, rect_y, width, height):
+    """Given a vertex and a rectangle, gives a linear position of the vertex.
+    The index is an integer between zero and square_rect_vertex_size - 1.
+    This is useful for storing a vertex buffer for the rectangle.
+    Returns None if the vertex is not on a square of the rectangle."""
+    return square_rect_index(x, y, rect_x, rect_y, width + 1, height + 1)
+
+def square_rect_vertex_deindex(index, rect_x, rect_y, width, height):
+    """Performs the inverse of square_rect_vertex_index"""
+    return square_rect_deindex(index, rect_x, rect_y, width + 1, height + 1)
+
+def square_rect_vertex_size(rect_x, rect_y, width, height):
+    """Returns the number of vertices of the squares in a given rectangle."""
+    return square_rect_size(rect_x, rect_y, width + 1, height + 1)
+
 # Nesting ## ###################################################################
 
 parent_width = 3
@@ -199,4 +417,68 @@ def square_parent_rect(x, y):
 def square_parent_children(x, y):
     """Returns all children squares of a given parent square"""
     (x, y, width, height) = square_parent_rect(x, y)
-    return square_rect(x, y, width, height)
\ No newline at end of file
+    return square_rect(x, y, width, height)
+
+# Packed Keys ##################################################################
+
+# Squares are packed with common.pack_pair, so x and y must be from -2**31 to 2**31 - 1.
+
+def square_pack(x, y):
+    """Packs a square into a single integer key"""
+    return pack_pair(x, y)
+
+def square_unpack(key):
+    """Returns the square packed by square_pack"""
+    return unpack_pair(key)
+
+# Grid Objects #################################################################
+
+# The functions above all use the edge_length from settings.
+# SquareGrid does the same calculations with its own edge length, so grids of different sizes can be used side by side,
+# and an optional layout, see common.py, for placing the grid in world co-ordinates.
+# Its methods work like the functions of the same name, without the square_ prefix.
+
+class SquareGrid(Grid):
+    """A grid of squares with a given edge length and layout, see Grid in common.py.
+    The matrices used by center and pick are worked out once, when the grid is created."""
+    __slots__ = ("center_matrix", "pick_matrix")
+    vertices = staticmethod(square_vertices)
+    _line_intersect = staticmethod(_square_line_intersect)
+    _rect_intersect_spans = staticmethod(_square_rect_intersect_spans)
+    _polygon_intersect_spans = staticmethod(_square_polygon_intersect_spans)
+    _circle_intersect_spans = staticmethod(_square_circle_intersect_spans)
+
+    def __init__(self, edge_length=1, layout=identity_layout):
+        Grid.__init__(self, edge_length, layout)
+        # Rows give world x and y in terms of x, y and a constant, as in square_center
+        self.center_matrix = self.world_matrix((
+            (1, 0, 0.5),
+            (0, 1, 0.5),
+        ))
+        # Rows give x and y in units of edge_length, in terms of world x, y and a constant, as in pick_square
+        self.pick_matrix = self.unit
+
+    def center(self, x, y):
+        """Returns the center of a given square in cartesian co-ordinates"""
+        ((xx, xy, xt), (yx, yy, yt)) = self.center_matrix
+        return (xx * x + xy * y + xt, yx * x + yy * y + yt)
+
+    def pick(self, x, y):
+        """Returns the square that contains a given cartesian co-ordinate point"""
+        ((xx, xy, xt), (yx, yy, yt)) = self.pick_matrix
+        return (floor(xx * x + xy * y + xt), floor(yx * x + yy * y + yt))
+
+    def vertex_center(self, x, y):
+        """Returns the position of a given vertex in cartesian co-ordinates"""
+        return self.center(x - 0.5, y - 0.5)
+
+    def edge_center(self, x, y):
+        """Returns the midpoint of a given edge in cartesian co-ordinates"""
+        return self.center(x / 2 - 0.5, y / 2 - 0.5)
+
+    @staticmethod
+    def span_cells(spans):
+        """Returns the squares covered by spans (x, miny, maxy)"""
+        for (x, miny, maxy) in spans:
+            for y in range(miny, maxy + 1):
+                yield (x, y)
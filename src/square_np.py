@@ -0,0 +1,259 @@
+# Vectorized Square grid
+# This module mirrors functions from square, but works on many points or squares at once using numpy.
+#
+# Points are passed as float arrays of shape (N, 2), with each row being an x, y cartesian co-ordinate.
+# Squares are passed as integer arrays of shape (N, 2), with each row being an x, y co-ordinate.
+# Any extra leading dimensions are preserved, so (N, M, 2) works too.
+
+import functools
+import numpy as np
+import square
+from settings import edge_length
+from common import curve_order
+from common_np import mesh, affine, pack_pair, unpack_pair, morton_index, morton_deindex, hilbert_index, hilbert_deindex, ray_points, march_cells, march_hits
+
+# Basics #######################################################################
+
+def square_center(squares, dtype=float):
+    """Returns the centers of the given squares in cartesian co-ordinates, as an (N, 2) array"""
+    squares = np.asarray(squares)
+    return ((squares + 0.5) * edge_length).astype(dtype)
+
+# Offsets of each corner from the square, in the same order as square.square_corners
+square_corner_offsets = np.array([
+    (-0.5, -0.5),
+    ( 0.5, -0.5),
+    ( 0.5,  0.5),
+    (-0.5,  0.5),
+])
+
+def square_corners(squares, dtype=np.float32):
+    """Returns the four corners of the given squares in cartesian co-ordinates, as an (N, 4, 2) array.
+    The result is contiguous, so is suitable for uploading directly as a vertex buffer."""
+    squares = np.asarray(squares)
+    return square_center(squares[..., None, :] + square_corner_offsets, dtype)
+
+def pick_square(points):
+    """Returns the squares that contain the given cartesian co-ordinate points"""
+    points = np.asarray(points, dtype=float)
+    return np.floor(points / edge_length).astype(np.int64)
+
+def square_grid_center(grid, squares, dtype=float):
+    """Returns the centers of the given squares in the world co-ordinates of grid, a SquareGrid, as an (N, 2) array"""
+    return affine(grid.center_matrix, squares).astype(dtype)
+
+def square_grid_pick(grid, points):
+    """Returns the squares of grid, a SquareGrid, that contain the given world co-ordinate points"""
+    return np.floor(affine(grid.pick_matrix, points)).astype(np.int64)
+
+# Offsets of each neighbour from the square, in the same order as square.square_neighbours
+square_neighbour_offsets = np.array([
+    ( 1,  0),
+    ( 0,  1),
+    (-1,  0),
+    ( 0, -1),
+])
+
+def square_neighbours(squares):
+    """Returns the four squares that share an edge with each given square, as an (N, 4, 2) array"""
+    squares = np.asarray(squares)
+    return squares[..., None, :] + square_neighbour_offsets
+
+# Packed Keys ##################################################################
+
+# Keys are packed as in square.square_pack, but as int64 arrays.
+
+def square_pack(squares):
+    """Packs the given squares into an int64 array of keys"""
+    squares = np.asarray(squares)
+    return pack_pair(squares[..., 0], squares[..., 1])
+
+def square_unpack(keys):
+    """Returns the squares packed by square_pack, as an (N, 2) array"""
+    return np.stack(unpack_pair(keys), axis=-1)
+
+# As packing is linear, each neighbour's key differs by the key of its offset
+square_neighbour_key_offsets = square_pack(square_neighbour_offsets)
+
+def square_key_neighbours(keys):
+    """Returns the keys of the four squares that share an edge with each given key, as an (N, 4) array,
+    in the same order as square_neighbours"""
+    return np.asarray(keys, dtype=np.int64)[..., None] + square_neighbour_key_offsets
+
+# Shapes #######################################################################
+
+# The rect functions take the same rectangle arguments as in square, and
+# return -1 rather than None for squares that are not in the rectangle.
+
+def square_rect_knoll(squares, rect_x, rect_y, width, height):
+    """Given squares and a rectangle, gives an (N, 2) array of integer co-ordinates that identify each square in the rectangle.
+    Unlike square_rect_index, this does not check if the squares are inside the rectangle."""
+    squares = np.asarray(squares)
+    return squares - (rect_x, rect_y)
+
+def square_rect_unknoll(knolls, rect_x, rect_y, width, height):
+    """Given an (N, 2) array of co-ordinate pairs and a rectangle, reverses square_rect_knoll"""
+    knolls = np.asarray(knolls)
+    return knolls + (rect_x, rect_y)
+
+def square_rect_index(squares, rect_x, rect_y, width, height):
+    """Given squares and a rectangle, gives the linear position of each square.
+    Each index is an integer between zero and square_rect_size - 1, or -1 if the square is not in the rectangle."""
+    knolls = square_rect_knoll(squares, rect_x, rect_y, width, height)
+    dx = knolls[..., 0]
+    dy = knolls[..., 1]
+    inside = (dx >= 0) & (dx < width) & (dy >= 0) & (dy < height)
+    return np.where(inside, dx * height + dy, -1)
+
+def square_rect_deindex(indices, rect_x, rect_y, width, height):
+    """Performs the inverse of square_rect_index"""
+    indices = np.asarray(indices)
+    if np.any((indices < 0) | (indices >= width * height)):
+        raise Exception("Square is not inside rectangle")
+    knolls = np.stack([indices // height, indices % height], axis=-1)
+    return square_rect_unknoll(knolls, rect_x, rect_y, width, height)
+
+def square_rect_morton_index(squares, rect_x, rect_y, width, height):
+    """Vectorized version of square.square_rect_morton_index, giving -1 for squares not in the rectangle"""
+    knolls = square_rect_knoll(squares, rect_x, rect_y, width, height)
+    inside = square_rect_index(squares, rect_x, rect_y, width, height) >= 0
+    return np.where(inside, morton_index(knolls[..., 0], knolls[..., 1]), -1)
+
+def square_rect_morton_deindex(indices, rect_x, rect_y, width, height):
+    """Performs the inverse of square_rect_morton_index"""
+    squares = square_rect_unknoll(np.stack(morton_deindex(indices), axis=-1), rect_x, rect_y, width, height)
+    if np.any(square_rect_index(squares, rect_x, rect_y, width, height) < 0):
+        raise Exception("Square is not inside rectangle")
+    return squares
+
+def square_rect_hilbert_index(squares, rect_x, rect_y, width, height):
+    """Vectorized version of square.square_rect_hilbert_index, giving -1 for squares not in the rectangle"""
+    knolls = square_rect_knoll(squares, rect_x, rect_y, width, height)
+    inside = square_rect_index(squares, rect_x, rect_y, width, height) >= 0
+    return np.where(inside, hilbert_index(knolls[..., 0], knolls[..., 1], curve_order(width, height)), -1)
+
+def square_rect_hilbert_deindex(indices, rect_x, rect_y, width, height):
+    """Performs the inverse of square_rect_hilbert_index"""
+    squares = square_rect_unknoll(np.stack(hilbert_deindex(indices, curve_order(width, height)), axis=-1), rect_x, rect_y, width, height)
+    if np.any(square_rect_index(squares, rect_x, rect_y, width, height) < 0):
+        raise Exception("Square is not inside rectangle")
+    return squares
+
+# The disc offset tables are cached, as disc shapes only depend on the radius.
+# The tables are read-only, so are safe to share between callers.
+
+@functools.lru_cache(maxsize=64)
+def square_disc_offsets(r):
+    """Returns the offsets from a square of every square at most distance r from it, as an (M, 2) array.
+    These are in the same order as square.square_spiral"""
+    offsets = np.array(list(square.square_spiral(0, 0, r)))
+    offsets.setflags(write=False)
+    return offsets
+
+def square_disc(squares, r):
+    """Returns the squares at most distance r from each given square, as an (N, M, 2) array.
+    These are in the same order as square.square_spiral"""
+    squares = np.asarray(squares)
+    return squares[..., None, :] + square_disc_offsets(r)
+
+# The line functions take (N, 2) arrays of start and end points, and step every line through the grid together.
+# As lines pass through different numbers of squares, they return a pair of arrays, the squares, and
+# an (N + 1,) array of offsets, so that the squares of the ith line are squares[offsets[i]:offsets[i + 1]].
+
+def square_march(starts, ends, visit):
+    """Steps through the squares of many lines at once, in the same way as square.square_line_intersect"""
+    starts, ends = ray_points(starts, ends)
+    x1 = starts[:, 0] / edge_length
+    y1 = starts[:, 1] / edge_length
+    x2 = ends[:, 0] / edge_length
+    y2 = ends[:, 1] / edge_length
+    dx = x2 - x1
+    dy = y2 - y1
+    x = np.floor(x1).astype(np.int64)
+    y = np.floor(y1).astype(np.int64)
+    stepx = np.where(dx > 0, 1, -1)
+    stepy = np.where(dy > 0, 1, -1)
+    with np.errstate(divide="ignore"):
+        tx = np.where(dx != 0, (x + (dx >= 0) - x1) / dx, np.inf)
+        ty = np.where(dy != 0, (y + (dy >= 0) - y1) / dy, np.inf)
+        idx = np.where(dx != 0, np.abs(1 / dx), np.inf)
+        idy = np.where(dy != 0, np.abs(1 / dy), np.inf)
+    rays = np.arange(len(x))
+    stop = visit(rays, np.stack([x, y], axis=-1))
+    active = np.ones(len(x), bool) if stop is None else ~stop
+    while np.any(active):
+        rays = np.flatnonzero(active)
+        use_x = tx[rays] <= ty[rays]
+        done = np.where(use_x, tx[rays], ty[rays]) > 1
+        active[rays[done]] = False
+        (rays, use_x) = (rays[~done], use_x[~done])
+        if len(rays) == 0:
+            break
+        rx = rays[use_x]
+        ry = rays[~use_x]
+        x[rx] += stepx[rx]
+        tx[rx] += idx[rx]
+        y[ry] += stepy[ry]
+        ty[ry] += idy[ry]
+        stop = visit(rays, np.stack([x[rays], y[rays]], axis=-1))
+        if stop is not None:
+            active[rays[stop]] = False
+
+def square_line_intersect(starts, ends):
+    """Returns the squares that intersect each line specified in cartesian co-ordinates, as a pair of squares and offsets"""
+    return march_cells(square_march, starts, ends)
+
+def square_raycast(starts, ends, opaque):
+    """Finds the first square along each line that is opaque, i.e. truthy in opaque, a SquareRectArray.
+    Squares outside the rectangle of opaque also count as opaque. Lines stop at the first opaque square.
+    Returns a pair, an (N, 2) array of squares, and an (N,) boolean array that is false for lines that hit nothing.
+    Those lines give the square containing their end point instead."""
+    return march_hits(square_march, starts, ends, opaque)
+
+# Vertices and Edges ##########################################################
+
+# Offsets of each vertex from the square, in the same order as square.square_vertices
+square_vertex_offsets = np.array([
+    (0, 0),
+    (1, 0),
+    (1, 1),
+    (0, 1),
+])
+
+def square_vertices(squares):
+    """Returns the four vertices of the given squares, as an (N, 4, 2) array.
+    These are in the same order as square_corners"""
+    squares = np.asarray(squares)
+    return squares[..., None, :] + square_vertex_offsets
+
+def square_edges(squares):
+    """Returns the four edges of the given squares, as an (N, 4, 2) array.
+    The ith edge runs from the ith vertex of square_vertices to the next one."""
+    vertices = square_vertices(squares)
+    return vertices + np.roll(vertices, -1, axis=-2)
+
+def square_mesh(squares, index_dtype=np.uint32):
+    """Returns the distinct vertices of the given squares, and how to index them.
+    Returns a pair, a (V, 2) array of vertices, and an (N, 4) index array, so that
+    vertices[indices[i]] is square_vertices(squares)[i].
+    Use square_vertex_center(vertices) to get a vertex buffer."""
+    return mesh(square_vertices(squares), index_dtype)
+
+def square_vertex_center(vertices, dtype=np.float32):
+    """Returns the positions of the given vertices in cartesian co-ordinates, as an (N, 2) array"""
+    return (np.asarray(vertices) * edge_length).astype(dtype)
+
+# Nesting ######################################################################
+
+def square_parent(squares):
+    """Returns the parent square containing each given square, as in square.square_parent"""
+    return np.floor_divide(np.asarray(squares), (square.parent_width, square.parent_height))
+
+# Offsets of each child from the bottom left child of a parent, in the same order as square.square_parent_children
+square_child_offsets = np.array(list(square.square_rect(0, 0, square.parent_width, square.parent_height)))
+
+def square_parent_children(parents):
+    """Returns the children of each given parent square, as an (N, M, 2) array,
+    in the same order as square.square_parent_children"""
+    parents = np.asarray(parents)
+    return (parents * (square.parent_width, square.parent_height))[..., None, :] + square_child_offsets
@@ -0,0 +1,55 @@
+from chunk_store import *
+from square import square_parent, square_parent_children
+from flat_topped_hex import hex_parent, hex_pack
+import numpy as np
+import unittest
+
+class TestChunkStore(unittest.TestCase):
+
+    def test_square(self):
+        store = SquareChunkStore(levels=1, dtype=np.int32)
+        self.assertEqual(store[100, -200], 0)
+        self.assertEqual(len(store.chunks), 0)
+        store[100, -200] = 5
+        self.assertEqual(store[100, -200], 5)
+        self.assertEqual(store[101, -200], 0)
+        self.assertIn((101, -200), store)
+        self.assertNotIn((0, 0), store)
+        self.assertEqual(len(store.chunks), 1)
+        np.testing.assert_array_equal(store.chunk_cells(next(iter(store.chunks))), list(square_parent_children(*square_parent(100, -200))))
+
+    def test_hex(self):
+        store = HexChunkStore(dtype=np.int64, fill=-1)
+        hexes = np.array([(x, y, -x - y) for x in range(-30, 30) for y in range(-30, 30)])
+        self.assertTrue((store[hexes] == -1).all())
+        store[hexes] = np.arange(len(hexes))
+        np.testing.assert_array_equal(store[hexes], np.arange(len(hexes)))
+        np.testing.assert_array_equal(store[hexes[:, 0], hexes[:, 1], hexes[:, 2]], np.arange(len(hexes)))
+        # Each chunk is the grandparent of its hexes
+        (chunks, indices) = store.locate(hexes)
+        for hex, chunk in zip(hexes[::37], chunks[::37]):
+            self.assertEqual(chunk, hex_pack(*hex_parent(*hex_parent(*hex))))
+        for key in store.chunks:
+            cells = store.chunk_cells(key)
+            self.assertEqual(len(cells), store.chunk_size)
+            (chunks, indices) = store.locate(cells)
+            self.assertTrue((chunks == key).all())
+            np.testing.assert_array_equal(indices, np.arange(store.chunk_size))
+
+    def test_eviction(self):
+        evicted = []
+        store = SquareChunkStore(levels=1, max_chunks=2, on_evict=lambda key, values: evicted.append(values.copy()))
+        store[0, 0] = 1
+        store[3, 0] = 2
+        # Reading a chunk makes it the most recently used
+        self.assertEqual(store[0, 0], 1)
+        store[6, 0] = 3
+        self.assertEqual(store.evictions, 1)
+        self.assertEqual(evicted[0][0], 2)
+        self.assertEqual(store[3, 0], 0)
+        self.assertEqual(store[0, 0], 1)
+        self.assertEqual(store[6, 0], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+from distance_transform import *
+from rect_array import *
+from square import square_dist
+from flat_topped_hex import hex_dist
+from updown_tri import tri_dist
+from flat_topped_trihex import trihex_dist
+import numpy as np
+import unittest
+
+class TestDistanceTransform(unittest.TestCase):
+
+    def test_distance_transform(self):
+        rng = np.random.default_rng(0)
+        for (features, dist) in [
+            (SquareRectArray(1, -2, 9, 7, dtype=bool), square_dist),
+            (SquareRectArray(1, -2, 9, 7, dtype=bool, order="hilbert"), square_dist),
+            (HexRectArray(1, 0, -1, 9, 7, dtype=bool, order="morton"), hex_dist),
+            (HexRectArray(1, 0, -1, 9, 7, dtype=bool), hex_dist),
+            (HexRectArray(0, 0, 0, 8, 6, True, True, dtype=bool), hex_dist),
+            (TriRectArray(0, 1, 0, 9, 7, dtype=bool), tri_dist),
+            (TrihexRectArray(1, 0, 0, 9, 7, dtype=bool), trihex_dist),
+        ]:
+            for count in [1, 5]:
+                features.values[:] = False
+                features.values[rng.choice(len(features), count, replace=False)] = True
+                walls = [tuple(cell) for cell in features.cells()[features.values]]
+                distances = distance_transform(features)
+                self.assertEqual(distances.dtype, np.int64)
+                for cell, d in zip(features.cells(), distances):
+                    self.assertEqual(d, min(dist(*cell, *wall) for wall in walls))
+
+    def test_thin_rects(self):
+        # These rects are only one cell across, so some of their cells only connect outside the rect
+        for (features, dist) in [
+            (TriRectArray(0, 0, 1, 1, 3, dtype=bool), tri_dist),
+            (TrihexRectArray(0, 0, 0, 1, 4, dtype=bool), trihex_dist),
+            (HexRectArray(0, 0, 0, 4, 1, dtype=bool), hex_dist),
+        ]:
+            cells = features.cells()
+            for i in range(len(features)):
+                features.values[:] = False
+                features.values[i] = True
+                distances = distance_transform(features)
+                for cell, d in zip(cells, distances):
+                    self.assertEqual(d, dist(*cell, *cells[i]))
+
+    def test_no_features(self):
+        features = HexRectArray(0, 0, 0, 3, 3, dtype=bool)
+        self.assertTrue((distance_transform(features) == -1).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
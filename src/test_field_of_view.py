@@ -0,0 +1,73 @@
+from field_of_view import *
+from rect_array import *
+from square import square_center, square_corners, square_disc, square_line_intersect
+from flat_topped_hex import hex_center, hex_corners, hex_disc, hex_ring, hex_line_intersect
+from updown_tri import tri_center, tri_corners, tri_disc, tri_line_intersect
+from flat_topped_trihex import trihex_center, trihex_corners, trihex_disc, trihex_line_intersect
+from math import hypot
+import numpy as np
+import unittest
+
+def passes_corner(p, q, cells, corners):
+    """Returns true if the line from p to q passes through a corner of one of cells"""
+    ((x1, y1), (x2, y2)) = (p, q)
+    for cell in cells:
+        for (cx, cy) in corners(*cell):
+            t = ((cx - x1) * (x2 - x1) + (cy - y1) * (y2 - y1)) / ((x2 - x1) ** 2 + (y2 - y1) ** 2)
+            if 0 < t < 1 and hypot(x1 + t * (x2 - x1) - cx, y1 + t * (y2 - y1) - cy) < 1e-7:
+                return True
+    return False
+
+class TestFieldOfView(unittest.TestCase):
+
+    cases = [
+        (SquareRectArray(-10, -10, 21, 21, dtype=bool), (0, 0), square_field_of_view, square_disc, square_line_intersect, square_center, square_corners),
+        (HexRectArray(-10, -5, 15, 21, 21, dtype=bool), (0, 0, 0), hex_field_of_view, hex_disc, hex_line_intersect, hex_center, hex_corners),
+        (TriRectArray(-4, -10, 16, 40, 24, dtype=bool), (0, 1, 0), tri_field_of_view, tri_disc, tri_line_intersect, tri_center, tri_corners),
+        (TriRectArray(-4, -10, 16, 40, 24, dtype=bool), (1, 1, 0), tri_field_of_view, tri_disc, tri_line_intersect, tri_center, tri_corners),
+        (TrihexRectArray(-7, -6, 13, 40, 14, dtype=bool), (0, 0, 0), trihex_field_of_view, trihex_disc, trihex_line_intersect, trihex_center, trihex_corners),
+        (TrihexRectArray(-7, -6, 13, 40, 14, dtype=bool), (1, 0, 0), trihex_field_of_view, trihex_disc, trihex_line_intersect, trihex_center, trihex_corners),
+    ]
+
+    def test_empty(self):
+        for (opaque, viewer, field_of_view, disc, line_intersect, center, corners) in self.cases:
+            opaque.values[:] = False
+            self.assertCountEqual(field_of_view(*viewer, 6, opaque), disc(*viewer, 6))
+
+    def test_line_intersect(self):
+        rng = np.random.default_rng(0)
+        for (opaque, viewer, field_of_view, disc, line_intersect, center, corners) in self.cases:
+            opaque.values[:] = rng.random(len(opaque)) < 0.15
+            opaque[viewer] = False
+            visible = set(field_of_view(*viewer, 8, opaque))
+            for cell in disc(*viewer, 8):
+                if cell == viewer:
+                    continue
+                line = list(line_intersect(*center(*viewer), *center(*cell)))
+                if passes_corner(center(*viewer), center(*cell), line, corners):
+                    continue
+                expected = all(c == cell or c == viewer or (c in opaque and not opaque[c]) for c in line)
+                self.assertEqual(cell in visible, expected)
+
+    def test_walls(self):
+        # Surrounded by walls, only the walls are visible
+        opaque = HexRectArray(-10, -5, 15, 21, 21, dtype=bool)
+        for hex in hex_ring(0, 0, 0, 1):
+            opaque[hex] = True
+        self.assertCountEqual(hex_field_of_view(0, 0, 0, 5, opaque), hex_disc(0, 0, 0, 1))
+
+    def test_corridor(self):
+        # Only cells that are at least partly lit are looked at, so a corridor costs its length, not the disc's area
+        opaque = SquareRectArray(-30, -30, 61, 61, dtype=bool, fill=True)
+        opaque[np.arange(-30, 31), 0] = False
+        visited = []
+        index = opaque.index
+        opaque.index = lambda cell: visited.append(cell) or index(cell)
+        visible = set(square_field_of_view(0, 0, 30, opaque))
+        self.assertLessEqual({(x, 0) for x in range(-30, 31)}, visible)
+        self.assertEqual(len(visible), 61 + 6)
+        # The walls either side of the corridor are partly lit, but nothing behind them is
+        self.assertLess(len(visited), 3 * len(visible))
+
+if __name__ == '__main__':
+    unittest.main()
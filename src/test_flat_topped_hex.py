@@ -1,6 +1,8 @@
 from flat_topped_hex import *
-from updown_tri import tri_center
+from common import layout
+from updown_tri import tri_center, tri_rect_intersect, tri_polygon_intersect, tri_circle_intersect
 import unittest
+from math import pi
 
 class TestFlatToppedHex(unittest.TestCase):
 
@@ -48,6 +50,11 @@ class TestFlatToppedHex(unittest.TestCase):
 
         self.assertEqual(len(list(hex_rect(*rect))), hex_rect_size(*rect))
 
+    def test_rect_index_outside(self):
+        rect = (0, 0, 0, 3, 3, False, False)
+        self.assertIsNone(hex_rect_index(5, 0, -5, *rect))
+        self.assertIsNone(hex_rect_index(-1, 0, 1, *rect))
+
     def test_hex_line_intersect(self):
         x1, y1 = hex_center(0, 0, 0)
         x2, y2 = hex_center(4, -3, -1)
@@ -86,10 +93,53 @@ class TestFlatToppedHex(unittest.TestCase):
         x1, y1 = tri_center(0, 1, 0)
         self.assertListEqual(list(hex_rect_intersect(x1, y1, 0.6, 0.3)), [
             (0, 0, 0),
-            (1, 0, -1),
             (0, 1, -1),
+            (1, 0, -1),
+        ])
+        # Compare with the hexes containing the tris that intersect the rect
+        for rect in [(x1, y1, 0.6, 0.3), (-3.2, 1, 0, 4.5), (2, -2, 3, 0), (-1.5, -sqrt(3), 3, sqrt(3) * 2), (0.3, 0.1, 7.1, 5.3)]:
+            hexes = list(hex_rect_intersect(*rect))
+            self.assertEqual(len(hexes), hex_rect_intersect_size(*rect))
+            self.assertEqual(len(hexes), len(set(hexes)))
+            self.assertEqual(set(hexes), set(tri_to_hex(*tri) for tri in tri_rect_intersect(*rect)))
+
+    def test_rect_intersect_spans(self):
+        x1, y1 = tri_center(0, 1, 0)
+        self.assertListEqual(list(hex_rect_intersect_spans(x1, y1, 0.6, 0.3)), [
+            (0, 0, 1),
+            (1, 0, 0),
         ])
 
+    def test_rect_intersect_delta(self):
+        old = (0.3, 0.1, 7.1, 5.3)
+        for new in [old, (0.8, 0.1, 7.1, 5.3), (-0.2, 1.4, 7.1, 5.3), (1, 0.5, 4, 2), (20, 20, 1, 1)]:
+            (entered, exited) = hex_rect_intersect_delta(*old, *new)
+            old_hexs = set(hex_rect_intersect(*old))
+            new_hexs = set(hex_rect_intersect(*new))
+            self.assertEqual({(x, y, -x - y) for (x, miny, maxy) in entered for y in range(miny, maxy + 1)}, new_hexs - old_hexs)
+            self.assertEqual({(x, y, -x - y) for (x, miny, maxy) in exited for y in range(miny, maxy + 1)}, old_hexs - new_hexs)
+        self.assertEqual(hex_rect_intersect_delta(*old, *old), ([], []))
+
+    def test_polygon_intersect(self):
+        x1, y1 = tri_center(0, 1, 0)
+        for rect in [(x1, y1, 0.6, 0.3), (-3.2, 1, 0.1, 4.5), (0.3, 0.1, 7.1, 5.3)]:
+            (x, y, width, height) = rect
+            square = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+            self.assertListEqual(list(hex_polygon_intersect(square)), list(hex_rect_intersect(*rect)))
+        u_shape = [(0, 0), (9, 0), (9, 6), (6, 6), (4.5, 1.5), (3, 6), (0, 6)]
+        hexes = list(hex_polygon_intersect(u_shape))
+        self.assertEqual(set(hexes), set(tri_to_hex(*tri) for tri in tri_polygon_intersect(u_shape)))
+        self.assertEqual(len(hexes), len(set(hexes)))
+        self.assertNotIn(pick_hex(4.5, 5.5), hexes)
+
+    def test_circle_intersect(self):
+        self.assertListEqual(list(hex_circle_intersect(0, 0, 0.5)), [(0, 0, 0)])
+        # The hex and its neighbours
+        self.assertCountEqual(list(hex_circle_intersect(0, 0, 1)), [(0, 0, 0)] + list(hex_neighbours(0, 0, 0)))
+        hexes = list(hex_circle_intersect(1.3, -0.4, 3.7))
+        self.assertEqual(set(hexes), set(tri_to_hex(*tri) for tri in tri_circle_intersect(1.3, -0.4, 3.7)))
+        self.assertEqual(len(hexes), len(set(hexes)))
+
     def test_parent(self):
         def test_parent(x, y, z, px, py, pz):
             c = (x, y, z)
@@ -105,6 +155,119 @@ class TestFlatToppedHex(unittest.TestCase):
         test_parent(-2, -3, 5, -1, 0, 1)
         test_parent(10, -4, -6, 2, -2, 0)
 
+    def test_vertices_edges(self):
+        for x in range(-3, 4):
+            for y in range(-3, 4):
+                hex = (x, y, -x - y)
+                vertices = hex_vertices(*hex)
+                edges = hex_edges(*hex)
+                for i, (v, corner) in enumerate(zip(vertices, hex_corners(*hex))):
+                    self.assertEqual(hex_center(*v), corner)
+                    self.assertIn(hex, hex_vertex_hexes(*v))
+                    v2 = vertices[(i + 1) % 6]
+                    self.assertEqual(hex_edge_vertices(*edges[i]), sorted([v, v2], key=sum))
+                    h1, h2 = hex_edge_hexes(*edges[i])
+                    self.assertIn(hex, (h1, h2))
+                    self.assertIn(h2, hex_neighbours(*h1))
+
+    def test_rect_vertices(self):
+        # Height 1 leaves the odd columns empty, unless inc_bottom or inc_top is set
+        for rect in [(0, 0, 0, 3, 2), (1, 0, -1, 6, 3, True, False), (0, 0, 0, 5, 2, True, True), (0, 0, 0, 4, 1)]:
+            vertices = set()
+            for hex in hex_rect(*rect):
+                vertices.update(hex_vertices(*hex))
+            self.assertCountEqual(vertices, hex_rect_vertices(*rect))
+            self.assertEqual(len(vertices), hex_rect_vertex_size(*rect))
+            for i, v in enumerate(hex_rect_vertices(*rect)):
+                self.assertEqual(hex_rect_vertex_index(*v, *rect), i)
+                self.assertEqual(hex_rect_vertex_deindex(i, *rect), v)
+        self.assertIsNone(hex_rect_vertex_index(2, 0, -1, 0, 0, 0, 1, 1))
+        self.assertEqual(hex_rect_vertex_index(-1, 0, 0, 0, 0, 0, 1, 1), 0)
+
+    def test_ring(self):
+        for r in range(5):
+            ring = list(hex_ring(1, 2, -3, r))
+            self.assertEqual(len(ring), len(set(ring)))
+            self.assertCountEqual(ring, [h for h in hex_disc(1, 2, -3, r) if hex_dist(1, 2, -3, *h) == r])
+            self.assertCountEqual(hex_spiral(1, 2, -3, r), hex_disc(1, 2, -3, r))
+            self.assertEqual(len(list(hex_spiral(1, 2, -3, r))), hex_disc_size(r))
+        self.assertListEqual(list(hex_ring(0, 0, 0, 1)), [
+            (1, 0, -1),
+            (0, 1, -1),
+            (-1, 1, 0),
+            (-1, 0, 1),
+            (0, -1, 1),
+            (1, -1, 0),
+        ])
+
+    def test_disc_index(self):
+        spiral = list(hex_spiral(1, 2, -3, 4))
+        for i, hex in enumerate(spiral):
+            self.assertEqual(hex_disc_index(*hex, 1, 2, -3, 4), i)
+            self.assertEqual(hex_disc_deindex(i, 1, 2, -3, 4), hex)
+        self.assertIsNone(hex_disc_index(6, 2, -8, 1, 2, -3, 4))
+        with self.assertRaises(Exception):
+            hex_disc_deindex(hex_disc_size(4), 1, 2, -3, 4)
+
+    def test_hex_line_path(self):
+        for (x, y) in [(0, 0), (3, -5), (-4, 1), (6, 6)]:
+            line = list(hex_line(1, 0, -1, x, y, -x - y))
+            self.assertEqual(len(line), hex_dist(1, 0, -1, x, y, -x - y) + 1)
+            self.assertEqual(line[-1], (x, y, -x - y))
+            for (h1, h2) in zip(line, line[1:]):
+                self.assertIn(h2, hex_neighbours(*h1))
+
+    def test_grid(self):
+        grid = HexGrid()
+        for hex in [(0, 0, 0), (1, 0, -1), (2, -3, 1)]:
+            self.assertAlmostEqual(grid.center(*hex)[0], hex_center(*hex)[0])
+            self.assertAlmostEqual(grid.center(*hex)[1], hex_center(*hex)[1])
+            self.assertEqual(grid.pick(*hex_center(*hex)), hex)
+        self.assertListEqual(list(grid.rect_intersect(0.2, 0.3, 2, 1)), list(hex_rect_intersect(0.2, 0.3, 2, 1)))
+        self.assertEqual(grid.rect_intersect_size(0.2, 0.3, 2, 1), hex_rect_intersect_size(0.2, 0.3, 2, 1))
+        self.assertListEqual(list(grid.line_intersect(0.2, 0.3, 3.5, 1.5)), list(hex_line_intersect(0.2, 0.3, 3.5, 1.5)))
+        grid = HexGrid(0.5)
+        for hex in [(0, 0, 0), (1, 0, -1), (2, -3, 1)]:
+            self.assertEqual(grid.pick(*grid.center(*hex)), hex)
+        self.assertListEqual(list(grid.rect_intersect(0.1, 0.15, 1, 0.5)), list(hex_rect_intersect(0.2, 0.3, 2, 1)))
+        self.assertListEqual(list(grid.circle_intersect(0.25, 0.25, 0.5)), list(hex_circle_intersect(0.5, 0.5, 1)))
+
+    def test_grid_layout(self):
+        grid = HexGrid(2, layout((10, 5), pi / 2))
+        plain = HexGrid(2)
+        for cell in plain.rect_intersect(-2, -2, 4, 4):
+            (x, y) = plain.center(*cell)
+            # A quarter turn anticlockwise about (10, 5)
+            (wx, wy) = grid.center(*cell)
+            self.assertAlmostEqual(wx, 10 - y)
+            self.assertAlmostEqual(wy, 5 + x)
+            self.assertEqual(grid.pick(wx, wy), cell)
+        self.assertCountEqual(grid.rect_intersect(8.4, 3.3, 2.9, 3.1), plain.polygon_intersect([(-1.7, -1.3), (1.4, -1.3), (1.4, 1.6), (-1.7, 1.6)]))
+        self.assertCountEqual(grid.circle_intersect(10.1, 5.2, 2.9), plain.circle_intersect(0.2, -0.1, 2.9))
+        self.assertCountEqual(grid.line_intersect(9.8, 5.3, 6.7, 9.1), plain.line_intersect(0.3, 0.2, 4.1, 3.3))
+        skewed = HexGrid(1, ((1, 0.5, 0), (0, 1, 0)))
+        with self.assertRaises(Exception):
+            list(skewed.circle_intersect(0, 0, 1))
+
+    def test_pack(self):
+        keys = set()
+        for cell in [(0, 0, 0), (1, -3, 2), (2**31 - 1, -2**31, 1), (-2**31, 2**31 - 1, 1)]:
+            key = hex_pack(*cell)
+            self.assertEqual(hex_unpack(key), cell)
+            keys.add(key)
+        self.assertEqual(len(keys), 4)
+
+    def test_rect_curves(self):
+        rect = (0, 0, 0, 3, 3, False, False)
+        for (index, deindex) in [(hex_rect_morton_index, hex_rect_morton_deindex), (hex_rect_hilbert_index, hex_rect_hilbert_deindex)]:
+            indices = [index(*cell, *rect) for cell in hex_rect(*rect)]
+            self.assertEqual(len(set(indices)), hex_rect_size(*rect))
+            for cell, i in zip(hex_rect(*rect), indices):
+                self.assertEqual(deindex(i, *rect), cell)
+            for cell in hex_rect(*rect):
+                for neighbour in hex_neighbours(*cell):
+                    if hex_rect_index(*neighbour, *rect) is None:
+                        self.assertIsNone(index(*neighbour, *rect))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,146 @@
+import flat_topped_hex_np
+from flat_topped_hex import *
+from common import layout
+from rect_array import *
+import numpy as np
+import unittest
+
+class TestFlatToppedHexNp(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.points = np.concatenate([
+            rng.uniform(-20, 20, (200, 2)),
+            [hex_center(x, y, 1 - x - y) for x in range(-3, 4) for y in range(-3, 4)],
+        ])
+
+    def test_pick(self):
+        hexes = flat_topped_hex_np.pick_hex(self.points)
+        self.assertEqual(hexes.shape, (len(self.points), 3))
+        for p, hex in zip(self.points, hexes):
+            self.assertEqual(tuple(hex), pick_hex(*p))
+
+    def test_pick_shape(self):
+        self.assertEqual(flat_topped_hex_np.pick_hex(np.zeros((4, 5, 2))).shape, (4, 5, 3))
+
+    def test_grid(self):
+        grid = HexGrid(1.5, layout((3, -2), 0.5, 2))
+        hexes = flat_topped_hex_np.hex_grid_pick(grid, self.points)
+        self.assertEqual(hexes.shape, (len(self.points), 3))
+        centers = flat_topped_hex_np.hex_grid_center(grid, hexes)
+        for point, cell, center in zip(self.points, hexes, centers):
+            self.assertEqual(tuple(cell), grid.pick(*point))
+            self.assertEqual(tuple(center), grid.center(*cell))
+
+    def test_pack(self):
+        # Points on vertices don't give valid hexes, so aren't included
+        hexes = flat_topped_hex_np.pick_hex(self.points[:200])
+        keys = flat_topped_hex_np.hex_pack(hexes)
+        self.assertEqual(keys.dtype, np.int64)
+        self.assertListEqual(list(keys), [hex_pack(*cell) for cell in hexes])
+        np.testing.assert_array_equal(flat_topped_hex_np.hex_unpack(keys), hexes)
+        neighbours = flat_topped_hex_np.hex_key_neighbours(keys)
+        for key, row in zip(keys, neighbours):
+            self.assertListEqual(list(row), [hex_pack(*n) for n in hex_neighbours(*hex_unpack(key))])
+
+    def test_corners(self):
+        hexes = np.array([(x, y, -x - y) for x in range(-3, 4) for y in range(-3, 4)])
+        corners = flat_topped_hex_np.hex_corners(hexes, dtype=float)
+        self.assertEqual(corners.shape, (len(hexes), 6, 2))
+        for hex, c in zip(hexes, corners):
+            np.testing.assert_array_equal(c, hex_corners(*hex))
+            np.testing.assert_array_equal(flat_topped_hex_np.hex_center([hex])[0], hex_center(*hex))
+
+    def test_mesh(self):
+        hexes = np.array(list(hex_rect(0, 0, 0, 4, 3)))
+        vertices, indices = flat_topped_hex_np.hex_mesh(hexes)
+        self.assertEqual(len(vertices), len(set(v for hex in hexes for v in hex_vertices(*hex))))
+        np.testing.assert_array_equal(vertices[indices], flat_topped_hex_np.hex_vertices(hexes))
+        for hex, edges in zip(hexes, flat_topped_hex_np.hex_edges(hexes)):
+            np.testing.assert_array_equal(edges, hex_edges(*hex))
+
+    def test_rect(self):
+        for rect in [(0, 0, 0, 3, 3, False, False), (2, -1, -1, 4, 3, True, False), (0, 0, 0, 5, 2, True, True)]:
+            hexes = np.array([(x, y, -x - y) for x in range(-2, 8) for y in range(-6, 6)])
+            indices = flat_topped_hex_np.hex_rect_index(hexes, *rect)
+            for hex, i in zip(hexes, indices):
+                expected = hex_rect_index(*hex, *rect)
+                self.assertEqual(i, -1 if expected is None else expected)
+            inside = indices >= 0
+            np.testing.assert_array_equal(flat_topped_hex_np.hex_rect_deindex(indices[inside], *rect), hexes[inside])
+            knolls = flat_topped_hex_np.hex_rect_knoll(hexes, *rect)
+            np.testing.assert_array_equal(flat_topped_hex_np.hex_rect_unknoll(knolls, *rect), hexes)
+        with self.assertRaises(Exception):
+            flat_topped_hex_np.hex_rect_deindex([hex_rect_size(*rect)], *rect)
+
+    def test_disc_index(self):
+        for center in [(1, 2, -3)]:
+            spiral = np.array(list(hex_spiral(*center, 5)))
+            outside = np.array([center]) + (6, 0, -6)
+            np.testing.assert_array_equal(flat_topped_hex_np.hex_disc_index(spiral, *center, 5), np.arange(len(spiral)))
+            np.testing.assert_array_equal(flat_topped_hex_np.hex_disc_index(outside, *center, 5), [-1])
+            np.testing.assert_array_equal(flat_topped_hex_np.hex_disc_deindex(np.arange(len(spiral)), *center, 5), spiral)
+
+    def test_rect_curves(self):
+        for rect in [(0, 0, 0, 3, 3, False, False), (2, -1, -1, 4, 3, True, False), (0, 0, 0, 5, 2, True, True)]:
+            hexes = np.array([(x, y, -x - y) for x in range(-2, 8) for y in range(-6, 6)])
+            for curve in ["morton", "hilbert"]:
+                index = globals()["hex_rect_" + curve + "_index"]
+                indices = getattr(flat_topped_hex_np, "hex_rect_" + curve + "_index")(hexes, *rect)
+                for cell, i in zip(hexes, indices):
+                    expected = index(*cell, *rect)
+                    self.assertEqual(i, -1 if expected is None else expected)
+                inside = indices >= 0
+                np.testing.assert_array_equal(getattr(flat_topped_hex_np, "hex_rect_" + curve + "_deindex")(indices[inside], *rect), hexes[inside])
+
+    def test_parent(self):
+        hexes = np.array([(x, y, -x - y) for x in range(-12, 12) for y in range(-12, 12)])
+        parents = flat_topped_hex_np.hex_parent(hexes)
+        for hex, parent, children in zip(hexes, parents, flat_topped_hex_np.hex_parent_children(parents)):
+            self.assertEqual(tuple(parent), hex_parent(*hex))
+            self.assertCountEqual(map(tuple, children), hex_parent_children(*parent))
+        np.testing.assert_array_equal(flat_topped_hex_np.hex_parent_center_child(parents), [hex_parent_center_child(*p) for p in parents])
+
+    def test_disc(self):
+        hexes = np.array([(0, 0, 0), (2, -1, -1)])
+        discs = flat_topped_hex_np.hex_disc(hexes, 3)
+        neighbours = flat_topped_hex_np.hex_neighbours(hexes)
+        for hex, disc, ns in zip(hexes, discs, neighbours):
+            self.assertListEqual([tuple(h) for h in disc], list(hex_spiral(*hex, 3)))
+            self.assertListEqual([tuple(h) for h in ns], list(hex_neighbours(*hex)))
+        self.assertFalse(flat_topped_hex_np.hex_disc_offsets(3).flags.writeable)
+
+    def test_line_intersect(self):
+        rng = np.random.default_rng(1)
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, offsets = flat_topped_hex_np.hex_line_intersect(starts, ends)
+        for i in range(100):
+            expected = list(hex_line_intersect(*starts[i], *ends[i]))
+            self.assertListEqual([tuple(cell) for cell in cells[offsets[i]:offsets[i + 1]]], expected)
+
+    def test_raycast(self):
+        rng = np.random.default_rng(2)
+        opaque = HexRectArray(*(-12, -3, 15, 25, 25), dtype=bool)
+        opaque.values[:] = rng.random(len(opaque)) < 0.05
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, hit = flat_topped_hex_np.hex_raycast(starts, ends, opaque)
+        for i in range(100):
+            line = list(hex_line_intersect(*starts[i], *ends[i]))
+            hits = [cell for cell in line if cell not in opaque or opaque[cell]]
+            self.assertEqual(hit[i], len(hits) > 0)
+            self.assertEqual(tuple(cells[i]), hits[0] if hits else line[-1])
+
+    def test_line(self):
+        rng = np.random.default_rng(3)
+        hexes1 = np.array([(x, y, -x - y) for (x, y) in rng.integers(-8, 9, (100, 2))])
+        hexes2 = np.array([(x, y, -x - y) for (x, y) in rng.integers(-8, 9, (100, 2))])
+        hexes2[0] = hexes1[0]
+        cells, offsets = flat_topped_hex_np.hex_line(hexes1, hexes2)
+        for i in range(100):
+            self.assertListEqual([tuple(h) for h in cells[offsets[i]:offsets[i + 1]]], list(hex_line(*hexes1[i], *hexes2[i])))
+
+
+if __name__ == '__main__':
+    unittest.main()
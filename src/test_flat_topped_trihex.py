@@ -1,6 +1,8 @@
 from flat_topped_trihex import *
-from updown_tri import tri_center
+from common import layout
+from updown_tri import tri_center, tri_rect_intersect, tri_polygon_intersect, tri_circle_intersect
 import unittest
+from math import pi
 
 class TestFlatToppedTriHex(unittest.TestCase):
 
@@ -13,6 +15,179 @@ class TestFlatToppedTriHex(unittest.TestCase):
             for tri in trihex_to_tris(a, b, c):
                 self.assertEqual(tri_to_trihex(*tri), (a, b, c))
 
+    def test_vertices_edges(self):
+        for a in range(-3, 4):
+            for b in range(-3, 4):
+                for n in (-1, 0, 1):
+                    trihex = (a, b, n - a - b)
+                    vertices = trihex_vertices(*trihex)
+                    edges = trihex_edges(*trihex)
+                    for i, (v, corner) in enumerate(zip(vertices, trihex_corners(*trihex))):
+                        self.assertAlmostEqual(trihex_vertex_center(*v)[0], corner[0])
+                        self.assertAlmostEqual(trihex_vertex_center(*v)[1], corner[1])
+                        self.assertIn(trihex, trihex_vertex_trihexes(*v))
+                        self.assertCountEqual(trihex_edge_vertices(*edges[i]), [v, vertices[(i + 1) % len(vertices)]])
+                        hex, tri = trihex_edge_trihexes(*edges[i])
+                        self.assertIn(trihex, (hex, tri))
+                        self.assertEqual(trihex_cell_type(*hex), "hex")
+                        self.assertIn(tri, trihex_neighbours(*hex))
+
+    def test_rect(self):
+        rect = (0, 0, 0, 3, 2)
+        self.assertListEqual(list(trihex_rect(*rect)), [
+            (1, 0, 0),
+            (0, 0, 0),
+            (1, 0, -1),
+            (0, 0, -1),
+            (0, 1, 0),
+            (1, 1, -1),
+            (0, 1, -1),
+            (-1, 1, -1),
+            (0, 1, -2),
+        ])
+        for rect in [(0, 0, 0, 3, 2), (2, 0, -1, 4, 5), (-1, 2, 0, 5, 3), (0, 0, 0, 1, 1)]:
+            trihexes = list(trihex_rect(*rect))
+            for i, trihex in enumerate(trihexes):
+                self.assertEqual(trihex_rect_index(*trihex, *rect), i)
+                self.assertEqual(trihex_rect_deindex(i, *rect), trihex)
+            self.assertEqual(len(trihexes), trihex_rect_size(*rect))
+            # Check against the slots and rows each trihex is in
+            (rect_a, rect_b, rect_c, width, height) = rect
+            expected = set()
+            for a in range(-20, 20):
+                for b in range(rect_b, rect_b + height):
+                    for n in (-1, 0, 1):
+                        if 0 <= a - (n - a - b) - (rect_a - rect_c) < width:
+                            expected.add((a, b, n - a - b))
+            self.assertEqual(set(trihexes), expected)
+
+    def test_rect_intersect(self):
+        x1, y1 = tri_center(0, 1, 0)
+        self.assertListEqual(list(trihex_rect_intersect_spans(x1, y1, 0.6, 0.3)), [
+            (0, 0, 0, 0),
+            (0, -1, 1, 1),
+            (1, 1, 0, 0),
+            (1, 0, 1, 1),
+        ])
+        self.assertListEqual(list(trihex_rect_intersect(x1, y1, 0.6, 0.3)), [
+            (0, 0, 0),
+            (0, 0, -1),
+            (0, 1, 0),
+            (0, 1, -1),
+        ])
+        for rect in [(x1, y1, 0.6, 0.3), (-3.2, 1, 0, 4.5), (2, -2, 3, 0), (-1, -sqrt(3), 3, sqrt(3) * 2), (0.3, 0.1, 7.1, 5.3)]:
+            trihexes = list(trihex_rect_intersect(*rect))
+            self.assertEqual(len(trihexes), trihex_rect_intersect_size(*rect))
+            self.assertEqual(len(trihexes), len(set(trihexes)))
+            self.assertEqual(set(trihexes), set(tri_to_trihex(*tri) for tri in tri_rect_intersect(*rect)))
+
+    def test_rect_intersect_delta(self):
+        old = (0.3, 0.1, 7.1, 5.3)
+        for new in [old, (0.8, 0.1, 7.1, 5.3), (-0.2, 1.4, 7.1, 5.3), (1, 0.5, 4, 2), (20, 20, 1, 1)]:
+            (entered, exited) = trihex_rect_intersect_delta(*old, *new)
+            old_trihexs = set(trihex_rect_intersect(*old))
+            new_trihexs = set(trihex_rect_intersect(*new))
+            self.assertEqual({((n - b + u) // 2, b, (n - b - u) // 2) for (b, n, minu, maxu) in entered for u in range(minu, maxu + 1, 2)}, new_trihexs - old_trihexs)
+            self.assertEqual({((n - b + u) // 2, b, (n - b - u) // 2) for (b, n, minu, maxu) in exited for u in range(minu, maxu + 1, 2)}, old_trihexs - new_trihexs)
+        self.assertEqual(trihex_rect_intersect_delta(*old, *old), ([], []))
+
+    def test_polygon_intersect(self):
+        x1, y1 = tri_center(0, 1, 0)
+        for rect in [(x1, y1, 0.6, 0.3), (-3.2, 1, 0.1, 4.5), (0.3, 0.1, 7.1, 5.3)]:
+            (x, y, width, height) = rect
+            square = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+            self.assertListEqual(list(trihex_polygon_intersect(square)), list(trihex_rect_intersect(*rect)))
+        u_shape = [(0, 0), (9, 0), (9, 6), (6, 6), (4.5, 1.5), (3, 6), (0, 6)]
+        trihexes = list(trihex_polygon_intersect(u_shape))
+        self.assertEqual(set(trihexes), set(tri_to_trihex(*tri) for tri in tri_polygon_intersect(u_shape)))
+        self.assertEqual(len(trihexes), len(set(trihexes)))
+
+    def test_circle_intersect(self):
+        self.assertListEqual(list(trihex_circle_intersect(0, 0, 0.5)), [(0, 0, 0)])
+        trihexes = list(trihex_circle_intersect(1.3, -0.4, 3.7))
+        self.assertEqual(set(trihexes), set(tri_to_trihex(*tri) for tri in tri_circle_intersect(1.3, -0.4, 3.7)))
+        self.assertEqual(len(trihexes), len(set(trihexes)))
+
+    def test_ring(self):
+        for trihex in [(0, 0, 0), (1, 0, 0), (-1, 0, 0)]:
+            for r in range(6):
+                ring = list(trihex_ring(*trihex, r))
+                self.assertEqual(len(ring), len(set(ring)))
+                for t in ring:
+                    self.assertEqual(trihex_dist(*trihex, *t), r)
+                    self.assertIn(sum(t), (-1, 0, 1))
+                self.assertEqual(len(list(trihex_disc(*trihex, r))), trihex_disc_size(*trihex, r))
+            self.assertCountEqual(trihex_ring(*trihex, 1), trihex_neighbours(*trihex))
+        # Compare against every trihex in a box
+        box = [(a, b, n - a - b) for a in range(-6, 7) for b in range(-6, 7) for n in (-1, 0, 1)]
+        self.assertCountEqual(trihex_disc(1, 0, 0, 4), [t for t in box if trihex_dist(1, 0, 0, *t) <= 4])
+
+    def test_disc_index(self):
+        for trihex in [(0, 0, 0), (1, 0, 0), (-1, 0, 0)]:
+            spiral = list(trihex_spiral(*trihex, 5))
+            for i, t in enumerate(spiral):
+                self.assertEqual(trihex_disc_index(*t, *trihex, 5), i)
+                self.assertEqual(trihex_disc_deindex(i, *trihex, 5), t)
+            self.assertIsNone(trihex_disc_index(trihex[0] + 6, trihex[1], trihex[2], *trihex, 5))
+
+    def test_line(self):
+        self.assertListEqual(list(trihex_line(0, 0, 0, 2, -1, -1)), [(0, 0, 0), (1, 0, 0), (1, -1, 0), (1, -1, -1), (2, -1, -1)])
+        for end in [(4, -1, -2), (-2, 3, 0), (0, 0, 0), (3, -3, 1)]:
+            expected = list(trihex_line_intersect(*trihex_center(1, 0, 0), *trihex_center(*end)))
+            self.assertListEqual(list(trihex_line(1, 0, 0, *end)), expected)
+
+    def test_grid(self):
+        grid = TrihexGrid()
+        for trihex in [(0, 0, 0), (1, 0, 0), (0, 0, -1), (2, -1, 0)]:
+            self.assertAlmostEqual(grid.center(*trihex)[0], trihex_center(*trihex)[0])
+            self.assertAlmostEqual(grid.center(*trihex)[1], trihex_center(*trihex)[1])
+            self.assertEqual(grid.pick(*trihex_center(*trihex)), trihex)
+        self.assertListEqual(list(grid.rect_intersect(0.2, 0.3, 2, 1)), list(trihex_rect_intersect(0.2, 0.3, 2, 1)))
+        self.assertEqual(grid.rect_intersect_size(0.2, 0.3, 2, 1), trihex_rect_intersect_size(0.2, 0.3, 2, 1))
+        self.assertListEqual(list(grid.line_intersect(0.2, 0.3, 3.5, 1.5)), list(trihex_line_intersect(0.2, 0.3, 3.5, 1.5)))
+        grid = TrihexGrid(3)
+        for trihex in [(0, 0, 0), (1, 0, 0), (0, 0, -1), (2, -1, 0)]:
+            self.assertEqual(grid.pick(*grid.center(*trihex)), trihex)
+        self.assertListEqual(list(grid.rect_intersect(0.6, 0.9, 6, 3)), list(trihex_rect_intersect(0.2, 0.3, 2, 1)))
+        self.assertListEqual(list(grid.circle_intersect(1.5, 1.5, 3)), list(trihex_circle_intersect(0.5, 0.5, 1)))
+
+    def test_grid_layout(self):
+        grid = TrihexGrid(2, layout((10, 5), pi / 2))
+        plain = TrihexGrid(2)
+        for cell in plain.rect_intersect(-2, -2, 4, 4):
+            (x, y) = plain.center(*cell)
+            # A quarter turn anticlockwise about (10, 5)
+            (wx, wy) = grid.center(*cell)
+            self.assertAlmostEqual(wx, 10 - y)
+            self.assertAlmostEqual(wy, 5 + x)
+            self.assertEqual(grid.pick(wx, wy), cell)
+        self.assertCountEqual(grid.rect_intersect(8.4, 3.3, 2.9, 3.1), plain.polygon_intersect([(-1.7, -1.3), (1.4, -1.3), (1.4, 1.6), (-1.7, 1.6)]))
+        self.assertCountEqual(grid.circle_intersect(10.1, 5.2, 2.9), plain.circle_intersect(0.2, -0.1, 2.9))
+        self.assertCountEqual(grid.line_intersect(9.8, 5.3, 6.7, 9.1), plain.line_intersect(0.3, 0.2, 4.1, 3.3))
+        skewed = TrihexGrid(1, ((1, 0.5, 0), (0, 1, 0)))
+        with self.assertRaises(Exception):
+            list(skewed.circle_intersect(0, 0, 1))
+
+    def test_pack(self):
+        keys = set()
+        for cell in [(0, 0, 0), (1, 0, 0), (0, 0, -1), (2, -3, 1), (2**29 - 1, -2**29, 1), (-2**29, 2**29 - 1, 0)]:
+            key = trihex_pack(*cell)
+            self.assertEqual(trihex_unpack(key), cell)
+            keys.add(key)
+        self.assertEqual(len(keys), 6)
+
+    def test_rect_curves(self):
+        rect = (0, 0, 0, 3, 3)
+        for (index, deindex) in [(trihex_rect_morton_index, trihex_rect_morton_deindex), (trihex_rect_hilbert_index, trihex_rect_hilbert_deindex)]:
+            indices = [index(*cell, *rect) for cell in trihex_rect(*rect)]
+            self.assertEqual(len(set(indices)), trihex_rect_size(*rect))
+            for cell, i in zip(trihex_rect(*rect), indices):
+                self.assertEqual(deindex(i, *rect), cell)
+            for cell in trihex_rect(*rect):
+                for neighbour in trihex_neighbours(*cell):
+                    if trihex_rect_index(*neighbour, *rect) is None:
+                        self.assertIsNone(index(*neighbour, *rect))
+
 
 if __name__ == '__main__':
     unittest.main()
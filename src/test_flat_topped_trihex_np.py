@@ -0,0 +1,137 @@
+import flat_topped_trihex_np
+from flat_topped_trihex import *
+from common import layout
+from rect_array import *
+import numpy as np
+import unittest
+
+class TestFlatToppedTriHexNp(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.points = np.concatenate([
+            rng.uniform(-20, 20, (200, 2)),
+            [trihex_center(a, b, -a - b) for a in range(-3, 4) for b in range(-3, 4)],
+        ])
+
+    def test_pick(self):
+        trihexes = flat_topped_trihex_np.pick_trihex(self.points)
+        self.assertEqual(trihexes.shape, (len(self.points), 3))
+        for p, trihex in zip(self.points, trihexes):
+            self.assertEqual(tuple(trihex), pick_trihex(*p))
+
+    def test_grid(self):
+        grid = TrihexGrid(1.5, layout((3, -2), 0.5, 2))
+        trihexes = flat_topped_trihex_np.trihex_grid_pick(grid, self.points)
+        self.assertEqual(trihexes.shape, (len(self.points), 3))
+        centers = flat_topped_trihex_np.trihex_grid_center(grid, trihexes)
+        for point, cell, center in zip(self.points, trihexes, centers):
+            self.assertEqual(tuple(cell), grid.pick(*point))
+            self.assertEqual(tuple(center), grid.center(*cell))
+
+    def test_pack(self):
+        trihexes = flat_topped_trihex_np.pick_trihex(self.points)
+        keys = flat_topped_trihex_np.trihex_pack(trihexes)
+        self.assertEqual(keys.dtype, np.int64)
+        self.assertListEqual(list(keys), [trihex_pack(*cell) for cell in trihexes])
+        np.testing.assert_array_equal(flat_topped_trihex_np.trihex_unpack(keys), trihexes)
+        (neighbours, counts) = flat_topped_trihex_np.trihex_key_neighbours(keys)
+        for key, row, count in zip(keys, neighbours, counts):
+            self.assertListEqual(list(row[:count]), [trihex_pack(*n) for n in trihex_neighbours(*trihex_unpack(key))])
+
+    def test_corners(self):
+        trihexes = np.array([(a, b, n - a - b) for a in range(-3, 4) for b in range(-3, 4) for n in (-1, 0, 1)])
+        corners, counts = flat_topped_trihex_np.trihex_corners(trihexes, dtype=float)
+        self.assertEqual(corners.shape, (len(trihexes), 6, 2))
+        for trihex, c, count in zip(trihexes, corners, counts):
+            expected = trihex_corners(*trihex)
+            self.assertEqual(count, len(expected))
+            np.testing.assert_array_equal(c[:count], expected)
+            for corner in c[count:]:
+                np.testing.assert_array_equal(corner, expected[-1])
+
+    def test_mesh(self):
+        trihexes = np.array(list(trihex_disc(0, 0, 0, 3)))
+        vertices, indices, counts = flat_topped_trihex_np.trihex_mesh(trihexes)
+        self.assertEqual(len(vertices), len(set(v for trihex in trihexes for v in trihex_vertices(*trihex))))
+        np.testing.assert_array_equal(vertices[indices], flat_topped_trihex_np.trihex_vertices(trihexes))
+        edges = flat_topped_trihex_np.trihex_edges(trihexes)
+        positions = flat_topped_trihex_np.trihex_vertex_center(vertices, float)
+        for trihex, e, i, count in zip(trihexes, edges, indices, counts):
+            np.testing.assert_array_equal(e[:count], trihex_edges(*trihex))
+            np.testing.assert_allclose(positions[i[:count]], trihex_corners(*trihex), atol=1e-9)
+
+    def test_rect(self):
+        for rect in [(0, 0, 0, 3, 2), (2, 0, -1, 4, 5), (-1, 2, 0, 5, 3)]:
+            trihexes = np.array([(a, b, n - a - b) for a in range(-8, 8) for b in range(-2, 8) for n in (-1, 0, 1)])
+            indices = flat_topped_trihex_np.trihex_rect_index(trihexes, *rect)
+            for trihex, i in zip(trihexes, indices):
+                expected = trihex_rect_index(*trihex, *rect)
+                self.assertEqual(i, -1 if expected is None else expected)
+            inside = indices >= 0
+            np.testing.assert_array_equal(flat_topped_trihex_np.trihex_rect_deindex(indices[inside], *rect), trihexes[inside])
+
+    def test_disc_index(self):
+        for center in [(0, 0, 0), (1, 0, 0), (-1, 0, 0)]:
+            spiral = np.array(list(trihex_spiral(*center, 5)))
+            outside = np.array([center]) + (6, 0, -6)
+            np.testing.assert_array_equal(flat_topped_trihex_np.trihex_disc_index(spiral, *center, 5), np.arange(len(spiral)))
+            np.testing.assert_array_equal(flat_topped_trihex_np.trihex_disc_index(outside, *center, 5), [-1])
+            np.testing.assert_array_equal(flat_topped_trihex_np.trihex_disc_deindex(np.arange(len(spiral)), *center, 5), spiral)
+
+    def test_rect_curves(self):
+        for rect in [(0, 0, 0, 3, 3), (1, 0, 0, 4, 2)]:
+            trihexes = np.array([(a, b, n - a - b) for a in range(-8, 8) for b in range(-2, 8) for n in (-1, 0, 1)])
+            for curve in ["morton", "hilbert"]:
+                index = globals()["trihex_rect_" + curve + "_index"]
+                indices = getattr(flat_topped_trihex_np, "trihex_rect_" + curve + "_index")(trihexes, *rect)
+                for cell, i in zip(trihexes, indices):
+                    expected = index(*cell, *rect)
+                    self.assertEqual(i, -1 if expected is None else expected)
+                inside = indices >= 0
+                np.testing.assert_array_equal(getattr(flat_topped_trihex_np, "trihex_rect_" + curve + "_deindex")(indices[inside], *rect), trihexes[inside])
+
+    def test_disc(self):
+        trihexes = np.array([(0, 0, 0), (1, 0, 0), (-1, 0, 0), (2, -1, 0), (1, -1, -1)])
+        for r in range(5):
+            discs, counts = flat_topped_trihex_np.trihex_disc(trihexes, r)
+            for trihex, disc, count in zip(trihexes, discs, counts):
+                self.assertListEqual([tuple(t) for t in disc[:count]], list(trihex_spiral(*trihex, r)))
+                self.assertTrue((disc[count:] == disc[count - 1]).all())
+        neighbours, counts = flat_topped_trihex_np.trihex_neighbours(trihexes)
+        for trihex, ns, count in zip(trihexes, neighbours, counts):
+            self.assertListEqual([tuple(t) for t in ns[:count]], list(trihex_neighbours(*trihex)))
+
+    def test_line_intersect(self):
+        rng = np.random.default_rng(1)
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, offsets = flat_topped_trihex_np.trihex_line_intersect(starts, ends)
+        for i in range(100):
+            expected = list(trihex_line_intersect(*starts[i], *ends[i]))
+            self.assertListEqual([tuple(cell) for cell in cells[offsets[i]:offsets[i + 1]]], expected)
+
+    def test_raycast(self):
+        rng = np.random.default_rng(2)
+        opaque = TrihexRectArray(*(-8, -7, 15, 48, 16), dtype=bool)
+        opaque.values[:] = rng.random(len(opaque)) < 0.05
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, hit = flat_topped_trihex_np.trihex_raycast(starts, ends, opaque)
+        for i in range(100):
+            line = list(trihex_line_intersect(*starts[i], *ends[i]))
+            hits = [cell for cell in line if cell not in opaque or opaque[cell]]
+            self.assertEqual(hit[i], len(hits) > 0)
+            self.assertEqual(tuple(cells[i]), hits[0] if hits else line[-1])
+
+    def test_line(self):
+        rng = np.random.default_rng(3)
+        trihexes1 = np.array([(a, b, n - a - b) for (a, b, n) in rng.integers((-8, -8, -1), (9, 9, 2), (100, 3))])
+        trihexes2 = np.array([(a, b, n - a - b) for (a, b, n) in rng.integers((-8, -8, -1), (9, 9, 2), (100, 3))])
+        cells, offsets = flat_topped_trihex_np.trihex_line(trihexes1, trihexes2)
+        for i in range(100):
+            self.assertListEqual([tuple(t) for t in cells[offsets[i]:offsets[i + 1]]], list(trihex_line(*trihexes1[i], *trihexes2[i])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from flow_field import *
+from pathfinding import dijkstra
+from rect_array import *
+from flat_topped_hex import hex_neighbours, hex_dist
+from square import square_neighbours
+from updown_tri import tri_neighbours
+from flat_topped_trihex import trihex_neighbours
+import numpy as np
+import unittest
+
+class TestFlowField(unittest.TestCase):
+
+    def test_flow_field(self):
+        rng = np.random.default_rng(0)
+        for (area, neighbours) in [
+            (SquareRectArray(0, 0, 10, 8), square_neighbours),
+            (HexRectArray(0, 0, 0, 10, 8), hex_neighbours),
+            (TriRectArray(0, 0, 0, 10, 8), tri_neighbours),
+            (TrihexRectArray(0, 0, 0, 10, 8), trihex_neighbours),
+        ]:
+            cells = [tuple(cell) for cell in area.cells()]
+            seeds = [cells[i] for i in rng.choice(len(cells), 3, replace=False)]
+            costs = area.full_like(1.0)
+            costs.values[:] = rng.choice([1, 2, np.inf], len(area))
+            for seed in seeds:
+                costs[seed] = 1
+            distances, directions, labels = flow_field(area, seeds, costs)
+            # Compare against a search from each seed. Costs are for entering a cell,
+            # so searching outwards from a seed counts the cost of the far end instead of the seed.
+            expected = {}
+            for label, seed in enumerate(seeds):
+                for cell, cost in dijkstra(seed, neighbours, costs=costs).items():
+                    cost += costs[seed] - costs[cell]
+                    if cost < expected.get(cell, (np.inf,))[0]:
+                        expected[cell] = (cost, label)
+            for cell in cells:
+                if cell in expected:
+                    self.assertEqual(distances[cell], expected[cell][0])
+                    self.assertIn(labels[cell], range(len(seeds)))
+                else:
+                    self.assertEqual(distances[cell], np.inf)
+                    self.assertEqual(labels[cell], -1)
+            # Following the directions walks to the labelled seed
+            walkers = np.array([cell for cell in cells if cell in expected])
+            for _ in range(len(cells)):
+                walkers = flow_step(directions, walkers)
+            for walker, start in zip(walkers, [cell for cell in cells if cell in expected]):
+                self.assertEqual(tuple(walker), seeds[labels[start]])
+
+    def test_unit_cost(self):
+        area = HexRectArray(0, 0, 0, 6, 6)
+        distances, directions, labels = flow_field(area, [(0, 0, 0), (5, -2, -3)])
+        for cell in area:
+            self.assertEqual(distances[cell], min(hex_dist(*cell, 0, 0, 0), hex_dist(*cell, 5, -2, -3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
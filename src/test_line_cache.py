@@ -0,0 +1,57 @@
+from line_cache import *
+from square import square_line
+from flat_topped_hex import hex_line
+from updown_tri import tri_line
+import random
+import unittest
+
+class TestLineCache(unittest.TestCase):
+
+    def test_square(self):
+        cache = square_line_cache()
+        self.assertListEqual(cache(2, 3, 5, 7), list(square_line(2, 3, 5, 7)))
+        self.assertListEqual(cache(-1, 0, 2, 4), list(square_line(-1, 0, 2, 4)))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_hex(self):
+        cache = hex_line_cache()
+        self.assertListEqual(cache(0, 0, 0, 3, -1, -2), list(hex_line(0, 0, 0, 3, -1, -2)))
+        self.assertListEqual(cache(1, 2, -3, 4, 1, -5), [(x + 1, y + 2, z - 3) for (x, y, z) in hex_line(0, 0, 0, 3, -1, -2)])
+        self.assertListEqual(cache(1, 2, -3, 1, 2, -3), [(1, 2, -3)])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_tri(self):
+        cache = tri_line_cache()
+        for start in [(1, 1, 0), (1, 0, 0), (3, -1, 0), (3, -2, 0)]:
+            end = (start[0] + 2, start[1] - 3, start[2] + 1)
+            self.assertListEqual(cache(*start, *end), list(tri_line(*start, *end)))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_far_from_origin(self):
+        rng = random.Random(0)
+        (square_cache, hex_cache, tri_cache) = (square_line_cache(), hex_line_cache(), tri_line_cache())
+        for _ in range(2000):
+            (x, y) = (rng.randint(-1000, 1000), rng.randint(-1000, 1000))
+            (dx, dy) = (rng.randint(-9, 9), rng.randint(-9, 9))
+            self.assertListEqual(square_cache(x, y, x + dx, y + dy), list(square_line(x, y, x + dx, y + dy)))
+            hexes = (x, y, -x - y, x + dx, y + dy, -x - y - dx - dy)
+            self.assertListEqual(hex_cache(*hexes), list(hex_line(*hexes)))
+            tris = (x, y, rng.randint(1, 2) - x - y, x + dx, y + dy, rng.randint(1, 2) - x - y - dx - dy)
+            self.assertListEqual(tri_cache(*tris), list(tri_line(*tris)))
+
+    def test_eviction(self):
+        cache = square_line_cache(maxsize=2)
+        cache(0, 0, 1, 0)
+        cache(0, 0, 2, 0)
+        cache(0, 0, 1, 0)
+        cache(0, 0, 3, 0)
+        self.assertEqual(len(cache.lines), 2)
+        # The line to (2, 0) was least recently used
+        cache(0, 0, 2, 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, len(cache.lines)), (0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
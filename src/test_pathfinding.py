@@ -0,0 +1,66 @@
+from pathfinding import *
+from rect_array import *
+from flat_topped_hex import hex_neighbours, hex_dist
+from square import square_neighbours, square_dist
+from updown_tri import tri_neighbours, tri_dist
+from flat_topped_trihex import trihex_neighbours, trihex_dist
+import numpy as np
+import unittest
+
+class TestPathfinding(unittest.TestCase):
+
+    def check_path(self, path, start, goal, neighbours):
+        self.assertEqual(path[0], start)
+        self.assertEqual(path[-1], goal)
+        for a, b in zip(path, path[1:]):
+            self.assertIn(b, list(neighbours(*a)))
+
+    def test_unit_cost(self):
+        for (start, goal, neighbours, dist) in [
+            ((0, 0), (4, -3), square_neighbours, square_dist),
+            ((0, 0, 0), (5, -2, -3), hex_neighbours, hex_dist),
+            ((0, 1, 0), (3, -2, 0), tri_neighbours, tri_dist),
+            ((0, 0, 0), (3, -1, -1), trihex_neighbours, trihex_dist),
+        ]:
+            for search in [astar, bidirectional_astar]:
+                stats = PathStats()
+                path = search(start, goal, neighbours, dist, stats=stats)
+                self.check_path(path, start, goal, neighbours)
+                self.assertEqual(len(path) - 1, dist(*start, *goal))
+                self.assertGreater(stats.expanded, 0)
+
+    def test_costs(self):
+        rng = np.random.default_rng(0)
+        for (costs, neighbours, dist) in [
+            (SquareRectArray(0, 0, 10, 8), square_neighbours, square_dist),
+            (HexRectArray(0, 0, 0, 10, 8), hex_neighbours, hex_dist),
+            (TriRectArray(0, 0, 0, 10, 8), tri_neighbours, tri_dist),
+            (TrihexRectArray(0, 0, 0, 10, 8), trihex_neighbours, trihex_dist),
+        ]:
+            costs.values[:] = rng.choice([1, 2, 3, np.inf], len(costs))
+            cells = list(costs)
+            for _ in range(10):
+                start = cells[rng.integers(len(cells))]
+                goal = cells[rng.integers(len(cells))]
+                reachable = dijkstra(start, neighbours, costs=costs)
+                for search in [astar, bidirectional_astar]:
+                    path = search(start, goal, neighbours, dist, costs=costs)
+                    if goal in reachable:
+                        self.check_path(path, start, goal, neighbours)
+                        self.assertEqual(sum(costs[cell] for cell in path[1:]), reachable[goal])
+                    else:
+                        self.assertIsNone(path)
+
+    def test_dijkstra(self):
+        result = dijkstra((0, 0, 0), hex_neighbours, 3)
+        self.assertEqual(len(result), 37)
+        for hex, cost in result.items():
+            self.assertEqual(cost, hex_dist(0, 0, 0, *hex))
+        # Cells outside the costs rectangle cannot be entered
+        costs = SquareRectArray(0, 0, 3, 3)
+        self.assertEqual(len(dijkstra((0, 0), square_neighbours, costs=costs)), 9)
+        self.assertIsNone(astar((0, 0), (5, 5), square_neighbours, square_dist, costs=costs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+from rect_array import *
+import numpy as np
+import unittest
+
+class TestRectArray(unittest.TestCase):
+
+    def test_square(self):
+        grid = SquareRectArray(1, 2, 4, 3, dtype=np.int32)
+        self.assertEqual(len(grid), 12)
+        grid[1, 2] = 5
+        grid[4, 4] = 7
+        self.assertEqual(grid[1, 2], 5)
+        self.assertEqual(grid.values[-1], 7)
+        self.assertIn((4, 4), grid)
+        self.assertNotIn((5, 4), grid)
+        with self.assertRaises(KeyError):
+            grid[5, 4]
+        np.testing.assert_array_equal(grid.column(3), [0, 0, 7])
+
+    def test_hex(self):
+        rect = (0, 0, 0, 5, 3, True, False)
+        grid = HexRectArray(*rect, dtype=np.int64, fill=-1)
+        hexes = grid.cells()
+        np.testing.assert_array_equal(hexes, list(grid))
+        self.assertEqual(len(hexes), len(grid))
+        # Vectorized set and get
+        grid[hexes] = np.arange(len(hexes))
+        np.testing.assert_array_equal(grid.values, np.arange(len(hexes)))
+        np.testing.assert_array_equal(grid[hexes[:, 0], hexes[:, 1], hexes[:, 2]], np.arange(len(hexes)))
+        for i, hex in enumerate(hexes):
+            self.assertEqual(grid[tuple(hex)], i)
+            self.assertIn(tuple(hex), grid)
+        self.assertNotIn((0, -1, 1), grid)
+        self.assertNotIn((7, 0, -7), grid)
+        with self.assertRaises(KeyError):
+            grid[np.array([(0, 0, 0), (0, -1, 1)])]
+        # Columns
+        start = 0
+        for dx in range(5):
+            column = grid.column(dx)
+            np.testing.assert_array_equal(column, np.arange(start, start + len(column)))
+            start += len(column)
+            self.assertTrue(np.all(hexes[column][:, 0] == dx))
+        self.assertEqual(start, len(grid))
+
+    def test_tri(self):
+        grid = TriRectArray(0, 1, 0, 4, 3, dtype=np.int32)
+        tris = grid.cells()
+        np.testing.assert_array_equal(tris, list(grid))
+        grid[tris] = np.arange(len(tris))
+        self.assertEqual(grid[1, 1, -1], 2)
+        np.testing.assert_array_equal(grid.row(1), [4, 5, 6, 7])
+        self.assertIn((1, 1, -1), grid)
+        self.assertNotIn((-1, 1, 1), grid)
+
+    def test_trihex(self):
+        grid = TrihexRectArray(0, 0, 0, 3, 3, dtype=np.int32)
+        trihexes = grid.cells()
+        np.testing.assert_array_equal(trihexes, list(grid))
+        grid[trihexes] = np.arange(len(trihexes))
+        for i, trihex in enumerate(trihexes):
+            self.assertEqual(grid[tuple(trihex)], i)
+        rows = [grid.row(dy) for dy in range(3)]
+        self.assertEqual(sum(len(row) for row in rows), len(grid))
+        for dy, row in enumerate(rows):
+            self.assertTrue(np.all(trihexes[row][:, 1] == dy))
+
+    def test_curve_order(self):
+        for order in ["morton", "hilbert"]:
+            for (cls, rect) in [
+                (SquareRectArray, (1, 2, 5, 3)),
+                (HexRectArray, (0, 0, 0, 5, 3, True, False)),
+                (TriRectArray, (0, 1, 0, 4, 3)),
+                (TrihexRectArray, (0, 0, 0, 3, 3)),
+            ]:
+                plain = cls(*rect, dtype=np.int64)
+                grid = cls(*rect, dtype=np.int64, order=order)
+                cells = grid.cells()
+                self.assertCountEqual(map(tuple, cells), map(tuple, plain.cells()))
+                grid[cells] = np.arange(len(cells))
+                np.testing.assert_array_equal(grid.values, np.arange(len(cells)))
+                for i, cell in enumerate(cells):
+                    self.assertEqual(grid.index(tuple(cell)), i)
+                    self.assertEqual(grid[tuple(cell)], i)
+                # Neighbours match, once converted to the other order
+                table = grid.neighbour_indices()
+                plain_table = plain.neighbour_indices()
+                ranks = plain.rect_index(cells)
+                np.testing.assert_array_equal(np.where(table >= 0, ranks[table], -1), plain_table[ranks])
+        with self.assertRaises(Exception):
+            SquareRectArray(0, 0, 3, 3, order="hilbert").column(0)
+
+    def test_curve_order_iter(self):
+        for order in ["morton", "hilbert"]:
+            for grid in [
+                SquareRectArray(1, 2, 5, 3, dtype=np.int64, order=order),
+                HexRectArray(0, 0, 0, 4, 3, dtype=np.int64, order=order),
+                TriRectArray(0, 1, 0, 4, 3, dtype=np.int64, order=order),
+                TrihexRectArray(0, 0, 0, 3, 3, dtype=np.int64, order=order),
+            ]:
+                grid.values[:] = np.arange(len(grid))
+                self.assertListEqual(list(grid), [tuple(cell) for cell in grid.cells()])
+                for cell, value in zip(grid, grid.values):
+                    self.assertEqual(grid[cell], value)
+
+
+if __name__ == '__main__':
+    unittest.main()
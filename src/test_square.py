@@ -1,6 +1,7 @@
-from flat_topped_hex import *
-from square import square_line
+from square import *
+from common import layout
 import unittest
+from math import pi
 
 class TestSquare(unittest.TestCase):
 
@@ -13,6 +14,159 @@ class TestSquare(unittest.TestCase):
             (0, 4),
             (0, 5),
         ])
+        self.assertListEqual(list(square_line(2, 3, 5, 3)), [(2, 3), (3, 3), (4, 3), (5, 3)])
+
+    def test_vertices_edges(self):
+        for x in range(-3, 4):
+            for y in range(-3, 4):
+                vertices = square_vertices(x, y)
+                edges = square_edges(x, y)
+                for i, (v, corner) in enumerate(zip(vertices, square_corners(x, y))):
+                    self.assertEqual(square_vertex_center(*v), corner)
+                    self.assertIn((x, y), square_vertex_squares(*v))
+                    v2 = vertices[(i + 1) % 4]
+                    self.assertEqual(square_edge_vertices(*edges[i]), sorted([v, v2]))
+                    self.assertIn((x, y), square_edge_squares(*edges[i]))
+                    c1, c2 = square_vertex_center(*v), square_vertex_center(*v2)
+                    self.assertEqual(square_edge_center(*edges[i]), ((c1[0] + c2[0]) / 2, (c1[1] + c2[1]) / 2))
+
+    def test_rect(self):
+        rect = (1, -2, 3, 2)
+        for i, square in enumerate(square_rect(*rect)):
+            self.assertEqual(square_rect_index(*square, *rect), i)
+            self.assertEqual(square_rect_deindex(i, *rect), square)
+        self.assertEqual(len(list(square_rect(*rect))), square_rect_size(*rect))
+        self.assertIsNone(square_rect_index(4, -2, *rect))
+
+    def test_rect_intersect_spans(self):
+        self.assertListEqual(list(square_rect_intersect_spans(0.5, 0.5, 1.2, 1.2)), [
+            (0, 0, 1),
+            (1, 0, 1),
+        ])
+        # Squares only touching the edge don't count
+        self.assertListEqual(list(square_rect_intersect_spans(0, 0, 2, 1)), [(0, 0, 0), (1, 0, 0)])
+        for rect in [(0.5, 0.5, 1.2, 1.2), (-3.2, 1, 0, 4.5), (2, -2, 3, 0), (0, 0, 2, 1)]:
+            squares = [(x, y) for (x, miny, maxy) in square_rect_intersect_spans(*rect) for y in range(miny, maxy + 1)]
+            self.assertListEqual(squares, list(square_rect_intersect(*rect)))
+            self.assertEqual(len(squares), square_rect_intersect_size(*rect))
+
+    def test_rect_intersect_delta(self):
+        old = (0.3, 0.1, 7.1, 5.3)
+        for new in [old, (0.8, 0.1, 7.1, 5.3), (-0.2, 1.4, 7.1, 5.3), (1, 0.5, 4, 2), (20, 20, 1, 1)]:
+            (entered, exited) = square_rect_intersect_delta(*old, *new)
+            old_squares = set(square_rect_intersect(*old))
+            new_squares = set(square_rect_intersect(*new))
+            self.assertEqual({(x, y) for (x, miny, maxy) in entered for y in range(miny, maxy + 1)}, new_squares - old_squares)
+            self.assertEqual({(x, y) for (x, miny, maxy) in exited for y in range(miny, maxy + 1)}, old_squares - new_squares)
+        self.assertEqual(square_rect_intersect_delta(*old, *old), ([], []))
+
+    def test_polygon_intersect(self):
+        self.assertListEqual(list(square_polygon_intersect([(0.5, 0.5), (2.5, 0.5), (0.5, 2.5)])), [
+            (0, 0),
+            (0, 1),
+            (0, 2),
+            (1, 0),
+            (1, 1),
+            (2, 0),
+        ])
+        # Concave polygons can leave gaps in a column
+        u_shape = [(0, 0), (3, 0), (3, 3), (2, 3), (2, 1), (1, 1), (1, 3), (0, 3)]
+        self.assertListEqual(list(square_polygon_intersect_spans(u_shape)), [(0, 0, 2), (1, 0, 0), (2, 0, 2)])
+        # Rectangles match square_rect_intersect
+        self.assertListEqual(list(square_polygon_intersect([(0.5, 0.5), (1.7, 0.5), (1.7, 1.7), (0.5, 1.7)])), [
+            (0, 0),
+            (0, 1),
+            (1, 0),
+            (1, 1),
+        ])
+
+    def test_circle_intersect(self):
+        self.assertListEqual(list(square_circle_intersect_spans(0.5, 0.5, 1)), [(-1, -1, 1), (0, -1, 1), (1, -1, 1)])
+        self.assertListEqual(list(square_circle_intersect(0.5, 0.5, 0.5)), [(0, 0)])
+        # Squares only touching the circle don't count
+        self.assertEqual(len(list(square_circle_intersect(0, 0, 1))), 4)
+        self.assertEqual(len(list(square_circle_intersect(0, 0, 1.1))), 4 + 8)
+
+    def test_rect_vertices(self):
+        rect = (1, -2, 3, 2)
+        vertices = set()
+        for square in square_rect(*rect):
+            vertices.update(square_vertices(*square))
+        self.assertCountEqual(vertices, square_rect_vertices(*rect))
+        self.assertEqual(len(vertices), square_rect_vertex_size(*rect))
+        for i, v in enumerate(square_rect_vertices(*rect)):
+            self.assertEqual(square_rect_vertex_index(*v, *rect), i)
+            self.assertEqual(square_rect_vertex_deindex(i, *rect), v)
+
+    def test_ring(self):
+        for r in range(5):
+            ring = list(square_ring(1, 2, r))
+            self.assertEqual(len(ring), len(set(ring)))
+            self.assertCountEqual(ring, [s for s in square_disc(1, 2, r) if square_dist(1, 2, *s) == r])
+            self.assertEqual(len(list(square_spiral(1, 2, r))), square_disc_size(r))
+        self.assertListEqual(list(square_ring(0, 0, 1)), [(1, 0), (0, 1), (-1, 0), (0, -1)])
+
+    def test_grid(self):
+        grid = SquareGrid()
+        self.assertEqual(grid.center(1, 2), square_center(1, 2))
+        self.assertEqual(grid.pick(1.5, -2.5), pick_square(1.5, -2.5))
+        self.assertEqual(grid.corners(1, 2), square_corners(1, 2))
+        self.assertListEqual(list(grid.rect_intersect(0.5, 0.5, 2, 1)), list(square_rect_intersect(0.5, 0.5, 2, 1)))
+        self.assertEqual(grid.rect_intersect_size(0.5, 0.5, 2, 1), square_rect_intersect_size(0.5, 0.5, 2, 1))
+        self.assertListEqual(list(grid.line_intersect(0.5, 0.5, 3.5, 1.5)), list(square_line_intersect(0.5, 0.5, 3.5, 1.5)))
+        grid = SquareGrid(2)
+        self.assertEqual(grid.pick(*grid.center(3, -4)), (3, -4))
+        self.assertEqual(grid.center(0, 0), (1, 1))
+        self.assertListEqual(list(grid.rect_intersect(1, 1, 4, 2)), list(square_rect_intersect(0.5, 0.5, 2, 1)))
+        self.assertListEqual(list(grid.circle_intersect(1, 1, 2)), list(square_circle_intersect(0.5, 0.5, 1)))
+        self.assertListEqual(list(grid.polygon_intersect([(0, 0), (6, 0), (0, 6)])), list(square_polygon_intersect([(0, 0), (3, 0), (0, 3)])))
+
+    def test_grid_layout(self):
+        grid = SquareGrid(2, layout((10, 5), pi / 2))
+        plain = SquareGrid(2)
+        for cell in plain.rect_intersect(-2, -2, 4, 4):
+            (x, y) = plain.center(*cell)
+            # A quarter turn anticlockwise about (10, 5)
+            (wx, wy) = grid.center(*cell)
+            self.assertAlmostEqual(wx, 10 - y)
+            self.assertAlmostEqual(wy, 5 + x)
+            self.assertEqual(grid.pick(wx, wy), cell)
+        self.assertCountEqual(grid.rect_intersect(8.4, 3.3, 2.9, 3.1), plain.polygon_intersect([(-1.7, -1.3), (1.4, -1.3), (1.4, 1.6), (-1.7, 1.6)]))
+        self.assertCountEqual(grid.circle_intersect(10.1, 5.2, 2.9), plain.circle_intersect(0.2, -0.1, 2.9))
+        self.assertCountEqual(grid.line_intersect(9.8, 5.3, 6.7, 9.1), plain.line_intersect(0.3, 0.2, 4.1, 3.3))
+        # A tiny rotation goes through polygon_intersect instead, but finds the same squares
+        tilted = SquareGrid(1, layout(rotation=1e-7))
+        for rect in [(0.2, 0.2, 1.5, 0.5), (-3.4, 1.1, 2.2, 4.5)]:
+            self.assertCountEqual(tilted.rect_intersect(*rect), square_rect_intersect(*rect))
+        skewed = SquareGrid(1, ((1, 0.5, 0), (0, 1, 0)))
+        with self.assertRaises(Exception):
+            list(skewed.circle_intersect(0, 0, 1))
+
+    def test_pack(self):
+        keys = set()
+        for cell in [(0, 0), (-1, 2), (2**31 - 1, -2**31), (-2**31, 2**31 - 1)]:
+            key = square_pack(*cell)
+            self.assertEqual(square_unpack(key), cell)
+            keys.add(key)
+        self.assertEqual(len(keys), 4)
+
+    def test_rect_curves(self):
+        rect = (1, -2, 4, 4)
+        for (index, deindex) in [(square_rect_morton_index, square_rect_morton_deindex), (square_rect_hilbert_index, square_rect_hilbert_deindex)]:
+            indices = [index(*cell, *rect) for cell in square_rect(*rect)]
+            self.assertEqual(len(set(indices)), square_rect_size(*rect))
+            for cell, i in zip(square_rect(*rect), indices):
+                self.assertEqual(deindex(i, *rect), cell)
+            for cell in square_rect(*rect):
+                for neighbour in square_neighbours(*cell):
+                    if square_rect_index(*neighbour, *rect) is None:
+                        self.assertIsNone(index(*neighbour, *rect))
+        # A power of two square is filled by the Hilbert curve, one step at a time
+        squares = [square_rect_hilbert_deindex(i, *rect) for i in range(16)]
+        for (s1, s2) in zip(squares, squares[1:]):
+            self.assertEqual(square_dist(*s1, *s2), 1)
+        self.assertListEqual([square_rect_morton_deindex(i, *rect) for i in range(4)], [(1, -2), (2, -2), (1, -1), (2, -1)])
+
 
 if __name__ == '__main__':
     unittest.main()
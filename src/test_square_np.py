@@ -0,0 +1,128 @@
+import square_np
+from square import *
+from common import layout
+from common_np import key_index
+from rect_array import *
+import numpy as np
+import unittest
+
+class TestSquareNp(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.points = np.concatenate([
+            rng.uniform(-20, 20, (200, 2)),
+            [(x, y) for x in range(-3, 4) for y in range(-3, 4)],
+        ])
+
+    def test_pick(self):
+        squares = square_np.pick_square(self.points)
+        self.assertEqual(squares.shape, (len(self.points), 2))
+        for p, square in zip(self.points, squares):
+            self.assertEqual(tuple(square), pick_square(*p))
+
+    def test_grid(self):
+        grid = SquareGrid(1.5, layout((3, -2), 0.5, 2))
+        squares = square_np.square_grid_pick(grid, self.points)
+        self.assertEqual(squares.shape, (len(self.points), 2))
+        centers = square_np.square_grid_center(grid, squares)
+        for point, cell, center in zip(self.points, squares, centers):
+            self.assertEqual(tuple(cell), grid.pick(*point))
+            self.assertEqual(tuple(center), grid.center(*cell))
+
+    def test_pack(self):
+        squares = square_np.pick_square(self.points)
+        keys = square_np.square_pack(squares)
+        self.assertEqual(keys.dtype, np.int64)
+        self.assertListEqual(list(keys), [square_pack(*cell) for cell in squares])
+        np.testing.assert_array_equal(square_np.square_unpack(keys), squares)
+        neighbours = square_np.square_key_neighbours(keys)
+        for key, row in zip(keys, neighbours):
+            self.assertListEqual(list(row), [square_pack(*n) for n in square_neighbours(*square_unpack(key))])
+        sorted_keys = np.unique(keys)
+        indices = key_index(sorted_keys, keys)
+        np.testing.assert_array_equal(sorted_keys[indices], keys)
+        self.assertListEqual(list(key_index(sorted_keys, [square_pack(100, 100)])), [-1])
+
+    def test_corners(self):
+        squares = np.array([(x, y) for x in range(-3, 4) for y in range(-2, 3)])
+        corners = square_np.square_corners(squares)
+        self.assertEqual(corners.dtype, np.float32)
+        self.assertEqual(corners.shape, (len(squares), 4, 2))
+        self.assertTrue(corners.flags.c_contiguous)
+        for square, c in zip(squares, corners):
+            np.testing.assert_allclose(c, square_corners(*square))
+            np.testing.assert_allclose(square_np.square_center([square])[0], square_center(*square))
+
+    def test_mesh(self):
+        squares = np.array(list(square_rect(0, 0, 3, 4)))
+        vertices, indices = square_np.square_mesh(squares)
+        self.assertEqual(len(vertices), 4 * 5)
+        np.testing.assert_array_equal(vertices[indices], square_np.square_vertices(squares))
+        for square, edges in zip(squares, square_np.square_edges(squares)):
+            np.testing.assert_array_equal(edges, square_edges(*square))
+
+    def test_rect(self):
+        rect = (1, -2, 3, 4)
+        squares = np.array([(x, y) for x in range(-2, 6) for y in range(-4, 4)])
+        indices = square_np.square_rect_index(squares, *rect)
+        for square, i in zip(squares, indices):
+            expected = square_rect_index(*square, *rect)
+            self.assertEqual(i, -1 if expected is None else expected)
+        inside = indices >= 0
+        np.testing.assert_array_equal(square_np.square_rect_deindex(indices[inside], *rect), squares[inside])
+
+    def test_rect_curves(self):
+        for rect in [(1, -2, 4, 4), (0, 0, 5, 3)]:
+            squares = np.array([(x, y) for x in range(-2, 8) for y in range(-4, 4)])
+            for curve in ["morton", "hilbert"]:
+                index = globals()["square_rect_" + curve + "_index"]
+                indices = getattr(square_np, "square_rect_" + curve + "_index")(squares, *rect)
+                for cell, i in zip(squares, indices):
+                    expected = index(*cell, *rect)
+                    self.assertEqual(i, -1 if expected is None else expected)
+                inside = indices >= 0
+                np.testing.assert_array_equal(getattr(square_np, "square_rect_" + curve + "_deindex")(indices[inside], *rect), squares[inside])
+
+    def test_parent(self):
+        squares = np.array([(x, y) for x in range(-7, 7) for y in range(-5, 5)])
+        parents = square_np.square_parent(squares)
+        for square, parent, children in zip(squares, parents, square_np.square_parent_children(parents)):
+            self.assertEqual(tuple(parent), square_parent(*square))
+            self.assertListEqual(list(map(tuple, children)), list(square_parent_children(*parent)))
+
+    def test_disc(self):
+        squares = np.array([(0, 0), (3, -2)])
+        discs = square_np.square_disc(squares, 3)
+        neighbours = square_np.square_neighbours(squares)
+        for square, disc, ns in zip(squares, discs, neighbours):
+            self.assertListEqual([tuple(s) for s in disc], list(square_spiral(*square, 3)))
+            self.assertListEqual([tuple(s) for s in ns], list(square_neighbours(*square)))
+        self.assertIs(square_np.square_disc_offsets(3), square_np.square_disc_offsets(3))
+        self.assertFalse(square_np.square_disc_offsets(3).flags.writeable)
+
+    def test_line_intersect(self):
+        rng = np.random.default_rng(1)
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, offsets = square_np.square_line_intersect(starts, ends)
+        for i in range(100):
+            expected = list(square_line_intersect(*starts[i], *ends[i]))
+            self.assertListEqual([tuple(cell) for cell in cells[offsets[i]:offsets[i + 1]]], expected)
+
+    def test_raycast(self):
+        rng = np.random.default_rng(2)
+        opaque = SquareRectArray(*(-12, -12, 24, 24), dtype=bool)
+        opaque.values[:] = rng.random(len(opaque)) < 0.05
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, hit = square_np.square_raycast(starts, ends, opaque)
+        for i in range(100):
+            line = list(square_line_intersect(*starts[i], *ends[i]))
+            hits = [cell for cell in line if cell not in opaque or opaque[cell]]
+            self.assertEqual(hit[i], len(hits) > 0)
+            self.assertEqual(tuple(cells[i]), hits[0] if hits else line[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 from updown_tri import *
+from common import layout
 import unittest
+from math import pi
 
 class TestUpDownTri(unittest.TestCase):
 
@@ -70,6 +72,20 @@ class TestUpDownTri(unittest.TestCase):
             (-5, 11, -5),
         ])
 
+    def test_rect_intersect_size(self):
+        for rect in [(0, 0, 0, 0), (-3.2, 1, 0, 4.5), (2, -2, 3, 0), (0.3, 0.1, 7.1, 5.3)]:
+            self.assertEqual(tri_rect_intersect_size(*rect), len(list(tri_rect_intersect(*rect))))
+
+    def test_rect_intersect_spans(self):
+        x1, y1 = tri_center(0, 1, 0)
+        self.assertListEqual(list(tri_rect_intersect_spans(x1, y1, 0, 0)), [
+            (1, 0, 0),
+        ])
+        self.assertListEqual(list(tri_rect_intersect_spans(x1, y1, 0.6, 0.3)), [
+            (1, 0, 2),
+            (2, 0, 2),
+        ])
+
     def test_reflect(self):
         self.assertEqual(tri_reflect_x(1, 1, 0), (0, 1, 1))
         self.assertEqual(tri_reflect_y(1, 1, 0), (1, 0, 0))
@@ -81,5 +97,165 @@ class TestUpDownTri(unittest.TestCase):
         l = list(tri_line(2,-8,7, 23,-27,6))
         self.assertEqual((23, -27, 6), l[-1])
 
+    def test_vertices_edges(self):
+        for a in range(-3, 4):
+            for b in range(-3, 4):
+                for c in (1 - a - b, 2 - a - b):
+                    tri = (a, b, c)
+                    vertices = tri_vertices(*tri)
+                    edges = tri_edges(*tri)
+                    for i, (v, corner) in enumerate(zip(vertices, tri_corners(*tri))):
+                        self.assertEqual(sum(v), 0)
+                        self.assertAlmostEqual(tri_center(*v)[0], corner[0])
+                        self.assertAlmostEqual(tri_center(*v)[1], corner[1])
+                        self.assertIn(tri, tri_vertex_tris(*v))
+                        self.assertCountEqual(tri_edge_vertices(*edges[i]), [v, vertices[(i + 1) % 3]])
+                        down, up = tri_edge_tris(*edges[i])
+                        self.assertIn(tri, (down, up))
+                        self.assertFalse(points_up(*down))
+                        self.assertIn(up, tri_neighbours(*down))
+
+    def test_rect_intersect_delta(self):
+        old = (0.3, 0.1, 7.1, 5.3)
+        for new in [old, (0.8, 0.1, 7.1, 5.3), (-0.2, 1.4, 7.1, 5.3), (1, 0.5, 4, 2), (20, 20, 1, 1)]:
+            (entered, exited) = tri_rect_intersect_delta(*old, *new)
+            old_tris = set(tri_rect_intersect(*old))
+            new_tris = set(tri_rect_intersect(*new))
+            self.assertEqual({((u - b) // 2 + 1, b, (-u - b) // 2 + 1) for (b, minu, maxu) in entered for u in range(minu, maxu + 1)}, new_tris - old_tris)
+            self.assertEqual({((u - b) // 2 + 1, b, (-u - b) // 2 + 1) for (b, minu, maxu) in exited for u in range(minu, maxu + 1)}, old_tris - new_tris)
+        self.assertEqual(tri_rect_intersect_delta(*old, *old), ([], []))
+
+    def test_polygon_intersect(self):
+        x1, y1 = tri_center(0, 1, 0)
+        for rect in [(x1, y1, 0.6, 0.3), (-3.2, 1, 0.1, 4.5), (0.3, 0.1, 7.1, 5.3)]:
+            (x, y, width, height) = rect
+            square = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+            self.assertListEqual(list(tri_polygon_intersect(square)), list(tri_rect_intersect(*rect)))
+        # A thin triangle inside a single tri
+        self.assertListEqual(list(tri_polygon_intersect([(x1 - 0.1, y1), (x1 + 0.1, y1), (x1, y1 + 0.1)])), [(0, 1, 0)])
+        # A concave polygon, with a notch cut out of the top
+        u_shape = [(0, 0), (9, 0), (9, 6), (6, 6), (4.5, 1.5), (3, 6), (0, 6)]
+        tris = set(tri_polygon_intersect(u_shape))
+        self.assertNotIn(pick_tri(4.5, 5.5), tris)
+        self.assertIn(pick_tri(4.5, 1.2), tris)
+        self.assertIn(pick_tri(1.5, 5.5), tris)
+        self.assertEqual(sum(maxu - minu + 1 for (b, minu, maxu) in tri_polygon_intersect_spans(u_shape)), len(tris))
+
+    def test_circle_intersect(self):
+        x1, y1 = tri_center(0, 1, 0)
+        self.assertListEqual(list(tri_circle_intersect(x1, y1, 0.1)), [(0, 1, 0)])
+        # The six tris around a vertex
+        self.assertCountEqual(list(tri_circle_intersect(0, 0, 0.5)), tri_vertex_tris(0, 0, 0))
+        self.assertListEqual(list(tri_circle_intersect_spans(0, 0, 0.5)), [(0, -1, 1), (1, -1, 1)])
+
+    def test_rect(self):
+        rect = (0, 1, 0, 3, 2)
+        self.assertListEqual(list(tri_rect(*rect)), [
+            (0, 1, 0),
+            (1, 1, 0),
+            (1, 1, -1),
+            (0, 2, 0),
+            (0, 2, -1),
+            (1, 2, -1),
+        ])
+        for rect in [(0, 1, 0, 3, 2), (1, 1, 0, 4, 5), (-2, 3, 1, 1, 1)]:
+            for i, tri in enumerate(tri_rect(*rect)):
+                self.assertEqual(tri_rect_index(*tri, *rect), i)
+                self.assertEqual(tri_rect_deindex(i, *rect), tri)
+            self.assertEqual(len(list(tri_rect(*rect))), tri_rect_size(*rect))
+        self.assertIsNone(tri_rect_index(0, 0, 1, *rect))
+
+    def test_rect_vertices(self):
+        for rect in [(0, 1, 0, 3, 2), (1, 1, 0, 4, 5), (-2, 3, 1, 1, 1)]:
+            vertices = set()
+            for tri in tri_rect(*rect):
+                vertices.update(tri_vertices(*tri))
+            self.assertCountEqual(vertices, tri_rect_vertices(*rect))
+            self.assertEqual(len(vertices), tri_rect_vertex_size(*rect))
+            for i, v in enumerate(tri_rect_vertices(*rect)):
+                self.assertEqual(tri_rect_vertex_index(*v, *rect), i)
+                self.assertEqual(tri_rect_vertex_deindex(i, *rect), v)
+        self.assertIsNone(tri_rect_vertex_index(5, -5, 0, *rect))
+
+    def test_ring(self):
+        for tri in [(0, 1, 0), (1, 1, 0)]:
+            for r in range(6):
+                ring = list(tri_ring(*tri, r))
+                self.assertEqual(len(ring), len(set(ring)))
+                self.assertEqual(len(ring), 3 * r if r > 0 else 1)
+                for t in ring:
+                    self.assertEqual(tri_dist(*tri, *t), r)
+                    self.assertIn(sum(t), (1, 2))
+                self.assertEqual(len(list(tri_disc(*tri, r))), tri_disc_size(r))
+        self.assertCountEqual(tri_ring(1, 0, 0, 1), tri_neighbours(1, 0, 0))
+
+    def test_disc_index(self):
+        for tri in [(0, 1, 0), (1, 1, 0)]:
+            spiral = list(tri_spiral(*tri, 5))
+            for i, t in enumerate(spiral):
+                self.assertEqual(tri_disc_index(*t, *tri, 5), i)
+                self.assertEqual(tri_disc_deindex(i, *tri, 5), t)
+            self.assertIsNone(tri_disc_index(tri[0] + 3, tri[1] - 3, tri[2] + 1, *tri, 5))
+
+    def test_line_intersect_thirds(self):
+        # Away from corners, this matches tri_line_intersect
+        for (start, end) in [((1, 1, 0), (4, -2, 0)), ((0, 0, 1), (-3, 2, 2)), ((2, 0, 0), (2, 0, 0))]:
+            expected = list(tri_line_intersect(*tri_center(*start), *tri_center(*end)))
+            self.assertListEqual(list(tri_line(*start, *end)), expected)
+        self.assertListEqual(list(tri_line_intersect_thirds(1, 1, -2, 7, 1, -8)), list(tri_line_intersect(0.5, sqrt3 / 6, 2.5, sqrt3 / 6)))
+
+    def test_grid(self):
+        grid = TriGrid()
+        for tri in [(1, 0, 0), (1, 1, 0), (2, -1, 0), (0, 2, -1)]:
+            self.assertAlmostEqual(grid.center(*tri)[0], tri_center(*tri)[0])
+            self.assertAlmostEqual(grid.center(*tri)[1], tri_center(*tri)[1])
+            self.assertEqual(grid.pick(*tri_center(*tri)), tri)
+        self.assertListEqual(list(grid.rect_intersect(0.2, 0.3, 2, 1)), list(tri_rect_intersect(0.2, 0.3, 2, 1)))
+        self.assertEqual(grid.rect_intersect_size(0.2, 0.3, 2, 1), tri_rect_intersect_size(0.2, 0.3, 2, 1))
+        self.assertListEqual(list(grid.line_intersect(0.2, 0.3, 3.5, 1.5)), list(tri_line_intersect(0.2, 0.3, 3.5, 1.5)))
+        grid = TriGrid(2)
+        for tri in [(1, 0, 0), (1, 1, 0), (2, -1, 0), (0, 2, -1)]:
+            self.assertEqual(grid.pick(*grid.center(*tri)), tri)
+        self.assertListEqual(list(grid.rect_intersect(0.4, 0.6, 4, 2)), list(tri_rect_intersect(0.2, 0.3, 2, 1)))
+        self.assertListEqual(list(grid.circle_intersect(1, 1, 2)), list(tri_circle_intersect(0.5, 0.5, 1)))
+
+    def test_grid_layout(self):
+        grid = TriGrid(2, layout((10, 5), pi / 2))
+        plain = TriGrid(2)
+        for cell in plain.rect_intersect(-2, -2, 4, 4):
+            (x, y) = plain.center(*cell)
+            # A quarter turn anticlockwise about (10, 5)
+            (wx, wy) = grid.center(*cell)
+            self.assertAlmostEqual(wx, 10 - y)
+            self.assertAlmostEqual(wy, 5 + x)
+            self.assertEqual(grid.pick(wx, wy), cell)
+        self.assertCountEqual(grid.rect_intersect(8.4, 3.3, 2.9, 3.1), plain.polygon_intersect([(-1.7, -1.3), (1.4, -1.3), (1.4, 1.6), (-1.7, 1.6)]))
+        self.assertCountEqual(grid.circle_intersect(10.1, 5.2, 2.9), plain.circle_intersect(0.2, -0.1, 2.9))
+        self.assertCountEqual(grid.line_intersect(9.8, 5.3, 6.7, 9.1), plain.line_intersect(0.3, 0.2, 4.1, 3.3))
+        skewed = TriGrid(1, ((1, 0.5, 0), (0, 1, 0)))
+        with self.assertRaises(Exception):
+            list(skewed.circle_intersect(0, 0, 1))
+
+    def test_pack(self):
+        keys = set()
+        for cell in [(1, 0, 0), (1, 1, 0), (-3, 2, 2), (2**30 - 1, -2**30, 2), (-2**30, 2**30 - 1, 3)]:
+            key = tri_pack(*cell)
+            self.assertEqual(tri_unpack(key), cell)
+            keys.add(key)
+        self.assertEqual(len(keys), 5)
+
+    def test_rect_curves(self):
+        rect = (1, 0, 0, 4, 3)
+        for (index, deindex) in [(tri_rect_morton_index, tri_rect_morton_deindex), (tri_rect_hilbert_index, tri_rect_hilbert_deindex)]:
+            indices = [index(*cell, *rect) for cell in tri_rect(*rect)]
+            self.assertEqual(len(set(indices)), tri_rect_size(*rect))
+            for cell, i in zip(tri_rect(*rect), indices):
+                self.assertEqual(deindex(i, *rect), cell)
+            for cell in tri_rect(*rect):
+                for neighbour in tri_neighbours(*cell):
+                    if tri_rect_index(*neighbour, *rect) is None:
+                        self.assertIsNone(index(*neighbour, *rect))
+
+
 if __name__ == '__main__':
     unittest.main()
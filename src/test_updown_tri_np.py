@@ -0,0 +1,132 @@
+import updown_tri_np
+from updown_tri import *
+from common import layout
+from rect_array import *
+import numpy as np
+import unittest
+
+class TestUpDownTriNp(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Random points, plus vertices and edge midpoints which test tie breaking
+        self.points = np.concatenate([
+            rng.uniform(-20, 20, (200, 2)),
+            [tri_center(a, b, -a - b) for a in range(-3, 4) for b in range(-3, 4)],
+            [(x / 2, 0) for x in range(-6, 7)],
+        ])
+
+    def test_pick(self):
+        tris = updown_tri_np.pick_tri(self.points)
+        self.assertEqual(tris.shape, (len(self.points), 3))
+        for p, tri in zip(self.points, tris):
+            self.assertEqual(tuple(tri), pick_tri(*p))
+
+    def test_grid(self):
+        grid = TriGrid(1.5, layout((3, -2), 0.5, 2))
+        tris = updown_tri_np.tri_grid_pick(grid, self.points)
+        self.assertEqual(tris.shape, (len(self.points), 3))
+        centers = updown_tri_np.tri_grid_center(grid, tris)
+        for point, cell, center in zip(self.points, tris, centers):
+            self.assertEqual(tuple(cell), grid.pick(*point))
+            self.assertEqual(tuple(center), grid.center(*cell))
+
+    def test_pack(self):
+        # Points on vertices don't give valid tris, so aren't included
+        tris = updown_tri_np.pick_tri(self.points[:200])
+        keys = updown_tri_np.tri_pack(tris)
+        self.assertEqual(keys.dtype, np.int64)
+        self.assertListEqual(list(keys), [tri_pack(*cell) for cell in tris])
+        np.testing.assert_array_equal(updown_tri_np.tri_unpack(keys), tris)
+        neighbours = updown_tri_np.tri_key_neighbours(keys)
+        for key, row in zip(keys, neighbours):
+            self.assertListEqual(list(row), [tri_pack(*n) for n in tri_neighbours(*tri_unpack(key))])
+
+    def test_corners(self):
+        tris = np.array([(a, b, c) for a in range(-3, 4) for b in range(-3, 4) for c in (1 - a - b, 2 - a - b)])
+        corners = updown_tri_np.tri_corners(tris)
+        self.assertEqual(corners.dtype, np.float32)
+        self.assertEqual(corners.shape, (len(tris), 3, 2))
+        for tri, c in zip(tris, corners):
+            np.testing.assert_allclose(c, tri_corners(*tri), atol=1e-6)
+            np.testing.assert_array_equal(updown_tri_np.tri_center([tri])[0], tri_center(*tri))
+
+    def test_mesh(self):
+        tris = np.array(list(tri_disc(0, 1, 0, 3)))
+        vertices, indices = updown_tri_np.tri_mesh(tris)
+        self.assertEqual(len(vertices), len(set(v for tri in tris for v in tri_vertices(*tri))))
+        np.testing.assert_array_equal(vertices[indices], updown_tri_np.tri_vertices(tris))
+        for tri, edges in zip(tris, updown_tri_np.tri_edges(tris)):
+            np.testing.assert_array_equal(edges, tri_edges(*tri))
+
+    def test_rect(self):
+        for rect in [(0, 1, 0, 3, 2), (1, 1, 0, 4, 5)]:
+            tris = np.array([(a, b, c) for a in range(-6, 8) for b in range(-2, 8) for c in (1 - a - b, 2 - a - b)])
+            indices = updown_tri_np.tri_rect_index(tris, *rect)
+            for tri, i in zip(tris, indices):
+                expected = tri_rect_index(*tri, *rect)
+                self.assertEqual(i, -1 if expected is None else expected)
+            inside = indices >= 0
+            np.testing.assert_array_equal(updown_tri_np.tri_rect_deindex(indices[inside], *rect), tris[inside])
+
+    def test_disc_index(self):
+        for center in [(0, 1, 0), (1, 1, 0)]:
+            spiral = np.array(list(tri_spiral(*center, 5)))
+            outside = np.array([center]) + (6, 0, -6)
+            np.testing.assert_array_equal(updown_tri_np.tri_disc_index(spiral, *center, 5), np.arange(len(spiral)))
+            np.testing.assert_array_equal(updown_tri_np.tri_disc_index(outside, *center, 5), [-1])
+            np.testing.assert_array_equal(updown_tri_np.tri_disc_deindex(np.arange(len(spiral)), *center, 5), spiral)
+
+    def test_rect_curves(self):
+        for rect in [(1, 0, 0, 4, 3), (0, 1, 0, 5, 4)]:
+            tris = np.array([(a, b, c) for a in range(-6, 8) for b in range(-2, 8) for c in (1 - a - b, 2 - a - b)])
+            for curve in ["morton", "hilbert"]:
+                index = globals()["tri_rect_" + curve + "_index"]
+                indices = getattr(updown_tri_np, "tri_rect_" + curve + "_index")(tris, *rect)
+                for cell, i in zip(tris, indices):
+                    expected = index(*cell, *rect)
+                    self.assertEqual(i, -1 if expected is None else expected)
+                inside = indices >= 0
+                np.testing.assert_array_equal(getattr(updown_tri_np, "tri_rect_" + curve + "_deindex")(indices[inside], *rect), tris[inside])
+
+    def test_disc(self):
+        tris = np.array([(0, 1, 0), (1, 1, 0), (2, -1, 0), (3, -1, 0)])
+        discs = updown_tri_np.tri_disc(tris, 4)
+        neighbours = updown_tri_np.tri_neighbours(tris)
+        for tri, disc, ns in zip(tris, discs, neighbours):
+            self.assertListEqual([tuple(t) for t in disc], list(tri_spiral(*tri, 4)))
+            self.assertListEqual([tuple(t) for t in ns], list(tri_neighbours(*tri)))
+
+    def test_line_intersect(self):
+        rng = np.random.default_rng(1)
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, offsets = updown_tri_np.tri_line_intersect(starts, ends)
+        for i in range(100):
+            expected = list(tri_line_intersect(*starts[i], *ends[i]))
+            self.assertListEqual([tuple(cell) for cell in cells[offsets[i]:offsets[i + 1]]], expected)
+
+    def test_raycast(self):
+        rng = np.random.default_rng(2)
+        opaque = TriRectArray(*(-8, -12, 17, 48, 26), dtype=bool)
+        opaque.values[:] = rng.random(len(opaque)) < 0.05
+        starts = rng.uniform(-10, 10, (100, 2))
+        ends = rng.uniform(-10, 10, (100, 2))
+        cells, hit = updown_tri_np.tri_raycast(starts, ends, opaque)
+        for i in range(100):
+            line = list(tri_line_intersect(*starts[i], *ends[i]))
+            hits = [cell for cell in line if cell not in opaque or opaque[cell]]
+            self.assertEqual(hit[i], len(hits) > 0)
+            self.assertEqual(tuple(cells[i]), hits[0] if hits else line[-1])
+
+    def test_line(self):
+        rng = np.random.default_rng(3)
+        tris1 = np.array([(a, b, s - a - b) for (a, b, s) in rng.integers((-8, -8, 1), (9, 9, 3), (100, 3))])
+        tris2 = np.array([(a, b, s - a - b) for (a, b, s) in rng.integers((-8, -8, 1), (9, 9, 3), (100, 3))])
+        cells, offsets = updown_tri_np.tri_line(tris1, tris2)
+        for i in range(100):
+            self.assertListEqual([tuple(t) for t in cells[offsets[i]:offsets[i + 1]]], list(tri_line(*tris1[i], *tris2[i])))
+
+
+if __name__ == '__main__':
+    unittest.main()
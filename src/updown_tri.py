@@ -20,7 +20,12 @@
 
 from math import floor, ceil, sqrt
 from settings import edge_length
-from common import mod
+from common import (
+    mod, lattice_ring, lattice_ring_index, lattice_ring_deindex, spiral_ring,
+    span_difference, merge_spans, polygon_strip, circle_strip_max, pack_pair,
+    unpack_pair, morton_index, morton_deindex, curve_order, hilbert_index,
+    hilbert_deindex, Grid, identity_layout,
+)
 
 sqrt3 = sqrt(3)
 
@@ -88,17 +93,76 @@ def tri_dist(a1, b1, c1, a2, b2, c2):
     """Returns how many steps one tri is from another"""
     return abs(a1 - a2) + abs(b1 - b2) + abs(c1 - c2)
 
-def tri_disc(a, b, c, r):
-    """Returns the tris that are at most distance r from the given tri"""
-    # This could probably be optimized more
-    for da in range(-r, r + 1):
-        for db in range(-r, r + 1):
-            dc = 1 - (a + b + c + da + db)
-            if abs(da) + abs(db) + abs(dc) <= r:
-                yield (a + da, b + db, c + dc)
-            dc += 1
-            if abs(da) + abs(db) + abs(dc) <= r:
-                yield (a + da, b + db, c + dc)
+# Vertices and Edges ##########################################################
+
+# Vertices are identified by three integer co-ordinates that sum to zero.
+# They are positioned by tri_center, as noted there.
+# Edges are identified by the sum of the co-ordinates of the two vertices at each end,
+# so also sum to zero. Exactly one co-ordinate of an edge is even.
+# Both have the same nice property as tri_center, so the position of an edge's midpoint
+# is half of tri_center of the edge.
+
+def tri_vertices(a, b, c):
+    """Returns the three vertices of a given triangle.
+    These are in the same order as tri_corners"""
+    # These are the same as in tri_corners, shifted by (1, 1, 1) so that they sum to zero.
+    if points_up(a, b, c):
+        return [
+            (a    , b - 1, c - 1),
+            (a - 1, b - 1, c    ),
+            (a - 1, b    , c - 1),
+        ]
+    else:
+        return [
+            (a - 1, b    , c    ),
+            (a    , b    , c - 1),
+            (a    , b - 1, c    ),
+        ]
+
+def tri_vertex_tris(a, b, c):
+    """Returns the six triangles that touch a given vertex, in counter clockwise order"""
+    return [
+        (a + 1, b    , c    ),
+        (a + 1, b + 1, c    ),
+        (a    , b + 1, c    ),
+        (a    , b + 1, c + 1),
+        (a    , b    , c + 1),
+        (a + 1, b    , c + 1),
+    ]
+
+def tri_edges(a, b, c):
+    """Returns the three edges of a given triangle.
+    The ith edge runs from the ith vertex of tri_vertices to the next one."""
+    v = tri_vertices(a, b, c)
+    return [tuple(p + q for p, q in zip(v[i], v[(i + 1) % 3])) for i in range(3)]
+
+def tri_edge_center(a, b, c):
+    """Returns the midpoint of a given edge in cartesian co-ordinates"""
+    (x, y) = tri_center(a, b, c)
+    return (x / 2, y / 2)
+
+def tri_edge_vertices(a, b, c):
+    """Returns the two vertices at either end of a given edge"""
+    # Both vertices share the even co-ordinate, and one is rounded down from the midpoint
+    # while the other is rounded up.
+    if a % 2 == 0:
+        return [(a // 2, (b - 1) // 2, (c + 1) // 2), (a // 2, (b + 1) // 2, (c - 1) // 2)]
+    if b % 2 == 0:
+        return [((a + 1) // 2, b // 2, (c - 1) // 2), ((a - 1) // 2, b // 2, (c + 1) // 2)]
+    else:
+        return [((a - 1) // 2, (b + 1) // 2, c // 2), ((a + 1) // 2, (b - 1) // 2, c // 2)]
+
+def tri_edge_tris(a, b, c):
+    """Returns the down triangle and up triangle either side of a given edge"""
+    # The edge is the sum of the two triangles minus (1, 1, 1),
+    # and the up triangle is one more than the down one in the even co-ordinate.
+    down = ((a + 1) // 2, (b + 1) // 2, (c + 1) // 2)
+    if a % 2 == 0:
+        return [down, (down[0] + 1, down[1], down[2])]
+    if b % 2 == 0:
+        return [down, (down[0], down[1] + 1, down[2])]
+    else:
+        return [down, (down[0], down[1], down[2] + 1)]
 
 # Symmetry #####################################################################
 
@@ -143,12 +207,63 @@ def tri_reflect_by(a, b, c, n = 0):
 
 # Shapes #######################################################################
 
+def tri_disc(a, b, c, r):
+    """Returns the tris that are at most distance r from the given tri"""
+    return tri_spiral(a, b, c, r)
+
+def tri_ring(a, b, c, r):
+    """Returns the tris that are exactly distance r from the given tri,
+    in counter clockwise order starting from the right"""
+    # Offsets at an even distance sum to zero.
+    # Offsets at an odd distance sum to 1 for down tris, and -1 for up tris.
+    k = 0 if r % 2 == 0 else 3 - 2 * (a + b + c)
+    for (da, db, dc) in lattice_ring(k, r):
+        yield (a + da, b + db, c + dc)
+
+def tri_spiral(a, b, c, r):
+    """Returns the tris that are at most distance r from the given tri,
+    ordered by distance, then in counter clockwise order"""
+    for i in range(r + 1):
+        yield from tri_ring(a, b, c, i)
+
+def tri_disc_size(r):
+    """Returns the number of tris at most distance r from a given tri.
+    Equivalent to len(list(tri_disc(...)))"""
+    # Each ring has 3 * r tris
+    return 1 + 3 * r * (r + 1) // 2
+
+def tri_disc_index(a, b, c, center_a, center_b, center_c, r):
+    """Given a tri and a disc, gives a linear position of the tri.
+    The index is an integer between zero and tri_disc_size - 1.
+    This is useful for array storage of discs.
+    Returns None if the tri is not in the disc.
+    Equivalent to list(tri_spiral(...)).index((a, b, c))"""
+    d = tri_dist(a, b, c, center_a, center_b, center_c)
+    if d > r:
+        return None
+    if d == 0:
+        return 0
+    k = (a + b + c) - (center_a + center_b + center_c)
+    return tri_disc_size(d - 1) + lattice_ring_index(k, d, a - center_a, b - center_b, c - center_c)
+
+def tri_disc_deindex(index, center_a, center_b, center_c, r):
+    """Performs the inverse of tri_disc_index
+    Equivalent to list(tri_spiral(...))[index]"""
+    if index < 0 or index >= tri_disc_size(r):
+        raise Exception("Tri is not inside disc")
+    d = spiral_ring(index, tri_disc_size)
+    if d > 0:
+        index -= tri_disc_size(d - 1)
+    k = 0 if d % 2 == 0 else 3 - 2 * (center_a + center_b + center_c)
+    (da, db, dc) = lattice_ring_deindex(k, d, index)
+    return (center_a + da, center_b + db, center_c + dc)
+
 def tri_line_intersect(x1, y1, x2, y2):
     """Returns the triangles that intersect the line specified in cartesian co-ordinates"""
-    x1 /= edge_length
-    y1 /= edge_length
-    x2 /= edge_length
-    y2 /= edge_length
+    return _tri_line_intersect(x1 / edge_length, y1 / edge_length, x2 / edge_length, y2 / edge_length)
+
+def _tri_line_intersect(x1, y1, x2, y2):
+    """As tri_line_intersect, with co-ordinates in units of edge_length"""
     dx = x2 - x1
     dy = y2 - y1
     # Convert from cartesian co-ordinates to the three triangle axes
@@ -200,21 +315,72 @@ def tri_line_intersect(x1, y1, x2, y2):
         yield (a, b, c)
         isup = not isup
 
+def tri_line_intersect_thirds(fa1, fb1, fc1, fa2, fb2, fc2):
+    """Returns the triangles that intersect a line, like tri_line_intersect.
+    The ends of the line are given along the three triangle axes, as used inside tri_line_intersect,
+    but multiplied by three. So they must be integers, like the centers and corners of triangles,
+    and then only integer maths is used, so there are no precision issues."""
+    da = fa2 - fa1
+    db = fb2 - fb1
+    dc = fc2 - fc1
+    a = -(-fa1 // 3)
+    b = fb1 // 3 + 1
+    c = -(-fc1 // 3)
+    isup = a + b + c == 2
+    steps = [1 if d > 0 else -1 for d in (da, db, dc)]
+    # Each axis next crosses a line at t = nums[i] / dens[i]. Lines are 3 apart.
+    nums = [(3 * (a - int(da <= 0)) - fa1) * steps[0],
+            (3 * (b - int(db <= 0)) - fb1) * steps[1],
+            (3 * (c - int(dc <= 0)) - fc1) * steps[2]]
+    dens = [abs(da), abs(db), abs(dc)]
+    tri = [a, b, c]
+    yield (a, b, c)
+    while True:
+        # Find the next line crossed, as in tri_line_intersect
+        best = None
+        for i in range(3):
+            if dens[i] == 0 or (steps[i] == 1) == isup:
+                continue
+            if best is None or nums[i] * dens[best] < nums[best] * dens[i]:
+                best = i
+        if best is None or nums[best] > dens[best]:
+            return
+        tri[best] += steps[best]
+        nums[best] += 3
+        yield tuple(tri)
+        isup = not isup
+
 def tri_line(a1, b1, c1, a2, b2, c2):
     """Returns the tris in a shortest path from one tri to another, staying as close to the straight line as possible"""
-    (x1, y1) = tri_center(a1, b1, c1)
-    (x2, y2) = tri_center(a2, b2, c2)
-    return tri_line_intersect(x1, y1, x2, y2)
+    # Equivalent to tri_line_intersect between the centers of the tris,
+    # which are at (2a - b - c) / 3 along the a axis, and so on.
+    return tri_line_intersect_thirds(
+        2 * a1 - b1 - c1, 2 * b1 - a1 - c1, 2 * c1 - a1 - b1,
+        2 * a2 - b2 - c2, 2 * b2 - a2 - c2, 2 * c2 - a2 - b2)
 
 def tri_rect_intersect(x, y, width, height):
     """Returns the tris that intersect the rectangle specified in cartesian co-ordinates"""
+    for (b, minu, maxu) in tri_rect_intersect_spans(x, y, width, height):
+        # Walk along the row left to right
+        for u in range(minu, maxu + 1):
+            yield ((u - b) // 2 + 1, b, (-u - b) // 2 + 1)
+
+def tri_rect_intersect_size(x, y, width, height):
+    """Returns the number of tris that intersect the rectangle specified in cartesian co-ordinates.
+    Equivalent to len(list(tri_rect_intersect(...)))"""
+    return sum(maxu - minu + 1 for (b, minu, maxu) in tri_rect_intersect_spans(x, y, width, height))
+
+def tri_rect_intersect_spans(x, y, width, height):
+    """Returns the tris that intersect the rectangle specified in cartesian co-ordinates,
+    as one span (b, minu, maxu) per row, covering the tris in row b with a - c from minu to maxu inclusive.
+    a - c increases by one with each tri along a row, as in tri_rect, so each span is a contiguous slice of a rectangle's storage."""
+    return _tri_rect_intersect_spans(x / edge_length, y / edge_length, width / edge_length, height / edge_length)
+
+def _tri_rect_intersect_spans(x, y, width, height):
+    """As tri_rect_intersect_spans, with co-ordinates in units of edge_length"""
     assert width >= 0, "Rectangle should have non-negative width"
     assert height >= 0, "Rectangle should have non-negative height"
     # For consistency, we treat the triangles as exclusive of their border, and the rect as inclusive
-    x /= edge_length
-    y /= edge_length
-    width /= edge_length
-    height /= edge_length
     # Lower and upper bound by row
     fl = sqrt3 * 2 / 3 * y
     fu = sqrt3 * 2 / 3 * (y + height)
@@ -225,17 +391,298 @@ def tri_rect_intersect(x, y, width, height):
         maxb = min(b, fu)
         # The smallest / largest values for the diagonals
         # can be read from the trimmed rect corners
-        mina = floor(x - maxb / 2) + 1
-        maxa = ceil(x + width - minb / 2)
-        minc = floor(-x - width - maxb / 2) + 1
-        maxc = ceil(-x - minb / 2)
-        # Walk along the row left to right
-        a = mina
-        c = maxc
-        assert a + b + c == 1 or a + b + c == 2
-        while a <= maxa and c >= minc:
-            yield (a, b, c)
-            if a + b + c == 1:
-                a += 1
-            else:
-                c -= 1
\ No newline at end of file
+        span = _tri_row_span(b, x - maxb / 2, x + width - minb / 2, -x - width - maxb / 2, -x - minb / 2)
+        if span:
+            yield span
+
+def _tri_row_span(b, minfa, maxfa, minfc, maxfc):
+    """Given the range of the diagonal co-ordinates of a convex shape inside row b, in units of edge_length,
+    returns the span (b, minu, maxu) of tris intersecting it, or None if there are none"""
+    mina = floor(minfa) + 1
+    maxa = ceil(maxfa)
+    minc = floor(minfc) + 1
+    maxc = ceil(maxfc)
+    # Along the row, the tri with a - c = u has a = (u - b) // 2 + 1 and c = (-u - b) // 2 + 1.
+    # The row starts with a = mina, c = maxc, and stops before a exceeds maxa, or c goes below minc.
+    minu = mina - maxc
+    maxu = min(2 * maxa + b - 1, 2 - b - 2 * minc)
+    if minu <= maxu:
+        return (b, minu, maxu)
+
+def tri_rect_intersect_delta(x1, y1, width1, height1, x2, y2, width2, height2):
+    """Given a rectangle specified in cartesian co-ordinates that moves or resizes from (x1, y1, width1, height1) to (x2, y2, width2, height2),
+    returns a pair of lists of the tris that start intersecting it, and those that stop intersecting it.
+    Both are lists of spans (b, minu, maxu), as in tri_rect_intersect_spans.
+    For a small move, this is much less than the tris in the whole rectangle."""
+    old = list(tri_rect_intersect_spans(x1, y1, width1, height1))
+    new = list(tri_rect_intersect_spans(x2, y2, width2, height2))
+    return (list(span_difference(new, old)), list(span_difference(old, new)))
+
+def tri_polygon_intersect(points):
+    """Returns the tris that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners.
+    The polygon can be concave, but its edges shouldn't cross."""
+    for (b, minu, maxu) in tri_polygon_intersect_spans(points):
+        for u in range(minu, maxu + 1):
+            yield ((u - b) // 2 + 1, b, (-u - b) // 2 + 1)
+
+def tri_polygon_intersect_spans(points):
+    """Returns the tris that intersect the polygon with the given list of (x, y) cartesian co-ordinates as corners,
+    as spans (b, minu, maxu), as in tri_rect_intersect_spans. Concave polygons can have several spans per row."""
+    return _tri_polygon_intersect_spans([(x / edge_length, y / edge_length) for (x, y) in points])
+
+def _tri_polygon_intersect_spans(points):
+    """As tri_polygon_intersect_spans, with co-ordinates in units of edge_length"""
+    # Work with the x co-ordinate and the b diagonal
+    points = [(x, sqrt3 * 2 / 3 * y) for (x, y) in points]
+    fl = min(fb for (x, fb) in points)
+    fu = max(fb for (x, fb) in points)
+    for b in range(floor(fl) + 1, ceil(fu) + 1):
+        # Split the polygon in this row into convex pieces, and find the diagonals from their corners
+        spans = []
+        for corners in polygon_strip(points, b - 1, b):
+            fas = [x - fb / 2 for (x, fb) in corners]
+            fcs = [-x - fb / 2 for (x, fb) in corners]
+            span = _tri_row_span(b, min(fas), max(fas), min(fcs), max(fcs))
+            if span:
+                spans.append(span)
+        yield from merge_spans(spans)
+
+def tri_circle_intersect(x, y, r):
+    """Returns the tris that intersect the circle with center (x, y) and radius r in cartesian co-ordinates"""
+    for (b, minu, maxu) in tri_circle_intersect_spans(x, y, r):
+        for u in range(minu, maxu + 1):
+            yield ((u - b) // 2 + 1, b, (-u - b) // 2 + 1)
+
+def tri_circle_intersect_spans(x, y, r):
+    """Returns the tris that intersect the circle with center (x, y) and radius r in cartesian co-ordinates,
+    as spans (b, minu, maxu), as in tri_rect_intersect_spans."""
+    return _tri_circle_intersect_spans(x / edge_length, y / edge_length, r / edge_length)
+
+def _tri_circle_intersect_spans(x, y, r):
+    """As tri_circle_intersect_spans, with co-ordinates in units of edge_length"""
+    assert r >= 0, "Circle should have non-negative radius"
+    fl = sqrt3 * 2 / 3 * (y - r)
+    fu = sqrt3 * 2 / 3 * (y + r)
+    for b in range(floor(fl) + 1, ceil(fu) + 1):
+        # Find the range of the diagonals, fa = x - y / sqrt3 and fc = -x - y / sqrt3,
+        # over the part of the circle in this row
+        lo = max((b - 1) * sqrt3 / 2, y - r)
+        hi = min(b * sqrt3 / 2, y + r)
+        span = _tri_row_span(b,
+            -circle_strip_max(x, y, r, lo, hi, -1, 1 / sqrt3),
+            circle_strip_max(x, y, r, lo, hi, 1, -1 / sqrt3),
+            -circle_strip_max(x, y, r, lo, hi, 1, 1 / sqrt3),
+            circle_strip_max(x, y, r, lo, hi, -1, -1 / sqrt3))
+        if span:
+            yield span
+
+def tri_rect(rect_a, rect_b, rect_c, width, height):
+    """Returns the tris in a rectangle that includes the given tri in the bottom left,
+    that extends `height` rows upwards, and `width` tris to the right.
+    Tris are returned row by row, from bottom to top."""
+    for dy in range(height):
+        for du in range(width):
+            yield tri_rect_unknoll(du, dy, rect_a, rect_b, rect_c, width, height)
+
+def tri_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Given a tri and a rectangle, gives a pair of integer cartesian co-ordinates that identify the tri in the rectangle"""
+    return (a - c - (rect_a - rect_c), b - rect_b)
+
+def tri_rect_unknoll(du, dy, rect_a, rect_b, rect_c, width, height):
+    """Given a co-ordinate pair and a rectangle, reverses tri_rect_knoll"""
+    b = rect_b + dy
+    u = rect_a - rect_c + du
+    # a + c is fixed by b and whether the tri points up, and a - c is u.
+    s = 2 if (b + u) % 2 == 0 else 1
+    return ((s - b + u) // 2, b, (s - b - u) // 2)
+
+def tri_rect_index(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Given a tri and a rectangle, gives a linear position of the tri.
+    The index is an integer between zero and tri_rect_size - 1.
+    This is useful for array storage of rectangles.
+    Returns None if the tri is not in the rectangle.
+    Equivalent to list(tri_rect(...)).index((a, b, c))"""
+    (du, dy) = tri_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height)
+    if du < 0 or du >= width or dy < 0 or dy >= height:
+        return None
+    return dy * width + du
+
+def tri_rect_deindex(index, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of tri_rect_index
+    Equivalent to list(tri_rect(...))[index]"""
+    du = index % width
+    dy = index // width
+    if dy < 0 or dy >= height:
+        raise Exception("Tri is not inside rectangle")
+    return tri_rect_unknoll(du, dy, rect_a, rect_b, rect_c, width, height)
+
+def tri_rect_size(rect_a, rect_b, rect_c, width, height):
+    """Returns the number of tris in a given rectangle.
+    Equivalent to len(list(tri_rect(...)))"""
+    return width * height
+
+# The curve functions give other orders for the tris of a rectangle, following a space filling curve
+# through the co-ordinates from tri_rect_knoll, see common.py.
+# Nearby tris are more often stored close together than with tri_rect_index, but indices can skip values.
+
+def tri_rect_morton_index(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Like tri_rect_index, but gives the position of the tri along the Z-order curve through the rectangle.
+    Returns None if the tri is not in the rectangle."""
+    if tri_rect_index(a, b, c, rect_a, rect_b, rect_c, width, height) is None:
+        return None
+    return morton_index(*tri_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height))
+
+def tri_rect_morton_deindex(index, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of tri_rect_morton_index"""
+    tri = tri_rect_unknoll(*morton_deindex(index), rect_a, rect_b, rect_c, width, height)
+    if tri_rect_index(*tri, rect_a, rect_b, rect_c, width, height) is None:
+        raise Exception("Tri is not inside rectangle")
+    return tri
+
+def tri_rect_hilbert_index(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Like tri_rect_index, but gives the position of the tri along the Hilbert curve through the rectangle.
+    Returns None if the tri is not in the rectangle."""
+    if tri_rect_index(a, b, c, rect_a, rect_b, rect_c, width, height) is None:
+        return None
+    return hilbert_index(*tri_rect_knoll(a, b, c, rect_a, rect_b, rect_c, width, height), curve_order(width, height))
+
+def tri_rect_hilbert_deindex(index, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of tri_rect_hilbert_index"""
+    tri = tri_rect_unknoll(*hilbert_deindex(index, curve_order(width, height)), rect_a, rect_b, rect_c, width, height)
+    if tri_rect_index(*tri, rect_a, rect_b, rect_c, width, height) is None:
+        raise Exception("Tri is not inside rectangle")
+    return tri
+
+# The vertices of a rectangle lie on rows, one below each row of tris, and one more above.
+# Every row runs from a - c one less than the first tri to one more than the last tri,
+# but only includes every other value, so rows alternate in length. Vertices are ordered row by row
+# from bottom to top, then from left to right, like tri_rect.
+
+def _tri_rect_vertex_row(dy, rect_a, rect_b, rect_c, width, height):
+    """Returns the number of vertices in the dy'th row of vertices of a rectangle, and a - c of the leftmost one"""
+    # A vertex in row b has a + c = -b, so a - c has the same parity as b.
+    u = rect_a - rect_c - 1
+    b = rect_b - 1 + dy
+    u += (u - b) % 2
+    return ((rect_a - rect_c + width - u) // 2 + 1, u)
+
+def tri_rect_vertices(rect_a, rect_b, rect_c, width, height):
+    """Returns the vertices of all the tris in a rectangle, in the order used by tri_rect_vertex_index"""
+    if width <= 0 or height <= 0:
+        return
+    for dy in range(height + 1):
+        (count, u) = _tri_rect_vertex_row(dy, rect_a, rect_b, rect_c, width, height)
+        b = rect_b - 1 + dy
+        for i in range(count):
+            yield ((u + 2 * i - b) // 2, b, (-u - 2 * i - b) // 2)
+
+def tri_rect_vertex_index(a, b, c, rect_a, rect_b, rect_c, width, height):
+    """Given a vertex and a rectangle, gives a linear position of the vertex.
+    The index is an integer between zero and tri_rect_vertex_size - 1.
+    This is useful for storing a vertex buffer for the rectangle.
+    Returns None if the vertex is not on a tri of the rectangle."""
+    dy = b - rect_b + 1
+    if width <= 0 or height <= 0 or dy < 0 or dy > height:
+        return None
+    (count, u) = _tri_rect_vertex_row(dy, rect_a, rect_b, rect_c, width, height)
+    i = (a - c - u) // 2
+    if i < 0 or i >= count:
+        return None
+    # Each pair of rows has width + 2 vertices
+    (first_count, _) = _tri_rect_vertex_row(0, rect_a, rect_b, rect_c, width, height)
+    return (dy // 2) * (width + 2) + (dy % 2) * first_count + i
+
+def tri_rect_vertex_deindex(index, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of tri_rect_vertex_index"""
+    (first_count, _) = _tri_rect_vertex_row(0, rect_a, rect_b, rect_c, width, height)
+    dy = 2 * (index // (width + 2))
+    i = index % (width + 2)
+    if i >= first_count:
+        dy += 1
+        i -= first_count
+    if index < 0 or width <= 0 or height <= 0 or dy > height:
+        raise Exception("Vertex is not inside rectangle")
+    (count, u) = _tri_rect_vertex_row(dy, rect_a, rect_b, rect_c, width, height)
+    b = rect_b - 1 + dy
+    return ((u + 2 * i - b) // 2, b, (-u - 2 * i - b) // 2)
+
+def tri_rect_vertex_size(rect_a, rect_b, rect_c, width, height):
+    """Returns the number of vertices of the tris in a given rectangle."""
+    if width <= 0 or height <= 0:
+        return 0
+    (first_count, _) = _tri_rect_vertex_row(0, rect_a, rect_b, rect_c, width, height)
+    return (height + 1) // 2 * (width + 2) + ((height + 1) % 2) * first_count
+
+# Packed Keys ##################################################################
+
+# a and b are packed with common.pack_pair, followed by a bit that is 1 for up triangles.
+# c can be found from the others. a and b must be from -2**30 to 2**30 - 1.
+
+def tri_pack(a, b, c):
+    """Packs a triangle into a single integer key"""
+    return pack_pair(a, b) * 2 + (a + b + c - 1)
+
+def tri_unpack(key):
+    """Returns the triangle packed by tri_pack"""
+    (a, b) = unpack_pair(key >> 1)
+    return (a, b, 1 + (key & 1) - a - b)
+
+# Grid Objects #################################################################
+
+# The functions above all use the edge_length from settings.
+# TriGrid does the same calculations with its own edge length, so grids of different sizes can be used side by side,
+# and an optional layout, see common.py, for placing the grid in world co-ordinates.
+# Its methods work like the functions of the same name, without the tri_ prefix.
+
+class TriGrid(Grid):
+    """A grid of triangles with a given edge length and layout, see Grid in common.py.
+    The matrices used by center and pick are worked out once, when the grid is created."""
+    __slots__ = ("center_matrix", "pick_matrix")
+    vertices = staticmethod(tri_vertices)
+    _line_intersect = staticmethod(_tri_line_intersect)
+    _rect_intersect_spans = staticmethod(_tri_rect_intersect_spans)
+    _polygon_intersect_spans = staticmethod(_tri_polygon_intersect_spans)
+    _circle_intersect_spans = staticmethod(_tri_circle_intersect_spans)
+
+    def __init__(self, edge_length=1, layout=identity_layout):
+        Grid.__init__(self, edge_length, layout)
+        # Rows give world x and y in terms of a, b, c and a constant, as in tri_center
+        self.center_matrix = self.world_matrix((
+            (       0.5,         0,       -0.5, 0),
+            (-sqrt3 / 6, sqrt3 / 3, -sqrt3 / 6, 0),
+        ))
+        # Rows give the position along each triangle axis in terms of world x, y and a constant, as in pick_tri
+        self.pick_matrix = self.unit_matrix((
+            ( 1,    -sqrt3 / 3, 0),
+            ( 0, sqrt3 * 2 / 3, 0),
+            (-1,    -sqrt3 / 3, 0),
+        ))
+
+    def center(self, a, b, c):
+        """Returns the center of a given triangle in cartesian co-ordinates"""
+        ((xa, xb, xc, xt), (ya, yb, yc, yt)) = self.center_matrix
+        return (xa * a + xb * b + xc * c + xt, ya * a + yb * b + yc * c + yt)
+
+    def pick(self, x, y):
+        """Returns the triangle that contains a given cartesian co-ordinate point"""
+        ((ax, ay, at), (bx, by, bt), (cx, cy, ct)) = self.pick_matrix
+        return (
+            ceil(ax * x + ay * y + at),
+            floor(bx * x + by * y + bt) + 1,
+            ceil(cx * x + cy * y + ct),
+        )
+
+    def vertex_center(self, a, b, c):
+        """Returns the position of a given vertex in cartesian co-ordinates"""
+        return self.center(a, b, c)
+
+    def edge_center(self, a, b, c):
+        """Returns the midpoint of a given edge in cartesian co-ordinates"""
+        return self.center(a / 2, b / 2, c / 2)
+
+    @staticmethod
+    def span_cells(spans):
+        """Returns the tris covered by spans (b, minu, maxu)"""
+        for (b, minu, maxu) in spans:
+            for u in range(minu, maxu + 1):
+                yield ((u - b) // 2 + 1, b, (-u - b) // 2 + 1)
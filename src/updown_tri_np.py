@@ -0,0 +1,369 @@
+# Vectorized UpDown Triangle Co-ordinates
+# This module mirrors functions from updown_tri, but works on many points or triangles at once using numpy.
+#
+# Points are passed as float arrays of shape (N, 2), with each row being an x, y cartesian co-ordinate.
+# Triangles are passed as integer arrays of shape (N, 3), with each row being an a, b, c co-ordinate.
+# Any extra leading dimensions are preserved, so (N, M, 2) works too.
+#
+# Each function performs the same floating point operations as its scalar counterpart,
+# so gives identical results, including for points exactly on an edge or vertex.
+
+import functools
+import numpy as np
+import updown_tri
+from settings import edge_length
+from updown_tri import sqrt3
+from common import curve_order
+from common_np import mesh, affine, pack_pair, unpack_pair, morton_index, morton_deindex, hilbert_index, hilbert_deindex, lattice_ring_index, lattice_ring_deindex, spiral_ring, ray_points, march_cells, march_hits
+
+# Basics #######################################################################
+
+def tri_center(tris, dtype=float):
+    """Returns the centers of the given triangles in cartesian co-ordinates, as an (N, 2) array"""
+    tris = np.asarray(tris)
+    a = tris[..., 0]
+    b = tris[..., 1]
+    c = tris[..., 2]
+    return np.stack([
+        (       0.5 * a +                      -0.5 * c) * edge_length,
+        (-sqrt3 / 6 * a + sqrt3 / 3 * b - sqrt3 / 6 * c) * edge_length,
+    ], axis=-1).astype(dtype)
+
+def points_up(tris):
+    """Returns a boolean array, True for each upwards pointing triangle"""
+    tris = np.asarray(tris)
+    return tris.sum(axis=-1) == 2
+
+# Offsets of each corner from an up triangle, in the same order as updown_tri.tri_corners
+# Down triangles use the negation of these.
+tri_corner_offsets = np.array([
+    (1, 0, 0),
+    (0, 0, 1),
+    (0, 1, 0),
+])
+
+def tri_corners(tris, dtype=np.float32):
+    """Returns the three corners of the given triangles in cartesian co-ordinates, as an (N, 3, 2) array.
+    The result is contiguous, so is suitable for uploading directly as a vertex buffer."""
+    tris = np.asarray(tris)
+    sign = np.where(points_up(tris), 1, -1)
+    return tri_center(tris[..., None, :] + sign[..., None, None] * tri_corner_offsets, dtype)
+
+def pick_tri(points):
+    """Returns the triangles that contain the given cartesian co-ordinate points"""
+    points = np.asarray(points, dtype=float)
+    x = points[..., 0]
+    y = points[..., 1]
+    return np.stack([
+        np.ceil(( 1 * x - sqrt3 / 3 * y) / edge_length),
+        np.floor((    sqrt3 * 2 / 3 * y) / edge_length) + 1,
+        np.ceil((-1 * x - sqrt3 / 3 * y) / edge_length),
+    ], axis=-1).astype(np.int64)
+
+def tri_grid_center(grid, tris, dtype=float):
+    """Returns the centers of the given triangles in the world co-ordinates of grid, a TriGrid, as an (N, 2) array"""
+    return affine(grid.center_matrix, tris).astype(dtype)
+
+def tri_grid_pick(grid, points):
+    """Returns the triangles of grid, a TriGrid, that contain the given world co-ordinate points"""
+    f = affine(grid.pick_matrix, points)
+    return np.stack([
+        np.ceil(f[..., 0]),
+        np.floor(f[..., 1]) + 1,
+        np.ceil(f[..., 2]),
+    ], axis=-1).astype(np.int64)
+
+# Offsets of each neighbour from an up triangle, in the same order as updown_tri.tri_neighbours
+# Down triangles use the negation of these.
+tri_neighbour_offsets = np.array([
+    (-1,  0,  0),
+    ( 0, -1,  0),
+    ( 0,  0, -1),
+])
+
+def tri_neighbours(tris):
+    """Returns the three tris that share an edge with each given tri, as an (N, 3, 3) array"""
+    tris = np.asarray(tris)
+    sign = np.where(points_up(tris), 1, -1)
+    return tris[..., None, :] + sign[..., None, None] * tri_neighbour_offsets
+
+# Packed Keys ##################################################################
+
+# Keys are packed as in updown_tri.tri_pack, but as int64 arrays.
+
+def tri_pack(tris):
+    """Packs the given triangles into an int64 array of keys"""
+    tris = np.asarray(tris)
+    return pack_pair(tris[..., 0], tris[..., 1]) * 2 + (tris.sum(axis=-1) - 1)
+
+def tri_unpack(keys):
+    """Returns the triangles packed by tri_pack, as an (N, 3) array"""
+    keys = np.asarray(keys, dtype=np.int64)
+    (a, b) = unpack_pair(keys >> 1)
+    return np.stack([a, b, 1 + (keys & 1) - a - b], axis=-1)
+
+# Packing is linear, apart from subtracting 1, so each neighbour's key differs by the key of its offset plus 1.
+# As with tri_neighbours, down triangles use the negation.
+tri_neighbour_key_offsets = tri_pack(tri_neighbour_offsets) + 1
+
+def tri_key_neighbours(keys):
+    """Returns the keys of the three tris that share an edge with each given key, as an (N, 3) array,
+    in the same order as tri_neighbours"""
+    keys = np.asarray(keys, dtype=np.int64)
+    sign = np.where(keys & 1, 1, -1)
+    return keys[..., None] + sign[..., None] * tri_neighbour_key_offsets
+
+# Shapes #######################################################################
+
+# The rect functions take the same rectangle arguments as in updown_tri, and
+# return -1 rather than None for tris that are not in the rectangle.
+
+def tri_rect_knoll(tris, rect_a, rect_b, rect_c, width, height):
+    """Given tris and a rectangle, gives an (N, 2) array of integer co-ordinates that identify each tri in the rectangle.
+    Unlike tri_rect_index, this does not check if the tris are inside the rectangle."""
+    tris = np.asarray(tris)
+    return np.stack([
+        tris[..., 0] - tris[..., 2] - (rect_a - rect_c),
+        tris[..., 1] - rect_b,
+    ], axis=-1)
+
+def tri_rect_unknoll(knolls, rect_a, rect_b, rect_c, width, height):
+    """Given an (N, 2) array of co-ordinate pairs and a rectangle, reverses tri_rect_knoll"""
+    knolls = np.asarray(knolls)
+    b = rect_b + knolls[..., 1]
+    u = rect_a - rect_c + knolls[..., 0]
+    s = 2 - (b + u) % 2
+    return np.stack([(s - b + u) // 2, b, (s - b - u) // 2], axis=-1)
+
+def tri_rect_index(tris, rect_a, rect_b, rect_c, width, height):
+    """Given tris and a rectangle, gives the linear position of each tri.
+    Each index is an integer between zero and tri_rect_size - 1, or -1 if the tri is not in the rectangle."""
+    knolls = tri_rect_knoll(tris, rect_a, rect_b, rect_c, width, height)
+    du = knolls[..., 0]
+    dy = knolls[..., 1]
+    inside = (du >= 0) & (du < width) & (dy >= 0) & (dy < height)
+    return np.where(inside, dy * width + du, -1)
+
+def tri_rect_deindex(indices, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of tri_rect_index"""
+    indices = np.asarray(indices)
+    if np.any((indices < 0) | (indices >= width * height)):
+        raise Exception("Tri is not inside rectangle")
+    knolls = np.stack([indices % width, indices // width], axis=-1)
+    return tri_rect_unknoll(knolls, rect_a, rect_b, rect_c, width, height)
+
+def tri_rect_morton_index(tris, rect_a, rect_b, rect_c, width, height):
+    """Vectorized version of updown_tri.tri_rect_morton_index, giving -1 for tris not in the rectangle"""
+    knolls = tri_rect_knoll(tris, rect_a, rect_b, rect_c, width, height)
+    inside = tri_rect_index(tris, rect_a, rect_b, rect_c, width, height) >= 0
+    return np.where(inside, morton_index(knolls[..., 0], knolls[..., 1]), -1)
+
+def tri_rect_morton_deindex(indices, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of tri_rect_morton_index"""
+    tris = tri_rect_unknoll(np.stack(morton_deindex(indices), axis=-1), rect_a, rect_b, rect_c, width, height)
+    if np.any(tri_rect_index(tris, rect_a, rect_b, rect_c, width, height) < 0):
+        raise Exception("Tri is not inside rectangle")
+    return tris
+
+def tri_rect_hilbert_index(tris, rect_a, rect_b, rect_c, width, height):
+    """Vectorized version of updown_tri.tri_rect_hilbert_index, giving -1 for tris not in the rectangle"""
+    knolls = tri_rect_knoll(tris, rect_a, rect_b, rect_c, width, height)
+    inside = tri_rect_index(tris, rect_a, rect_b, rect_c, width, height) >= 0
+    return np.where(inside, hilbert_index(knolls[..., 0], knolls[..., 1], curve_order(width, height)), -1)
+
+def tri_rect_hilbert_deindex(indices, rect_a, rect_b, rect_c, width, height):
+    """Performs the inverse of tri_rect_hilbert_index"""
+    tris = tri_rect_unknoll(np.stack(hilbert_deindex(indices, curve_order(width, height)), axis=-1), rect_a, rect_b, rect_c, width, height)
+    if np.any(tri_rect_index(tris, rect_a, rect_b, rect_c, width, height) < 0):
+        raise Exception("Tri is not inside rectangle")
+    return tris
+
+def tri_disc_index(tris, a, b, c, r):
+    """Given tris and a disc, gives the linear position of each tri, as in updown_tri.tri_disc_index.
+    Each index is an integer between zero and tri_disc_size - 1, or -1 if the tri is not in the disc."""
+    offsets = np.asarray(tris) - (a, b, c)
+    d = np.abs(offsets).sum(axis=-1)
+    index = 1 + 3 * (d - 1) * d // 2 + lattice_ring_index(offsets.sum(axis=-1), d, offsets)
+    return np.where(d == 0, 0, np.where(d <= r, index, -1))
+
+def tri_disc_deindex(indices, a, b, c, r):
+    """Performs the inverse of tri_disc_index"""
+    indices = np.asarray(indices)
+    if np.any((indices < 0) | (indices >= 1 + 3 * r * (r + 1) // 2)):
+        raise Exception("Tri is not inside disc")
+    d = spiral_ring(indices, lambda r: 1 + 3 * r * (r + 1) // 2)
+    indices = indices - np.where(d > 0, 1 + 3 * (d - 1) * d // 2, 0)
+    k = np.where(d % 2 == 0, 0, 3 - 2 * (a + b + c))
+    return lattice_ring_deindex(k, d, indices) + (a, b, c)
+
+# The disc offset tables are cached, as disc shapes only depend on the radius and whether the center points up.
+# The tables are read-only, so are safe to share between callers.
+
+@functools.lru_cache(maxsize=64)
+def tri_disc_offsets(r, up):
+    """Returns the offsets from an up (or down) tri of every tri at most distance r from it, as an (M, 3) array.
+    These are in the same order as updown_tri.tri_spiral, so row i is tri_disc_deindex(i, ...)"""
+    center = (1, 1, 0) if up else (1, 0, 0)
+    offsets = np.array(list(updown_tri.tri_spiral(*center, r))) - center
+    offsets.setflags(write=False)
+    return offsets
+
+def tri_disc(tris, r):
+    """Returns the tris at most distance r from each given tri, as an (N, M, 3) array.
+    These are in the same order as updown_tri.tri_spiral"""
+    tris = np.asarray(tris)
+    up = points_up(tris)[..., None, None]
+    return tris[..., None, :] + np.where(up, tri_disc_offsets(r, True), tri_disc_offsets(r, False))
+
+# The line functions take (N, 2) arrays of start and end points, and step every line through the grid together.
+# As lines pass through different numbers of tris, they return a pair of arrays, the tris, and
+# an (N + 1,) array of offsets, so that the tris of the ith line are tris[offsets[i]:offsets[i + 1]].
+
+def tri_march(starts, ends, visit):
+    """Steps through the tris of many lines at once, in the same way as updown_tri.tri_line_intersect"""
+    starts, ends = ray_points(starts, ends)
+    x1 = starts[:, 0] / edge_length
+    y1 = starts[:, 1] / edge_length
+    x2 = ends[:, 0] / edge_length
+    y2 = ends[:, 1] / edge_length
+    dx = x2 - x1
+    dy = y2 - y1
+    # Convert from cartesian co-ordinates to the three triangle axes
+    f = np.stack([
+         1 * x1 - sqrt3 / 3 * y1,
+               sqrt3 * 2 / 3 * y1,
+        -1 * x1 - sqrt3 / 3 * y1,
+    ], axis=-1)
+    d = np.stack([
+         1 * dx - sqrt3 / 3 * dy,
+               sqrt3 * 2 / 3 * dy,
+        -1 * dx - sqrt3 / 3 * dy,
+    ], axis=-1)
+    tris = np.stack([
+        np.ceil(f[:, 0]),
+        np.floor(f[:, 1]) + 1,
+        np.ceil(f[:, 2]),
+    ], axis=-1).astype(np.int64)
+    isup = tris.sum(axis=-1) == 2
+    step = np.where(d > 0, 1, -1)
+    with np.errstate(divide="ignore"):
+        t = np.where(d != 0, (tris - (d <= 0) - f) / d, np.inf)
+        it = np.where(d != 0, np.abs(1 / d), np.inf)
+    rays = np.arange(len(tris))
+    stop = visit(rays, tris.copy())
+    active = np.ones(len(tris), bool) if stop is None else ~stop
+    while np.any(active):
+        rays = np.flatnonzero(active)
+        # Find the next line crossed, ignoring lines that don't border the current triangle
+        t2 = np.where((step[rays] == 1) != isup[rays, None], t[rays], np.inf)
+        axis = np.where((t2[:, 0] <= t2[:, 1]) & (t2[:, 0] <= t2[:, 2]), 0, np.where(t2[:, 1] <= t2[:, 2], 1, 2))
+        done = t[rays, axis] > 1
+        active[rays[done]] = False
+        (rays, axis) = (rays[~done], axis[~done])
+        if len(rays) == 0:
+            break
+        tris[rays, axis] += step[rays, axis]
+        t[rays, axis] += it[rays, axis]
+        isup[rays] = ~isup[rays]
+        stop = visit(rays, tris[rays])
+        if stop is not None:
+            active[rays[stop]] = False
+
+def tri_march_thirds(starts, ends, visit):
+    """Steps through the tris of many lines at once, in the same way as updown_tri.tri_line_intersect_thirds.
+    starts and ends are (N, 3) integer arrays, giving three times the position along each triangle axis."""
+    starts, ends = np.broadcast_arrays(np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64))
+    starts = starts.reshape(-1, 3)
+    d = ends.reshape(-1, 3) - starts
+    tris = np.stack([
+        -(-starts[:, 0] // 3),
+        starts[:, 1] // 3 + 1,
+        -(-starts[:, 2] // 3),
+    ], axis=-1)
+    isup = tris.sum(axis=-1) == 2
+    step = np.where(d > 0, 1, -1)
+    # Each axis next crosses a line at t = nums / dens. Lines are 3 apart.
+    nums = (3 * (tris - (d <= 0)) - starts) * step
+    dens = np.abs(d)
+    rays = np.arange(len(tris))
+    stop = visit(rays, tris.copy())
+    active = np.ones(len(tris), bool) if stop is None else ~stop
+    while np.any(active):
+        rays = np.flatnonzero(active)
+        # Find the next line crossed, ignoring lines that don't border the current triangle,
+        # preferring earlier axes when tied, as in updown_tri.tri_line_intersect_thirds
+        ok = (dens[rays] != 0) & ((step[rays] == 1) != isup[rays, None])
+        best = np.argmax(ok, axis=1)
+        for i in (1, 2):
+            n_i = nums[rays, i]
+            d_i = dens[rays, i]
+            n_best = nums[rays, best]
+            d_best = dens[rays, best]
+            better = ok[:, i] & (n_i * d_best < n_best * d_i)
+            best = np.where(better, i, best)
+        done = ~ok.any(axis=1) | (nums[rays, best] > dens[rays, best])
+        active[rays[done]] = False
+        (rays, best) = (rays[~done], best[~done])
+        if len(rays) == 0:
+            break
+        tris[rays, best] += step[rays, best]
+        nums[rays, best] += 3
+        isup[rays] = ~isup[rays]
+        stop = visit(rays, tris[rays])
+        if stop is not None:
+            active[rays[stop]] = False
+
+def _tri_thirds(tris):
+    """Returns three times the position of the centers of tris along each triangle axis"""
+    tris = np.asarray(tris)
+    return 3 * tris - tris.sum(axis=-1, keepdims=True)
+
+def tri_line(tris1, tris2):
+    """Returns the tris in a shortest path between each pair of tris, as in updown_tri.tri_line.
+    Returns a pair of tris and offsets, like tri_line_intersect."""
+    return march_cells(tri_march_thirds, _tri_thirds(tris1), _tri_thirds(tris2))
+
+def tri_line_intersect(starts, ends):
+    """Returns the tris that intersect each line specified in cartesian co-ordinates, as a pair of tris and offsets"""
+    return march_cells(tri_march, starts, ends)
+
+def tri_raycast(starts, ends, opaque):
+    """Finds the first tri along each line that is opaque, i.e. truthy in opaque, a TriRectArray.
+    Tris outside the rectangle of opaque also count as opaque. Lines stop at the first opaque tri.
+    Returns a pair, an (N, 3) array of tris, and an (N,) boolean array that is false for lines that hit nothing.
+    Those lines give the tri containing their end point instead."""
+    return march_hits(tri_march, starts, ends, opaque)
+
+# Vertices and Edges ##########################################################
+
+# Offsets of each vertex from an up or down triangle, in the same order as updown_tri.tri_vertices
+tri_up_vertex_offsets = np.array([
+    ( 0, -1, -1),
+    (-1, -1,  0),
+    (-1,  0, -1),
+])
+tri_down_vertex_offsets = np.array([
+    (-1,  0,  0),
+    ( 0,  0, -1),
+    ( 0, -1,  0),
+])
+
+def tri_vertices(tris):
+    """Returns the three vertices of the given triangles, as an (N, 3, 3) array.
+    These are in the same order as tri_corners"""
+    tris = np.asarray(tris)
+    up = points_up(tris)[..., None, None]
+    return tris[..., None, :] + np.where(up, tri_up_vertex_offsets, tri_down_vertex_offsets)
+
+def tri_edges(tris):
+    """Returns the three edges of the given triangles, as an (N, 3, 3) array.
+    The ith edge runs from the ith vertex of tri_vertices to the next one."""
+    vertices = tri_vertices(tris)
+    return vertices + np.roll(vertices, -1, axis=-2)
+
+def tri_mesh(tris, index_dtype=np.uint32):
+    """Returns the distinct vertices of the given triangles, and how to index them.
+    Returns a pair, a (V, 3) array of vertices, and an (N, 3) index array, so that
+    vertices[indices[i]] is tri_vertices(tris)[i].
+    Use tri_center(vertices, np.float32) to get a vertex buffer."""
+    return mesh(tri_vertices(tris), index_dtype)